@@ -1,87 +1,212 @@
-from flask import Flask, jsonify, request
-from typedb.driver import TypeDB, Credentials, DriverOptions, TransactionType
+from flask import Flask, Response, g, jsonify, request, send_file
+from flask.json.provider import DefaultJSONProvider
 import queries
+from metrics import metrics, start_request, finish_request, timed_phase
+from services import read_pool, response_cache, place_index, media_store, write_behind
+from media import CHUNK_SIZE as MEDIA_CHUNK_SIZE, response_headers as media_headers
+from pages import selected_fields
+from batch import batch_ids, read_pages, bulk_write, chunk_size_arg
+from handlers import (
+    ERROR_STATUSES, error_body, parse_json, stats, paginated_query, read_page, next_cursor, page_cursor, post_cursor,
+    comment_cursor, read_page_document, commit, create_friendship, create_following,
+)
+from conditional import conditional
+from compression import Compression
+from streaming import negotiate, documents_response, stream_response
 from flask_cors import CORS
 from config import *
 
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with timed_phase('serialize') as phase:
+            text = super().dumps(obj, **kwargs)
+        phase.add_bytes(len(text))
+        return text
+
 app = Flask(__name__)
-CORS(app)
+app.json = TimedJSONProvider(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'ETag'])
+
+if COMPRESSION_ENABLED:
+    compression = Compression(COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY)
+
+    @app.after_request
+    def compress(response):
+        return compression.apply(response, request.headers.get('Accept-Encoding'))
+
+if METRICS_ENABLED:
+    @app.before_request
+    def start_timer():
+        g.timer = start_request(request.url_rule.rule if request.url_rule else 'unmatched')
+
+    @app.after_request
+    def add_server_timing(response):
+        timer = g.timer
+        response.headers['Server-Timing'] = timer.server_timing()
+        response.headers['Timing-Allow-Origin'] = '*'
+        # Streamed responses are still being written, so they are observed once they have been sent.
+        response.call_on_close(lambda: finish_request(timer))
+        return response
+
+def read_json():
+    return parse_json(request.get_data())
 
-typedb = TypeDB.driver(TYPEDB_ADDRESS, Credentials(TYPEDB_USERNAME, TYPEDB_PASSWORD), DriverOptions(TYPEDB_TLS_ENABLED, None))
+def list_response(query, limit=None, cursor_of=None):
+    mimetype = negotiate(request.accept_mimetypes)
+    if limit is None:
+        return stream_response(read_pool.transaction(), lambda tx: tx.query(query).resolve().as_concept_documents(), mimetype)
+
+    page = read_page(query, limit)
+    response = documents_response(page[:limit], mimetype)
+    cursor = next_cursor(page, limit, cursor_of)
+    if cursor is not None:
+        response.headers['X-Next-Cursor'] = cursor
+    return response
+
+def handle_error(error):
+    return jsonify(error_body(error)), ERROR_STATUSES[type(error)]
+
+for error_type in ERROR_STATUSES:
+    app.register_error_handler(error_type, handle_error)
 
 @app.route('/')
 def index():
     return jsonify({"message": "Python backend is running"})
 
+@app.route('/api/stats')
+def get_stats():
+    return jsonify(stats())
+
+@app.route('/metrics')
+def get_metrics():
+    return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/pages')
+@conditional
+@response_cache.cached('pages', RESPONSE_CACHE_TTL_SECONDS['pages'])
 def get_page_list():
-    with typedb.transaction(TYPEDB_DATABASE, TransactionType.READ) as tx:
-        return jsonify(list(tx.query(queries.PAGE_LIST_QUERY).resolve().as_concept_documents()))
+    query, limit = paginated_query(request.args, queries.page_list_query, arity=1)
+    return list_response(query, limit, page_cursor)
+
+@app.route('/api/pages/batch', methods=['POST'])
+def post_page_batch():
+    return jsonify(read_pages(batch_ids(read_json(), PAGE_BATCH_MAX_IDS), selected_fields(request.args.get('fields'))))
 
 @app.route('/api/location/<place_id>')
 def get_location_page_list(place_id):
-    with typedb.transaction(TYPEDB_DATABASE, TransactionType.READ) as tx:
-        return jsonify(list(tx.query(queries.location_query(place_id)).resolve().as_concept_documents()))
+    place_ids = place_index.within(place_id) if place_index is not None else None
+    return list_response(queries.location_query(place_id, place_ids))
+
+@app.route('/api/places/refresh', methods=['POST'])
+def post_places_refresh():
+    if place_index is None:
+        return jsonify({'error': 'The place index is not enabled'}), 404
+    place_index.refresh()
+    response_cache.clear()
+    return jsonify(place_index.stats())
 
 @app.route('/api/user/<id>')
 @app.route('/api/group/<id>')
 @app.route('/api/organization/<id>')
+@conditional
+@response_cache.cached('page', RESPONSE_CACHE_TTL_SECONDS['page'])
 def get_page(id):
-    with typedb.transaction(TYPEDB_DATABASE, TransactionType.READ) as tx:
-        return jsonify(next(tx.query(queries.page_query(id)).resolve().as_concept_documents()))
+    return jsonify(read_page_document(id, selected_fields(request.args.get('fields'))))
 
 @app.route('/api/posts')
+@conditional
+@response_cache.cached('posts', RESPONSE_CACHE_TTL_SECONDS['posts'])
 def get_posts():
     page_id = request.args.get('pageId')
     if not page_id:
         return jsonify({'error': 'Missing pageId'}), 400
-    with typedb.transaction(TYPEDB_DATABASE, TransactionType.READ) as tx:
-        return jsonify(list(tx.query(queries.posts_query(page_id)).resolve().as_concept_documents()))
+    query, limit = paginated_query(request.args, queries.posts_query, page_id, arity=2)
+    return list_response(query, limit, post_cursor)
 
 @app.route('/api/comments')
+@conditional
 def get_comments():
     post_id = request.args.get('postId')
     if not post_id:
         return jsonify({'error': 'Missing postId'}), 400
-    with typedb.transaction(TYPEDB_DATABASE, TransactionType.READ) as tx:
-        return jsonify(list(tx.query(queries.comments_query(post_id)).resolve().as_concept_documents()))
+    query, limit = paginated_query(request.args, queries.comments_query, post_id, arity=2)
+    return list_response(query, limit, comment_cursor)
+
+def write(query):
+    if write_behind is not None:
+        write_behind.write(query)
+    else:
+        commit(query)
 
 @app.route('/api/create-user', methods=['POST'])
 def post_create_user():
-    payload = request.json
-    with typedb.transaction(TYPEDB_DATABASE, TransactionType.WRITE) as tx:
-        tx.query(queries.create_user_query(payload)).resolve()
-        tx.commit()
+    write(queries.create_user_query(read_json()))
     return jsonify(None), 200
 
 @app.route('/api/create-group', methods=['POST'])
 def post_create_group():
-    payload = request.json
-    with typedb.transaction(TYPEDB_DATABASE, TransactionType.WRITE) as tx:
-        tx.query(queries.create_group_query(payload)).resolve()
-        tx.commit()
+    write(queries.create_group_query(read_json()))
     return jsonify(None), 200
 
 @app.route('/api/create-organization', methods=['POST'])
 def post_create_organization():
-    payload = request.json
-    with typedb.transaction(TYPEDB_DATABASE, TransactionType.WRITE) as tx:
-        tx.query(queries.create_organization_query(payload)).resolve()
-        tx.commit()
+    write(queries.create_organization_query(read_json()))
     return jsonify(None), 200
 
+@app.route('/api/create-friendship', methods=['POST'])
+def post_create_friendship():
+    if not create_friendship(read_json()):
+        return jsonify({'error': 'Unknown person'}), 404
+    return jsonify(None), 200
+
+@app.route('/api/create-following', methods=['POST'])
+def post_create_following():
+    if not create_following(read_json()):
+        return jsonify({'error': 'Unknown page or follower'}), 404
+    return jsonify(None), 200
+
+@app.route('/api/create-users:bulk', methods=['POST'])
+def post_create_users():
+    return jsonify(bulk_create(queries.create_user_query))
+
+@app.route('/api/create-groups:bulk', methods=['POST'])
+def post_create_groups():
+    return jsonify(bulk_create(queries.create_group_query))
+
+@app.route('/api/create-organizations:bulk', methods=['POST'])
+def post_create_organizations():
+    return jsonify(bulk_create(queries.create_organization_query))
+
+def bulk_create(build_query):
+    chunk_size = chunk_size_arg(request.args, BULK_CREATE_CHUNK_SIZE, BULK_CREATE_MAX_ITEMS)
+    return bulk_write(build_query, read_json(), chunk_size, BULK_CREATE_MAX_ITEMS)
+
 @app.route('/api/media/<id>')
 def get_media(id):
-    # Not implemented, always returns 404
-    return '', 404
+    blob = media_store.lookup(id)
+    if blob is None:
+        return '', 404
+    body = media_store.read_small(blob)
+    if body is None:
+        # Served with the server's file wrapper, which uses sendfile where the server supports it.
+        response = send_file(blob.path, mimetype=blob.content_type, etag=blob.etag, conditional=True)
+    else:
+        response = Response(body, mimetype=blob.content_type)
+        response.set_etag(blob.etag)
+        response = response.make_conditional(request, accept_ranges=True, complete_length=blob.size)
+    response.headers.update(media_headers(blob))
+    return response
 
 @app.route('/api/media', methods=['POST'])
 def post_media():
-    content_type = request.headers.get('Content-Type', '')
-    data = request.get_data()
-    # Simulate base64 encoding and return a fake id
-    # In production, store the media and return its id
-    return jsonify({'id': '123'}), 200
+    upload = media_store.upload()
+    try:
+        while chunk := request.stream.read(MEDIA_CHUNK_SIZE):
+            upload.write(chunk)
+    except BaseException:
+        upload.abort()
+        raise
+    return jsonify({'id': upload.commit(request.headers.get('Content-Type'))}), 200
 
 if __name__ == '__main__':
     app.run(debug=True, port=8080) 
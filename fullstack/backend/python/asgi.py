@@ -0,0 +1,422 @@
+import asyncio
+import contextvars
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import wraps
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse as BaseJSONResponse, FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import Match, Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+import queries
+from metrics import metrics, start_request, finish_request, timed_phase
+from services import read_pool, response_cache, page_counters, place_index, media_store, write_behind, slow_query_log
+from media import response_headers as media_headers
+from pages import selected_fields
+from batch import batch_ids, read_pages, bulk_write, chunk_size_arg
+from handlers import (
+    ERROR_STATUSES, error_body, parse_json, stats, paginated_query, read_page, next_cursor, page_cursor, post_cursor,
+    comment_cursor, read_page_document, commit, create_friendship, create_following,
+)
+from conditional import etag
+from compression import Compression, set_encoding
+from streaming import negotiate, encode, open_stream
+from config import *
+
+# The driver is blocking, so every driver call runs on this bounded executor. Requests waiting for a thread
+# cost a coroutine rather than an OS thread, so one process can keep many more requests in flight than threads.
+executor = ThreadPoolExecutor(max_workers=ASGI_EXECUTOR_THREADS, thread_name_prefix="typedb")
+
+async def run(function, *args):
+    # Run in a copy of the request's context, so that the work is timed as part of the request.
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(executor, context.run, function, *args)
+
+class JSONResponse(BaseJSONResponse):
+    def render(self, content):
+        with timed_phase('serialize') as phase:
+            body = super().render(content)
+        phase.add_bytes(len(body))
+        return body
+
+class TimingMiddleware:
+    """Times each request, and reports the phases completed before its first byte in a `Server-Timing` header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        timer = start_request(route_of(scope))
+
+        async def send_timed(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = [
+                    *message.get('headers', []),
+                    (b'server-timing', timer.server_timing().encode()),
+                    (b'timing-allow-origin', b'*'),
+                ]
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                finish_request(timer)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            finish_request(timer)
+
+class CompressionMiddleware:
+    """Compresses response bodies of at least `COMPRESSION_MIN_BYTES`, chunk by chunk for streamed responses."""
+
+    def __init__(self, app):
+        self.app = app
+        self.compression = Compression(COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        accept_encoding = Headers(scope=scope).get('accept-encoding')
+        start = None
+        encoding = None
+        compressor = None
+        buffered = []
+        size = 0
+
+        async def send_compressed(message):
+            nonlocal start, encoding, compressor, size
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(raw=list(message['headers']))
+                if message['status'] == 200 and 'content-encoding' not in headers:
+                    encoding = self.compression.negotiate(accept_encoding, headers.get('content-type'))
+                if encoding is None:
+                    return await send(message)
+                headers.add_vary_header('Accept-Encoding')
+                # Held back until enough of the body has been seen to decide whether to compress it.
+                start = {**message, 'headers': headers.raw}
+                return
+
+            if encoding is None or message['type'] != 'http.response.body':
+                return await send(message)
+
+            more_body = message.get('more_body', False)
+            if compressor is None:
+                buffered.append(message.get('body', b''))
+                size += len(buffered[-1])
+                if size < self.compression.min_bytes:
+                    if more_body:
+                        return
+                    await send(start)
+                    return await send({'type': 'http.response.body', 'body': b''.join(buffered)})
+
+                compressor = self.compression.compressor(encoding)
+                body = compressor.compress(b''.join(buffered))
+                if not more_body:
+                    body += compressor.finish()
+                headers = MutableHeaders(raw=start['headers'])
+                del headers['content-length']
+                if not more_body:
+                    headers['content-length'] = str(len(body))
+                set_encoding(headers, encoding)
+                await send({**start, 'headers': headers.raw})
+            else:
+                body = compressor.compress(message.get('body', b''))
+                if not more_body:
+                    body += compressor.finish()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+def route_of(scope):
+    for route in scope['app'].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return 'unmatched'
+
+def cached(route, ttl):
+    def decorator(endpoint):
+        if ttl <= 0:
+            return endpoint
+
+        @wraps(endpoint)
+        async def wrapper(request):
+            key = response_cache.key(route, request.url.path, request.query_params.multi_items(), request.headers.get('accept'))
+            generation = response_cache.generation
+            entry = response_cache.get(key)
+            if entry is not None:
+                return Response(entry.body, status_code=entry.status, headers=dict(entry.headers))
+
+            response = await endpoint(request)
+            if response.status_code == 200:
+                headers = [(name, value) for name, value in response.headers.items() if name != 'content-length']
+                if isinstance(response, StreamingResponse):
+                    response.body_iterator = tee(response.body_iterator, response_cache.capture(key, 200, headers, ttl, generation))
+                else:
+                    response_cache.put(key, response.body, response.status_code, headers, ttl, generation)
+            return response
+
+        return wrapper
+
+    return decorator
+
+async def read_small(response, max_bytes):
+    """
+    Reads a streamed response whole if it is smaller than `max_bytes`, and returns its body. Otherwise returns None,
+    with the response left to stream the chunks read so far and the rest.
+    """
+    chunks = response.body_iterator
+    buffered = []
+    size = 0
+    async for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            response.body_iterator = resume_async(buffered, chunks)
+            return None
+    return b''.join(buffered)
+
+async def resume_async(buffered, rest):
+    for chunk in buffered:
+        yield chunk
+    async for chunk in rest:
+        yield chunk
+
+def conditional(endpoint):
+    """
+    Adds an `ETag` to successful responses, and answers `304 Not Modified` when it matches `If-None-Match`.
+    Streamed responses are only read whole to compute it when smaller than `CONDITIONAL_MAX_BYTES`.
+    """
+    @wraps(endpoint)
+    async def wrapper(request):
+        response = await endpoint(request)
+        if response.status_code != 200:
+            return response
+        if isinstance(response, StreamingResponse):
+            body = await read_small(response, CONDITIONAL_MAX_BYTES)
+            if body is None:
+                return response
+        else:
+            body = response.body
+
+        headers = {name: value for name, value in response.headers.items() if name != 'content-length'}
+        headers['etag'] = etag(body)
+        headers['cache-control'] = 'no-cache'
+        if parse_etags(request.headers.get('if-none-match')).contains_weak(headers['etag'].strip('"')):
+            return Response(status_code=304, headers=headers, background=response.background)
+        return Response(body, headers=headers, background=response.background)
+
+    return wrapper
+
+async def tee(chunks, capture):
+    async for chunk in chunks:
+        capture.add(chunk)
+        yield chunk
+    capture.finish()
+
+async def read_json(request):
+    # Starlette's `request.json()` lets a malformed body fail the request with a 500.
+    return parse_json(await request.body())
+
+async def stream(documents, cleanup, mimetype):
+    chunks = encode(documents, mimetype)
+    try:
+        while (chunk := await run(next, chunks, None)) is not None:
+            yield chunk
+    except BaseException:
+        await run(cleanup.__exit__, *sys.exc_info())
+        raise
+    await run(cleanup.close)
+
+async def list_response(request, query, limit=None, cursor_of=None):
+    mimetype = negotiate(parse_accept_header(request.headers.get('accept'), MIMEAccept))
+    headers = {'Vary': 'Accept'}
+    if limit is None:
+        documents, cleanup = await run(open_stream, read_pool.transaction(), lambda tx: tx.query(query).resolve().as_concept_documents())
+        return StreamingResponse(stream(documents, cleanup, mimetype), media_type=mimetype, headers=headers, background=BackgroundTask(run, cleanup.close))
+
+    page = await run(read_page, query, limit)
+    cursor = next_cursor(page, limit, cursor_of)
+    if cursor is not None:
+        headers['X-Next-Cursor'] = cursor
+    return Response(b''.join(encode(page[:limit], mimetype)), media_type=mimetype, headers=headers)
+
+async def index(request):
+    return JSONResponse({"message": "Python ASGI backend is running"})
+
+async def get_stats(request):
+    return JSONResponse(stats())
+
+async def get_metrics(request):
+    return PlainTextResponse(metrics.prometheus(), media_type='text/plain; version=0.0.4')
+
+@conditional
+@cached('pages', RESPONSE_CACHE_TTL_SECONDS['pages'])
+async def get_page_list(request):
+    query, limit = paginated_query(request.query_params, queries.page_list_query, arity=1)
+    return await list_response(request, query, limit, page_cursor)
+
+async def post_page_batch(request):
+    return JSONResponse(await run(read_pages, batch_ids(await read_json(request), PAGE_BATCH_MAX_IDS), selected_fields(request.query_params.get('fields'))))
+
+async def get_location_page_list(request):
+    place_id = request.path_params['place_id']
+    place_ids = place_index.within(place_id) if place_index is not None else None
+    return await list_response(request, queries.location_query(place_id, place_ids))
+
+async def post_places_refresh(request):
+    if place_index is None:
+        return JSONResponse({'error': 'The place index is not enabled'}, status_code=404)
+    await run(place_index.refresh)
+    response_cache.clear()
+    return JSONResponse(place_index.stats())
+
+@conditional
+@cached('page', RESPONSE_CACHE_TTL_SECONDS['page'])
+async def get_page(request):
+    return JSONResponse(await run(read_page_document, request.path_params['id'], selected_fields(request.query_params.get('fields'))))
+
+@conditional
+@cached('posts', RESPONSE_CACHE_TTL_SECONDS['posts'])
+async def get_posts(request):
+    page_id = request.query_params.get('pageId')
+    if not page_id:
+        return JSONResponse({'error': 'Missing pageId'}, status_code=400)
+    query, limit = paginated_query(request.query_params, queries.posts_query, page_id, arity=2)
+    return await list_response(request, query, limit, post_cursor)
+
+@conditional
+async def get_comments(request):
+    post_id = request.query_params.get('postId')
+    if not post_id:
+        return JSONResponse({'error': 'Missing postId'}, status_code=400)
+    query, limit = paginated_query(request.query_params, queries.comments_query, post_id, arity=2)
+    return await list_response(request, query, limit, comment_cursor)
+
+async def create(query):
+    if write_behind is not None:
+        # Awaited on the event loop, so waiting for the batch does not hold an executor thread.
+        await asyncio.wrap_future(write_behind.submit(query))
+    else:
+        await run(commit, query)
+
+async def post_create_user(request):
+    await create(queries.create_user_query(await read_json(request)))
+    return JSONResponse(None)
+
+async def post_create_group(request):
+    await create(queries.create_group_query(await read_json(request)))
+    return JSONResponse(None)
+
+async def post_create_organization(request):
+    await create(queries.create_organization_query(await read_json(request)))
+    return JSONResponse(None)
+
+async def post_create_friendship(request):
+    if not await run(create_friendship, await read_json(request)):
+        return JSONResponse({'error': 'Unknown person'}, status_code=404)
+    return JSONResponse(None)
+
+async def post_create_following(request):
+    if not await run(create_following, await read_json(request)):
+        return JSONResponse({'error': 'Unknown page or follower'}, status_code=404)
+    return JSONResponse(None)
+
+async def bulk_create(request, build_query):
+    chunk_size = chunk_size_arg(request.query_params, BULK_CREATE_CHUNK_SIZE, BULK_CREATE_MAX_ITEMS)
+    return JSONResponse(await run(bulk_write, build_query, await read_json(request), chunk_size, BULK_CREATE_MAX_ITEMS))
+
+async def post_create_users(request):
+    return await bulk_create(request, queries.create_user_query)
+
+async def post_create_groups(request):
+    return await bulk_create(request, queries.create_group_query)
+
+async def post_create_organizations(request):
+    return await bulk_create(request, queries.create_organization_query)
+
+async def get_media(request):
+    blob = await run(media_store.lookup, request.path_params['id'])
+    if blob is None:
+        return Response(status_code=404)
+    headers = {'etag': quote_etag(blob.etag), **media_headers(blob)}
+    if parse_etags(request.headers.get('if-none-match')).contains_weak(blob.etag):
+        return Response(status_code=304, headers=headers)
+    if 'range' not in request.headers:
+        body = await run(media_store.read_small, blob)
+        if body is not None:
+            return Response(body, media_type=blob.content_type, headers=headers)
+    # Served from disk, with range support. Servers implementing the zero-copy send extension use sendfile.
+    return FileResponse(blob.path, media_type=blob.content_type, headers=headers)
+
+async def post_media(request):
+    upload = await run(media_store.upload)
+    try:
+        async for chunk in request.stream():
+            await run(upload.write, chunk)
+    except BaseException:
+        await run(upload.abort)
+        raise
+    return JSONResponse({'id': await run(upload.commit, request.headers.get('content-type'))})
+
+async def handle_error(request, error):
+    return JSONResponse(error_body(error), status_code=ERROR_STATUSES[type(error)])
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    if place_index is not None:
+        place_index.close()
+    if page_counters is not None:
+        page_counters.close()
+    if write_behind is not None:
+        write_behind.close()
+    if slow_query_log is not None:
+        slow_query_log.close()
+    read_pool.close()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/api/stats', get_stats),
+        Route('/metrics', get_metrics),
+        Route('/api/pages', get_page_list),
+        Route('/api/pages/batch', post_page_batch, methods=['POST']),
+        Route('/api/location/{place_id}', get_location_page_list),
+        Route('/api/places/refresh', post_places_refresh, methods=['POST']),
+        Route('/api/user/{id}', get_page),
+        Route('/api/group/{id}', get_page),
+        Route('/api/organization/{id}', get_page),
+        Route('/api/posts', get_posts),
+        Route('/api/comments', get_comments),
+        Route('/api/create-user', post_create_user, methods=['POST']),
+        Route('/api/create-group', post_create_group, methods=['POST']),
+        Route('/api/create-organization', post_create_organization, methods=['POST']),
+        Route('/api/create-friendship', post_create_friendship, methods=['POST']),
+        Route('/api/create-following', post_create_following, methods=['POST']),
+        Route('/api/create-users:bulk', post_create_users, methods=['POST']),
+        Route('/api/create-groups:bulk', post_create_groups, methods=['POST']),
+        Route('/api/create-organizations:bulk', post_create_organizations, methods=['POST']),
+        Route('/api/media/{id}', get_media),
+        Route('/api/media', post_media, methods=['POST']),
+    ],
+    middleware=[
+        *([Middleware(CompressionMiddleware)] if COMPRESSION_ENABLED else []),
+        *([Middleware(TimingMiddleware)] if METRICS_ENABLED else []),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'], expose_headers=['X-Next-Cursor', 'ETag']),
+    ],
+    exception_handlers=dict.fromkeys(ERROR_STATUSES, handle_error),
+    lifespan=lifespan,
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=8080)
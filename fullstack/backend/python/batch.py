@@ -0,0 +1,103 @@
+import time
+from typedb.driver import TransactionType
+import queries
+from services import typedb, read_pool, after_write
+from config import TYPEDB_DATABASE
+
+
+class BatchError(Exception):
+    pass
+
+
+def batch_ids(payload, max_ids):
+    """Accepts either a JSON array of ids or an object with an `ids` array, and returns the distinct ids in order."""
+    ids = payload.get('ids') if isinstance(payload, dict) else payload
+    if not isinstance(ids, list) or not all(isinstance(id, str) for id in ids):
+        raise BatchError("Expected a list of ids.")
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > max_ids:
+        raise BatchError(f"At most {max_ids} ids can be requested at once.")
+    return ids
+
+
+def read_pages(ids, fields=None):
+    """Resolves every id in one transaction and one query. Ids that match no page map to None."""
+    pages = dict.fromkeys(ids)
+    if ids:
+        with read_pool.transaction() as tx:
+            for page in tx.query(queries.page_batch_query(ids, fields)).resolve().as_concept_documents():
+                if page['id'] in pages:
+                    pages[page['id']] = page
+    return pages
+
+
+def _write_chunk(items):
+    with typedb.transaction(TYPEDB_DATABASE, TransactionType.WRITE) as tx:
+        for _, query in items:
+            tx.query(query).resolve()
+        tx.commit()
+
+
+def bulk_write(build_query, payload, chunk_size, max_items):
+    """
+    Accepts either a JSON array of items or an object with an `items` array, and inserts one item per
+    entry, committing every `chunk_size` items. A failing item does not abort the batch. Invalid payloads
+    are reported without reaching the database, and a chunk that fails to write is retried one item per
+    transaction, so only the items that actually fail are reported.
+    """
+    payloads = payload.get('items') if isinstance(payload, dict) else payload
+    if not isinstance(payloads, list):
+        raise BatchError("Expected a list of items.")
+    if len(payloads) > max_items:
+        raise BatchError(f"At most {max_items} items can be created at once.")
+
+    started = time.monotonic()
+    errors = []
+    items = []
+    for index, payload in enumerate(payloads):
+        try:
+            items.append((index, build_query(payload)))
+        except (KeyError, TypeError, AttributeError, ValueError) as error:
+            errors.append({'index': index, 'error': f"Invalid item: {error!r}"})
+
+    created = 0
+    transactions = 0
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        transactions += 1
+        try:
+            _write_chunk(chunk)
+            created += len(chunk)
+        except Exception:
+            for item in chunk:
+                transactions += 1
+                try:
+                    _write_chunk([item])
+                    created += 1
+                except Exception as error:
+                    errors.append({'index': item[0], 'error': str(error)})
+
+    if created:
+        after_write()
+
+    seconds = time.monotonic() - started
+    errors.sort(key=lambda error: error['index'])
+    return {
+        'created': created,
+        'failed': len(errors),
+        'errors': errors,
+        'transactions': transactions,
+        'seconds': seconds,
+        'itemsPerSecond': created / seconds if seconds > 0 else None,
+    }
+
+
+def chunk_size_arg(args, default, max_items):
+    chunk_size = args.get('chunkSize', default)
+    try:
+        chunk_size = int(chunk_size)
+    except ValueError:
+        raise BatchError("chunkSize must be an integer.") from None
+    if not 1 <= chunk_size <= max_items:
+        raise BatchError(f"chunkSize must be between 1 and {max_items}.")
+    return chunk_size
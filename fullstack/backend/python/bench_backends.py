@@ -0,0 +1,93 @@
+"""
+Closed-loop load comparison between running backends, e.g. the Flask and ASGI entry points.
+
+Start each backend pinned to the same cores, so the comparison is at equal core count:
+
+    taskset -c 0-1 python app.py                               # Flask, port 8080
+    taskset -c 0-1 uvicorn asgi:app --port 8081 --workers 1    # ASGI
+
+then drive both with the same workload:
+
+    python bench_backends.py flask=http://localhost:8080 asgi=http://localhost:8081 --concurrency 200
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from urllib.error import URLError
+
+ENDPOINTS = ["/api/pages", "/api/user/{page_id}", "/api/posts?pageId={page_id}"]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run(base_url, paths, concurrency, duration, timeout):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        nonlocal errors
+        position = index
+        while time.monotonic() < deadline:
+            path = paths[position % len(paths)]
+            position += 1
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + path, timeout=timeout) as response:
+                    response.read()
+                ok = True
+            except (URLError, OSError):
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    threads = [threading.Thread(target=client, args=(index,), daemon=True) for index in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50Ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p95Ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+        "p99Ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="+", metavar="NAME=URL")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--page-id", default="SarahGiven225")
+    args = parser.parse_args()
+
+    paths = [endpoint.format(page_id=args.page_id) for endpoint in ENDPOINTS]
+    results = {}
+    for target in args.targets:
+        name, _, url = target.partition("=")
+        results[name] = run(url.rstrip("/"), paths, args.concurrency, args.duration, args.timeout)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Wire size and CPU cost of response compression on real responses.
+
+Fetches uncompressed responses from a running backend with the social network dataset loaded:
+the page list, and the page and posts of the first `--pages` pages. Each codec then compresses
+the same bodies, whole and in streamed chunks:
+
+    python bench_compression.py --base-url http://localhost:8080 --pages 50
+"""
+
+import argparse
+import json
+import time
+import urllib.request
+from compression import Compression, brotli
+from streaming import CHUNK_SIZE
+
+CODECS = [("gzip", level) for level in (1, 6, 9)] + [("br", quality) for quality in (1, 4, 11)]
+
+
+def fetch(base_url, path):
+    request = urllib.request.Request(base_url + path, headers={"Accept-Encoding": "identity"})
+    with urllib.request.urlopen(request) as response:
+        return response.read()
+
+
+def bodies(base_url, pages):
+    page_list = fetch(base_url, "/api/pages")
+    result = {"/api/pages": [page_list]}
+    ids = [page["id"] for page in json.loads(page_list) if page.get("id")][:pages]
+    result["/api/user/<id>"] = [fetch(base_url, f"/api/user/{id}") for id in ids]
+    result["/api/posts?pageId=<id>"] = [fetch(base_url, f"/api/posts?pageId={id}") for id in ids]
+    return result
+
+
+def measure(compression, encoding, bodies, streamed):
+    compressed = 0
+    started = time.process_time()
+    for body in bodies:
+        if streamed:
+            chunks = [body[offset:offset + CHUNK_SIZE] for offset in range(0, len(body), CHUNK_SIZE)]
+            compressed += sum(len(chunk) for chunk in compression.compress_stream(chunks[:1], iter(chunks[1:]), encoding))
+        else:
+            compressed += len(compression.compress(body, encoding))
+    return compressed, time.process_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8080")
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+
+    results = {}
+    for route, route_bodies in bodies(args.base_url.rstrip("/"), args.pages).items():
+        raw = sum(len(body) for body in route_bodies)
+        results[route] = {"responses": len(route_bodies), "bytes": raw, "codecs": {}}
+        for encoding, level in CODECS:
+            if encoding == "br" and brotli is None:
+                continue
+            compression = Compression(0, gzip_level=level, brotli_quality=level)
+            for streamed in (False, True):
+                compressed, seconds = measure(compression, encoding, route_bodies, streamed)
+                name = f"{encoding}-{level}" + ("-streamed" if streamed else "")
+                results[route]["codecs"][name] = {
+                    "bytes": compressed,
+                    "ratio": compressed / raw if raw else None,
+                    "cpuMs": seconds * 1000,
+                    "mbPerCpuSecond": raw / seconds / 1e6 if seconds else None,
+                }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
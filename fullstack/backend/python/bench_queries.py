@@ -0,0 +1,40 @@
+"""
+Microbenchmark of per-request query build cost: registered templates against the f-string builders they replaced.
+
+The f-string builders are the originals, frozen in tests/legacy_queries.py, so the baseline is what was replaced.
+
+    python bench_queries.py [--iterations N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import queries
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests'))
+import legacy_queries
+
+
+CASES = [
+    ("location", legacy_queries.location_query, queries.location_query, {"place_id": "plc-europe/northern-europe/united-kingdom/london"}),
+    ("page", legacy_queries.page_query, queries.page_query, {"id": "SarahGiven225"}),
+    ("posts", legacy_queries.posts_query, queries.posts_query, {"page_id": "SarahGiven225"}),
+    ("comments", legacy_queries.comments_query, queries.comments_query, {"post_id": "pst-3acaaf82374a4cc9a0397e67926146de"}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'query':<10} {'f-string (ns)':>14} {'template (ns)':>14} {'ratio':>7}")
+    for name, legacy, builder, params in CASES:
+        legacy_ns = min(timeit.repeat(lambda: legacy(**params), number=args.iterations, repeat=5)) / args.iterations * 1e9
+        template_ns = min(timeit.repeat(lambda: builder(*params.values()), number=args.iterations, repeat=5)) / args.iterations * 1e9
+        print(f"{name:<10} {legacy_ns:>14.0f} {template_ns:>14.0f} {template_ns / legacy_ns:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
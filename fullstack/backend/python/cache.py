@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, request
+
+
+class _CachedResponse:
+    def __init__(self, body, status, headers, expires_at):
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.expires_at = expires_at
+
+
+class _Capture:
+    """Collects a streamed body as it is sent, and caches it once it has been sent in full."""
+
+    def __init__(self, cache, key, status, headers, ttl, generation):
+        self._cache = cache
+        self._key = key
+        self._status = status
+        self._headers = headers
+        self._ttl = ttl
+        self._generation = generation
+        self._body = []
+        self._size = 0
+
+    def add(self, chunk):
+        # Bodies too large to cache are no longer held once they are known to be.
+        if self._size <= self._cache.max_bytes:
+            self._body.append(chunk)
+            self._size += len(chunk)
+
+    def finish(self):
+        if self._size <= self._cache.max_bytes:
+            self._cache.put(self._key, b''.join(self._body), self._status, self._headers, self._ttl, self._generation)
+
+
+class ResponseCache:
+    """
+    An in-process cache of serialized responses, keyed by route and request arguments.
+
+    Entries expire after their route's TTL, and the least recently used entries are evicted once
+    the cached bodies exceed `max_bytes`. Write endpoints must call `clear` after committing. That only
+    clears this process's cache, so other processes serve stale responses for up to their TTL.
+    """
+
+    def __init__(self, max_bytes):
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, _CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+        self._generation = 0
+
+    def cached(self, route, ttl):
+        def decorator(view):
+            if ttl <= 0:
+                return view
+
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = self.key(route, request.path, request.args.items(multi=True), request.headers.get('Accept'))
+                generation = self.generation
+                entry = self.get(key)
+                if entry is not None:
+                    return Response(entry.body, status=entry.status, headers=entry.headers)
+
+                response = view(*args, **kwargs)
+                if isinstance(response, Response) and response.status_code == 200:
+                    headers = [(name, value) for name, value in response.headers if name != 'Content-Length']
+                    if response.is_streamed:
+                        response.response = self._tee(response.response, self.capture(key, response.status_code, headers, ttl, generation))
+                    else:
+                        self.put(key, response.get_data(), response.status_code, headers, ttl, generation)
+                return response
+
+            return wrapper
+
+        return decorator
+
+    @staticmethod
+    def key(route, path, args, accept):
+        """The key of a response, from its query arguments as `(name, value)` pairs in any order."""
+        return (route, path, tuple(sorted(args)), accept)
+
+    def capture(self, key, status, headers, ttl, generation):
+        """Caches a streamed body, passed to the capture chunk by chunk, once it is finished."""
+        return _Capture(self, key, status, headers, ttl, generation)
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @property
+    def generation(self):
+        """Read this before building a response, and pass it to `put` to detect writes committed in between."""
+        return self._generation
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._invalidations += 1
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hitRatio": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
+
+    def prometheus(self):
+        stats = self.stats()
+        return [
+            '# HELP backend_cache_hits_total Responses served from the response cache.',
+            '# TYPE backend_cache_hits_total counter',
+            f'backend_cache_hits_total {stats["hits"]}',
+            '# HELP backend_cache_misses_total Cacheable responses that were not in the response cache.',
+            '# TYPE backend_cache_misses_total counter',
+            f'backend_cache_misses_total {stats["misses"]}',
+            '# HELP backend_cache_bytes Size of the response bodies held in the response cache.',
+            '# TYPE backend_cache_bytes gauge',
+            f'backend_cache_bytes {stats["bytes"]}',
+        ]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._expirations += 1
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def _tee(self, chunks, capture):
+        # Streams the response through unchanged, and caches the body once it has been written in full.
+        try:
+            for chunk in chunks:
+                capture.add(chunk)
+                yield chunk
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+        capture.finish()
+
+    def put(self, key, body, status, headers, ttl, generation):
+        size = len(body)
+        if size > self._max_bytes:
+            return
+
+        entry = _CachedResponse(body, status, headers, time.monotonic() + ttl)
+
+        with self._lock:
+            # A write committed while this response was being built, so it may already be stale.
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, key):
+        self._bytes -= len(self._entries.pop(key).body)
@@ -0,0 +1,168 @@
+import copy
+import threading
+
+
+class CoalescedError(Exception):
+    """Raised in each request that shared a query whose execution failed, from the execution's error."""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.kind = None
+        self.answers = None
+        self.error = None
+        self.followers = 0
+
+
+class _SharedAnswer:
+    """The materialized answer of a query, in the shape of the driver's answer."""
+
+    def __init__(self, kind, answers, copy_documents):
+        self._kind = kind
+        self._answers = answers
+        self._copy_documents = copy_documents
+
+    def is_ok(self):
+        return self._kind == 'ok'
+
+    def is_concept_rows(self):
+        return self._kind == 'rows'
+
+    def is_concept_documents(self):
+        return self._kind == 'documents'
+
+    def as_concept_rows(self):
+        return iter(self._answers)
+
+    def as_concept_documents(self):
+        if self._copy_documents:
+            # Callers may modify their documents, so each one sharing them gets its own.
+            return iter(copy.deepcopy(self._answers))
+        return iter(self._answers)
+
+
+class _Promise:
+    def __init__(self, coalescer, tx, generation, query):
+        self._coalescer = coalescer
+        self._tx = tx
+        self._generation = generation
+        self._query = query
+
+    def resolve(self):
+        return self._coalescer.resolve(self._tx, self._generation, self._query)
+
+
+class CoalescingTransaction:
+    def __init__(self, tx, generation, coalescer):
+        self._tx = tx
+        self._generation = generation
+        self._coalescer = coalescer
+
+    def __getattr__(self, name):
+        return getattr(self._tx, name)
+
+    def query(self, query, *args, **kwargs):
+        if args or kwargs:
+            # Queries with options are rare, and run as they are rather than risk sharing across options.
+            return self._tx.query(query, *args, **kwargs)
+        return _Promise(self._coalescer, self._tx, self._generation, query)
+
+
+class Coalescer:
+    """
+    Single-flight execution of read queries: a query that is already running for another request is not run
+    again, and its callers share the answers of the running one.
+
+    Answers are only shared between transactions opened under the same `generation` of the read pool, which
+    changes on every write, so a query run on a snapshot from before a write never serves one run on a snapshot
+    taken after it. Requests can join a query until its answer starts arriving. If none has, the answer is
+    handed to the request that ran it as the driver streams it. Otherwise it is read in full first, so only a
+    list that is actually shared is no longer streamed from the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[tuple, _Flight] = {}
+        self._executions = 0
+        self._coalesced = 0
+        self._max_fan_out = 0
+
+    def wrap(self, tx, generation):
+        """Wraps a transaction opened under `generation`, which its queries are only shared within."""
+        return CoalescingTransaction(tx, generation, self)
+
+    def resolve(self, tx, generation, query):
+        key = (generation, str(query))
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._executions += 1
+            else:
+                flight.followers += 1
+                self._coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                # A new error per request, so that requests never raise, and add tracebacks to, the same one.
+                raise CoalescedError(f"The shared execution of this query failed: {flight.error!r}") from flight.error
+            return _SharedAnswer(flight.kind, flight.answers, copy_documents=True)
+
+        try:
+            answer = tx.query(query).resolve()
+            if self._land_alone(key, flight):
+                return answer
+            if answer.is_concept_documents():
+                flight.kind, flight.answers = 'documents', list(answer.as_concept_documents())
+            elif answer.is_concept_rows():
+                flight.kind, flight.answers = 'rows', list(answer.as_concept_rows())
+            else:
+                flight.kind, flight.answers = 'ok', []
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            self._land(key, flight)
+        # Only reached with followers, who share the documents, so the leader gets its own copies too.
+        return _SharedAnswer(flight.kind, flight.answers, copy_documents=True)
+
+    def _land_alone(self, key, flight):
+        # Once the flight is gone no request can join it, so its answer can go to the leader as it is streamed.
+        with self._lock:
+            if flight.followers:
+                return False
+            del self._flights[key]
+            return True
+
+    def _land(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            self._max_fan_out = max(self._max_fan_out, flight.followers)
+        flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "inFlight": len(self._flights),
+                "maxFanOut": self._max_fan_out,
+            }
+
+    def prometheus(self):
+        stats = self.stats()
+        return [
+            '# HELP backend_query_executions_total Read queries run against the database.',
+            '# TYPE backend_query_executions_total counter',
+            f'backend_query_executions_total {stats["executions"]}',
+            '# HELP backend_query_coalesced_total Read queries answered by sharing an identical query in flight.',
+            '# TYPE backend_query_coalesced_total counter',
+            f'backend_query_coalesced_total {stats["coalesced"]}',
+            '# HELP backend_query_max_fan_out Most requests that have shared one query execution.',
+            '# TYPE backend_query_max_fan_out gauge',
+            f'backend_query_max_fan_out {stats["maxFanOut"]}',
+        ]
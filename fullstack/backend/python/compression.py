@@ -0,0 +1,116 @@
+import zlib
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+from streaming import head
+
+try:
+    import brotli
+except ImportError:
+    # Optional; without it responses are only ever gzipped.
+    brotli = None
+
+COMPRESSIBLE = ('application/json', 'application/x-ndjson', 'text/')
+
+
+class _Gzip:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        # Flushed after every chunk, so that a streamed response reaches the client as it is produced.
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class Compression:
+    """
+    Negotiates and applies a `Content-Encoding` for response bodies.
+
+    Brotli is preferred when the client accepts it and the `brotli` package is installed, then gzip. Bodies
+    smaller than `min_bytes` are sent as they are, since compressing them saves less than it costs.
+    """
+
+    def __init__(self, min_bytes, gzip_level, brotli_quality):
+        self.min_bytes = min_bytes
+        self._gzip_level = gzip_level
+        self._brotli_quality = brotli_quality
+
+    def negotiate(self, accept_encoding, content_type):
+        if not content_type or not content_type.startswith(COMPRESSIBLE):
+            return None
+        accepted = parse_accept_header(accept_encoding, Accept)
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def compressor(self, encoding):
+        return _Brotli(self._brotli_quality) if encoding == 'br' else _Gzip(self._gzip_level)
+
+    def compress(self, body, encoding):
+        compressor = self.compressor(encoding)
+        return compressor.compress(body) + compressor.finish()
+
+    def head(self, chunks):
+        """Reads a streamed body until at least `min_bytes` have been read, as `streaming.head` does."""
+        return head(chunks, self.min_bytes)
+
+    def compress_stream(self, buffered, chunks, encoding):
+        compressor = self.compressor(encoding)
+        try:
+            yield compressor.compress(b''.join(buffered))
+            for chunk in chunks:
+                if chunk:
+                    yield compressor.compress(chunk)
+            yield compressor.finish()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    def apply(self, response, accept_encoding):
+        """Compresses a Flask response in place, if it is worth it and the client accepts an encoding."""
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+        encoding = self.negotiate(accept_encoding, response.headers.get('Content-Type'))
+        if encoding is None:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if response.is_streamed:
+            buffered, rest = self.head(response.response)
+            if rest is None:
+                response.set_data(b''.join(buffered))
+            else:
+                response.response = self.compress_stream(buffered, rest, encoding)
+                response.headers.pop('Content-Length', None)
+                set_encoding(response.headers, encoding)
+                return response
+
+        body = response.get_data()
+        if len(body) >= self.min_bytes:
+            response.set_data(self.compress(body, encoding))
+            set_encoding(response.headers, encoding)
+        return response
+
+
+def set_encoding(headers, encoding):
+    headers['Content-Encoding'] = encoding
+    # The compressed body is a different representation of the same content, so its validator is weak.
+    tag = headers.get('ETag')
+    if tag and not tag.startswith('W/'):
+        headers['ETag'] = 'W/' + tag
@@ -0,0 +1,37 @@
+import hashlib
+from functools import wraps
+from flask import make_response, request
+from werkzeug.http import quote_etag
+from streaming import head, resume
+from config import CONDITIONAL_MAX_BYTES
+
+
+def etag(body):
+    """A strong validator computed from the serialized body, so it changes exactly when the content does."""
+    return quote_etag(hashlib.blake2b(body, digest_size=16).hexdigest())
+
+
+def conditional(view):
+    """
+    Adds an `ETag` to successful responses, and answers `304 Not Modified` when it matches `If-None-Match`.
+
+    Streamed responses are read whole when they are smaller than `CONDITIONAL_MAX_BYTES`, so that lists polled
+    without pagination get an `ETag` too. Larger ones are streamed on without one, rather than held in memory.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        if response.is_streamed:
+            buffered, rest = head(response.response, CONDITIONAL_MAX_BYTES)
+            if rest is not None:
+                response.response = resume(buffered, rest)
+                return response
+            response.set_data(b''.join(buffered))
+
+        response.headers['ETag'] = etag(response.get_data())
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    return wrapper
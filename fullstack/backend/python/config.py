@@ -5,3 +5,67 @@ TYPEDB_USERNAME = os.getenv("TYPEDB_USERNAME", "admin")
 TYPEDB_PASSWORD = os.getenv("TYPEDB_PASSWORD", "password")
 TYPEDB_TLS_ENABLED = os.getenv("TYPEDB_TLS_ENABLED", "false").lower() == "true"
 TYPEDB_DATABASE = os.getenv("TYPEDB_DATABASE", "social-network")
+
+TYPEDB_READ_POOL_SIZE = int(os.getenv("TYPEDB_READ_POOL_SIZE", "8"))
+TYPEDB_READ_POOL_MAX_AGE_SECONDS = float(os.getenv("TYPEDB_READ_POOL_MAX_AGE_SECONDS", "30"))
+TYPEDB_READ_POOL_MAX_USES = int(os.getenv("TYPEDB_READ_POOL_MAX_USES", "1000"))
+TYPEDB_READ_POOL_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("TYPEDB_READ_POOL_ACQUIRE_TIMEOUT_SECONDS", "10"))
+TYPEDB_READ_POOL_REFRESH_INTERVAL_SECONDS = float(os.getenv("TYPEDB_READ_POOL_REFRESH_INTERVAL_SECONDS", "1"))
+
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Writes only clear the cache of the process that served them, so with several workers (or writes made
+# outside the API) a response can be stale for up to its route's TTL.
+RESPONSE_CACHE_TTL_SECONDS = {
+    "pages": float(os.getenv("RESPONSE_CACHE_PAGES_TTL_SECONDS", "30")),
+    "page": float(os.getenv("RESPONSE_CACHE_PAGE_TTL_SECONDS", "10")),
+    "posts": float(os.getenv("RESPONSE_CACHE_POSTS_TTL_SECONDS", "5")),
+}
+
+PAGINATION_MAX_LIMIT = int(os.getenv("PAGINATION_MAX_LIMIT", "100"))
+
+ASGI_EXECUTOR_THREADS = int(os.getenv("ASGI_EXECUTOR_THREADS", "16"))
+
+SERVER_BIND = os.getenv("SERVER_BIND", "0.0.0.0:8080")
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "8"))
+SERVER_WORKER_CLASS = os.getenv("SERVER_WORKER_CLASS", "gthread")
+
+PAGE_BATCH_MAX_IDS = int(os.getenv("PAGE_BATCH_MAX_IDS", "100"))
+
+BULK_CREATE_CHUNK_SIZE = int(os.getenv("BULK_CREATE_CHUNK_SIZE", "500"))
+BULK_CREATE_MAX_ITEMS = int(os.getenv("BULK_CREATE_MAX_ITEMS", "10000"))
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+WRITE_BEHIND_LINGER_MS = float(os.getenv("WRITE_BEHIND_LINGER_MS", "10"))
+WRITE_BEHIND_MAX_ITEMS = int(os.getenv("WRITE_BEHIND_MAX_ITEMS", "100"))
+
+# Each process keeps its own counters and only counts its own writes, so they would drift apart between
+# several workers. The setting is ignored unless there is a single one.
+COUNTER_CACHE_ENABLED = os.getenv("COUNTER_CACHE_ENABLED", "false").lower() == "true" and SERVER_WORKERS == 1
+COUNTER_CACHE_REFRESH_INTERVAL_SECONDS = float(os.getenv("COUNTER_CACHE_REFRESH_INTERVAL_SECONDS", "60"))
+
+PLACE_INDEX_ENABLED = os.getenv("PLACE_INDEX_ENABLED", "false").lower() == "true"
+PLACE_INDEX_REFRESH_INTERVAL_SECONDS = float(os.getenv("PLACE_INDEX_REFRESH_INTERVAL_SECONDS", "300"))
+
+COALESCING_ENABLED = os.getenv("COALESCING_ENABLED", "true").lower() == "true"
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Empty disables the log. "{pid}" is replaced with the process id.
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", "")
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(16 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+
+# Streamed lists smaller than this are read whole to compute their ETag; larger ones are sent without one.
+CONDITIONAL_MAX_BYTES = int(os.getenv("CONDITIONAL_MAX_BYTES", str(256 * 1024)))
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", "media")
+MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", str(20 * 1024 * 1024)))
+MEDIA_MEMORY_CACHE_BYTES = int(os.getenv("MEDIA_MEMORY_CACHE_BYTES", str(32 * 1024 * 1024)))
+MEDIA_MEMORY_CACHE_MAX_ITEM_BYTES = int(os.getenv("MEDIA_MEMORY_CACHE_MAX_ITEM_BYTES", str(64 * 1024)))
@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+import queries
+
+logger = logging.getLogger(__name__)
+
+
+class PageCounters:
+    """
+    Friend and follower counts per page id, so that profile reads need not count relations on every view.
+
+    The counts are loaded in bulk by `refresh`, again every `refresh_interval` seconds (never, if 0), and
+    kept up to date in between by the backend's own writes through `add_friendship` and `add_following`.
+    Relations written by other clients are picked up by the next refresh, so counts lag them by at most
+    one interval. Pages created since the last refresh are not counted, so reads of them fall back to
+    counting.
+    """
+
+    def __init__(self, transaction, refresh_interval):
+        self._transaction = transaction
+        self._refresh_interval = refresh_interval
+        self._counts: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._refresher = None
+        self._loaded_at = None
+
+    def start(self):
+        self.refresh()
+        if self._refresh_interval > 0:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="page-counters-refresher", daemon=True)
+            self._refresher.start()
+        return self
+
+    def close(self):
+        self._closed.set()
+        if self._refresher is not None:
+            self._refresher.join()
+
+    def refresh(self):
+        started = time.monotonic()
+        with self._transaction() as tx:
+            counts = {_value(row, 'id'): [0, 0] for row in tx.query(queries.PAGE_IDS_QUERY).resolve().as_concept_rows()}
+            for index, query in enumerate([queries.FRIEND_COUNTS_QUERY, queries.FOLLOWER_COUNTS_QUERY]):
+                for row in tx.query(query).resolve().as_concept_rows():
+                    counts.setdefault(_value(row, 'id'), [0, 0])[index] = _value(row, 'count')
+        with self._lock:
+            self._counts = counts
+        self._loaded_at = time.time()
+        logger.info("Counted friends and followers of %d pages in %.2fs.", len(counts), time.monotonic() - started)
+
+    def _refresh_loop(self):
+        while not self._closed.wait(self._refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Refreshing the page counters failed; keeping the previous counts.")
+
+    def get(self, id):
+        with self._lock:
+            counts = self._counts.get(id)
+            return None if counts is None else {'numberOfFriends': counts[0], 'numberOfFollowers': counts[1]}
+
+    def add_friendship(self, page_id, friend_id):
+        with self._lock:
+            for id in (page_id, friend_id):
+                if id in self._counts:
+                    self._counts[id][0] += 1
+
+    def add_following(self, page_id):
+        with self._lock:
+            if page_id in self._counts:
+                self._counts[page_id][1] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"pages": len(self._counts), "loadedAt": self._loaded_at}
+
+
+def _value(row, column):
+    return row.get(column).try_get_value()
+
@@ -0,0 +1,26 @@
+# Production launcher for the Flask backend: gunicorn -c gunicorn.conf.py app:app
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import SERVER_BIND, SERVER_WORKERS, SERVER_THREADS, SERVER_WORKER_CLASS
+
+bind = SERVER_BIND
+workers = SERVER_WORKERS
+threads = SERVER_THREADS
+worker_class = SERVER_WORKER_CLASS
+
+# The app must be imported after the fork, so that every worker creates its own driver and transaction pool.
+preload_app = False
+
+
+def post_worker_init(worker):
+    # Runs in the worker after the app is loaded and before it accepts connections.
+    from warmup import warm_up
+    logging.basicConfig(level=logging.INFO)
+    try:
+        warm_up()
+    except Exception:
+        worker.log.exception("Warm-up failed; worker %s will serve cold.", worker.pid)
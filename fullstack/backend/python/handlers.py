@@ -0,0 +1,133 @@
+# Request handling shared by the Flask app (app.py) and the ASGI app (asgi.py), which only adapt it to their
+# request and response types, so that the two servers answer every request the same way.
+
+import json
+from itertools import islice
+from typedb.driver import TransactionType
+import queries
+from pool import PoolTimeoutError
+from metrics import metrics
+from services import typedb, read_pool, response_cache, coalescer, page_counters, place_index, slow_query_log, media_store, write_behind, after_write
+from media import MediaTooLargeError
+from pages import FieldSelectionError, fetch_page
+from pagination import PaginationError, encode_cursor, page_args
+from batch import BatchError
+from config import TYPEDB_DATABASE, PAGINATION_MAX_LIMIT
+
+
+class RequestBodyError(Exception):
+    pass
+
+
+class PageNotFoundError(Exception):
+    pass
+
+
+# The status each error raised while handling a request is answered with, along with its message.
+ERROR_STATUSES = {
+    RequestBodyError: 400,
+    PaginationError: 400,
+    BatchError: 400,
+    FieldSelectionError: 400,
+    PageNotFoundError: 404,
+    MediaTooLargeError: 413,
+    PoolTimeoutError: 503,
+}
+
+
+def error_body(error):
+    return {'error': str(error)}
+
+
+def parse_json(body):
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise RequestBodyError("Malformed JSON body.") from None
+
+
+def stats():
+    stats = {"readPool": read_pool.stats(), "responseCache": response_cache.stats(), "latency": metrics.stats()}
+    if coalescer is not None:
+        stats["coalescing"] = coalescer.stats()
+    if page_counters is not None:
+        stats["pageCounters"] = page_counters.stats()
+    if place_index is not None:
+        stats["placeIndex"] = place_index.stats()
+    if slow_query_log is not None:
+        stats["slowQueryLog"] = slow_query_log.stats()
+    stats["media"] = media_store.stats()
+    if write_behind is not None:
+        stats["writeBehind"] = write_behind.stats()
+    return stats
+
+
+def paginated_query(args, builder, *builder_args, arity):
+    limit, after = page_args(args, arity, PAGINATION_MAX_LIMIT)
+    if limit is None:
+        return builder(*builder_args), None
+    try:
+        # One extra row is fetched to tell whether another page follows.
+        return builder(*builder_args, limit=limit + 1, after=after), limit
+    except ValueError:
+        raise PaginationError("Malformed cursor.") from None
+
+
+def read_page(query, limit):
+    """Reads one page of a paginated query, with the extra row that tells whether another page follows."""
+    with read_pool.transaction() as tx:
+        return list(islice(tx.query(query).resolve().as_concept_documents(), limit + 1))
+
+
+def next_cursor(page, limit, cursor_of):
+    return encode_cursor(cursor_of(page[limit - 1])) if len(page) > limit else None
+
+
+# The values each list endpoint's cursor is made of, in its sort order.
+def page_cursor(page):
+    return [page['id']]
+
+
+def post_cursor(post):
+    return [post['creationTimestamp'], post['postId']]
+
+
+def comment_cursor(comment):
+    return [comment['creationTimestamp'], comment['commentId']]
+
+
+def read_page_document(id, fields):
+    with read_pool.transaction() as tx:
+        page = fetch_page(tx, id, fields)
+    if page is None:
+        # Raised rather than returned, so that neither the response cache nor the ETag sees a missing page.
+        raise PageNotFoundError("Unknown page")
+    return page
+
+
+def commit(query):
+    with typedb.transaction(TYPEDB_DATABASE, TransactionType.WRITE) as tx:
+        tx.query(query).resolve()
+        tx.commit()
+    after_write()
+
+
+def write_relation(query, count):
+    with typedb.transaction(TYPEDB_DATABASE, TransactionType.WRITE) as tx:
+        inserted = any(True for _ in tx.query(query).resolve().as_concept_rows())
+        tx.commit()
+    # Counted before the response cache is cleared, so that no stale count can be cached in between.
+    if inserted and page_counters is not None:
+        count()
+    after_write()
+    return inserted
+
+
+def create_friendship(payload):
+    """Returns False, without writing anything, if either person does not exist."""
+    return write_relation(queries.create_friendship_query(payload), lambda: page_counters.add_friendship(payload['pageId'], payload['friendId']))
+
+
+def create_following(payload):
+    """Returns False, without writing anything, if the page or the follower does not exist."""
+    return write_relation(queries.create_following_query(payload), lambda: page_counters.add_following(payload['pageId']))
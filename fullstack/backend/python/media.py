@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Read and written in chunks of this many bytes, so that uploads are never held in memory whole.
+CHUNK_SIZE = 64 * 1024
+
+# Blobs never change once stored, since their id is their digest.
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Served for any upload whose type is not an image or video type, so that browsers never render it inline.
+FALLBACK_TYPE = 'application/octet-stream'
+
+_ID = re.compile(r'med-([0-9a-f]{32})', re.ASCII)
+
+# Only image and video types are served as uploaded. SVG images can carry scripts, so they are not.
+_MEDIA_TYPE = re.compile(r'(image|video)/[a-z0-9][a-z0-9!#$&^_.+-]*', re.ASCII)
+_UNSAFE_TYPES = frozenset({'image/svg+xml'})
+
+
+def media_type(content_type):
+    """The type a blob uploaded as `content_type` is stored and served with, without parameters."""
+    essence = (content_type or '').split(';', 1)[0].strip().lower()
+    if _MEDIA_TYPE.fullmatch(essence) and essence not in _UNSAFE_TYPES:
+        return essence
+    return FALLBACK_TYPE
+
+
+def response_headers(blob):
+    """
+    Headers for serving a blob. Browsers are told not to sniff its type, and to download, rather than
+    display, anything that is not an image or a video.
+    """
+    headers = {'Cache-Control': CACHE_CONTROL, 'X-Content-Type-Options': 'nosniff'}
+    if blob.content_type == FALLBACK_TYPE:
+        headers['Content-Disposition'] = 'attachment'
+    return headers
+
+
+class MediaTooLargeError(Exception):
+    pass
+
+
+class Blob:
+    def __init__(self, id, path, content_type, size):
+        self.id = id
+        self.path = path
+        self.content_type = content_type
+        self.size = size
+
+    @property
+    def etag(self):
+        return self.id
+
+
+class Upload:
+    """A blob being written. Its id is only known, and the blob only visible, once it is committed."""
+
+    def __init__(self, store):
+        self._store = store
+        self._digest = hashlib.blake2b(digest_size=16)
+        self._size = 0
+        descriptor, self._path = tempfile.mkstemp(dir=store.incoming)
+        self._file = os.fdopen(descriptor, 'wb')
+
+    def write(self, chunk):
+        self._size += len(chunk)
+        if self._size > self._store.max_bytes:
+            raise MediaTooLargeError(f"Uploads are limited to {self._store.max_bytes} bytes.")
+        self._digest.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self, content_type):
+        """Stores the blob with the type `media_type` allows for `content_type`, and returns its id."""
+        try:
+            self._file.close()
+            id = 'med-' + self._digest.hexdigest()
+            path = self._store.blob_path(id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._store.write_atomically(path + '.type', media_type(content_type).encode('ascii'))
+            # Atomic, so a reader sees either no blob or the whole blob. Storing the same content twice is harmless.
+            os.replace(self._path, path)
+        except BaseException:
+            self.abort()
+            raise
+        return id
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
+
+
+class MediaStore:
+    """
+    Uploaded media, stored on disk under the digest of their content, so identical uploads share one blob.
+
+    Blobs of at most `memory_item_bytes`, such as thumbnails, are also kept in an in-memory LRU of up to
+    `memory_bytes`, so hot ones are served without touching the disk.
+    """
+
+    def __init__(self, root, max_bytes, memory_bytes, memory_item_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.incoming = os.path.join(root, 'incoming')
+        os.makedirs(self.incoming, exist_ok=True)
+        self._memory_bytes = memory_bytes
+        self._memory_item_bytes = memory_item_bytes
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def upload(self):
+        return Upload(self)
+
+    def blob_path(self, id):
+        digest = _ID.fullmatch(id).group(1)
+        return os.path.join(self.root, 'blobs', digest[:2], digest)
+
+    def write_atomically(self, path, content):
+        # Written beside the uploads in progress, on the same file system, so that the rename is atomic.
+        descriptor, temporary = tempfile.mkstemp(dir=self.incoming)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(content)
+            os.replace(temporary, path)
+        except BaseException:
+            try:
+                os.remove(temporary)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def lookup(self, id):
+        if not _ID.fullmatch(id):
+            return None
+        path = self.blob_path(id)
+        try:
+            size = os.stat(path).st_size
+            with open(path + '.type', 'rb') as type_file:
+                content_type = type_file.read().decode('ascii', errors='replace')
+        except FileNotFoundError:
+            return None
+        # Checked again, for blobs stored before uploaded types were.
+        return Blob(id, path, media_type(content_type), size)
+
+    def read_small(self, blob):
+        """The blob's content from memory, reading it in on a miss. Returns None for blobs too large to keep."""
+        if blob.size > self._memory_item_bytes:
+            return None
+        with self._lock:
+            body = self._memory.get(blob.id)
+            if body is not None:
+                self._memory.move_to_end(blob.id)
+                self._hits += 1
+                return body
+            self._misses += 1
+
+        with open(blob.path, 'rb') as file:
+            body = file.read()
+        with self._lock:
+            if blob.id not in self._memory:
+                self._memory[blob.id] = body
+                self._memory_used += len(body)
+                while self._memory_used > self._memory_bytes:
+                    _, evicted = self._memory.popitem(last=False)
+                    self._memory_used -= len(evicted)
+        return body
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memoryEntries": len(self._memory),
+                "memoryBytes": self._memory_used,
+                "memoryHits": self._hits,
+                "memoryMisses": self._misses,
+            }
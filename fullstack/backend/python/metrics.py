@@ -0,0 +1,333 @@
+import bisect
+import contextvars
+import threading
+import time
+from functools import wraps
+
+# Upper bounds of the histogram buckets, in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The phases a request is split into, in the order they happen.
+PHASES = ('transaction', 'query', 'iterate', 'serialize')
+
+# Queries beyond this many in one request are timed, but not kept for the request's listeners.
+MAX_QUERIES_PER_REQUEST = 32
+
+_current: contextvars.ContextVar["RequestTimer | None"] = contextvars.ContextVar('request_timer', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction):
+        """Estimates a quantile by interpolating within its bucket, as Prometheus' `histogram_quantile` does."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Latency histograms per route, per request phase and per query template."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._exporters = []
+        self._routes: dict[str, Histogram] = {}
+        self._phases: dict[tuple[str, str], Histogram] = {}
+        self._queries: dict[str, Histogram] = {}
+
+    def _observe(self, histograms, key, seconds):
+        with self._lock:
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def add_listener(self, listener):
+        """Calls `listener` with the timer of every finished request. Listeners run on the request's thread."""
+        self._listeners.append(listener)
+
+    def add_exporter(self, exporter):
+        """Adds the lines returned by `exporter()` to the Prometheus exposition, for metrics kept elsewhere."""
+        self._exporters.append(exporter)
+
+    def observe_request(self, timer):
+        self._observe(self._routes, timer.route, timer.elapsed())
+        for phase, seconds in timer.phases.items():
+            self._observe(self._phases, (timer.route, phase), seconds)
+        for listener in self._listeners:
+            listener(timer)
+
+    def observe_query(self, label, seconds):
+        self._observe(self._queries, label, seconds)
+
+    def stats(self):
+        def summary(histogram):
+            return {
+                "count": histogram.count,
+                "p50": histogram.quantile(0.50),
+                "p95": histogram.quantile(0.95),
+                "p99": histogram.quantile(0.99),
+            }
+
+        with self._lock:
+            return {
+                "routes": {route: summary(histogram) for route, histogram in self._routes.items()},
+                "queries": {label: summary(histogram) for label, histogram in self._queries.items()},
+            }
+
+    def prometheus(self):
+        """The histograms in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            histogram_lines(lines, 'backend_request_duration_seconds', "Time to serve a request, by route.",
+                             {(('route', route),): histogram for route, histogram in self._routes.items()})
+            histogram_lines(lines, 'backend_request_phase_duration_seconds', "Time spent in each phase of a request, by route.",
+                             {(('route', route), ('phase', phase)): histogram for (route, phase), histogram in self._phases.items()})
+            histogram_lines(lines, 'backend_query_duration_seconds', "Time to run a query and read its answers, by query template.",
+                             {(('query', label),): histogram for label, histogram in self._queries.items()})
+        for exporter in self._exporters:
+            lines.extend(exporter())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def histogram_lines(lines, name, help, histograms):
+    """Appends histograms keyed by their labels, as `((label, value), ...)`, in the Prometheus text format."""
+    lines.append(f'# HELP {name} {help}')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, histogram in sorted(histograms.items()):
+        pairs = [f'{key}="{_escape(value)}"' for key, value in labels]
+        selector = '{' + ','.join(pairs) + '}' if pairs else ''
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            bucket = ','.join(pairs + [f'le="{le}"'])
+            lines.append(f'{name}_bucket{{{bucket}}} {cumulative}')
+        lines.append(f'{name}_sum{selector} {histogram.sum!r}')
+        lines.append(f'{name}_count{selector} {histogram.count}')
+
+
+class QueryRecord:
+    def __init__(self, query):
+        self.query = query
+        self.seconds = 0.0
+        self.rows = 0
+
+
+class RequestTimer:
+    """The time one request has spent in each phase so far, with the queries it ran and the bytes it serialized."""
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries: list[QueryRecord] = []
+        self.bytes = 0
+        self.finished = False
+        self.duration = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def add_bytes(self, size):
+        self.bytes += size
+
+    def record_query(self, query):
+        if len(self.queries) >= MAX_QUERIES_PER_REQUEST:
+            return None
+        record = QueryRecord(query)
+        self.queries.append(record)
+        return record
+
+    def elapsed(self):
+        if self.duration is not None:
+            return self.duration
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """A `Server-Timing` header value. Streamed responses only report the phases before their first byte."""
+        entries = [f'{phase};dur={seconds * 1000:.3f}' for phase, seconds in self.phases.items() if seconds]
+        entries.append(f'total;dur={self.elapsed() * 1000:.3f}')
+        return ', '.join(entries)
+
+
+def start_request(route):
+    timer = RequestTimer(route)
+    _current.set(timer)
+    return timer
+
+
+def finish_request(timer):
+    if not timer.finished:
+        timer.finished = True
+        timer.duration = time.perf_counter() - timer.started
+        metrics.observe_request(timer)
+
+
+def current():
+    return _current.get()
+
+
+class timed_phase:
+    """Adds the time spent in the block to the current request's `phase`, if there is a current request."""
+
+    def __init__(self, phase, timer=None):
+        self._phase = phase
+        self._timer = timer or current()
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._timer is not None:
+            self._timer.add(self._phase, time.perf_counter() - self._started)
+
+    def add_bytes(self, size):
+        if self._timer is not None:
+            self._timer.add_bytes(size)
+
+
+def query_label(query):
+    return getattr(query, 'label', None) or 'adhoc'
+
+
+class _TimedAnswer:
+    def __init__(self, answer, label, timer, record, seconds):
+        self._answer = answer
+        self._label = label
+        self._timer = timer
+        self._record = record
+        self._seconds = seconds
+
+    def __getattr__(self, name):
+        return getattr(self._answer, name)
+
+    def as_concept_documents(self):
+        return self._iterate(self._answer.as_concept_documents())
+
+    def as_concept_rows(self):
+        return self._iterate(self._answer.as_concept_rows())
+
+    def _iterate(self, answers):
+        # The query is observed once its answers have been read, or abandoned.
+        seconds = self._seconds
+        rows = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    answer = next(answers)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed = time.perf_counter() - started
+                    seconds += elapsed
+                    if self._timer is not None:
+                        self._timer.add('iterate', elapsed)
+                rows += 1
+                yield answer
+        finally:
+            metrics.observe_query(self._label, seconds)
+            if self._record is not None:
+                self._record.seconds = seconds
+                self._record.rows = rows
+
+
+class _TimedPromise:
+    def __init__(self, promise, query, timer):
+        self._promise = promise
+        self._query = query
+        self._timer = timer
+
+    def resolve(self):
+        started = time.perf_counter()
+        answer = self._promise.resolve()
+        seconds = time.perf_counter() - started
+        record = None
+        if self._timer is not None:
+            self._timer.add('query', seconds)
+            record = self._timer.record_query(self._query)
+            if record is not None:
+                record.seconds = seconds
+        return _TimedAnswer(answer, query_label(self._query), self._timer, record, seconds)
+
+
+class TimedTransaction:
+    """Wraps a transaction so that its queries are timed, by query template and as phases of the current request."""
+
+    def __init__(self, tx, timer):
+        self._tx = tx
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self._tx, name)
+
+    def query(self, query, *args, **kwargs):
+        return _TimedPromise(self._tx.query(query, *args, **kwargs), query, self._timer)
+
+
+def instrument_transaction(tx, acquire_seconds):
+    """A `TransactionPool` instrument, which also counts the time spent waiting for the transaction."""
+    timer = current()
+    if timer is not None:
+        timer.add('transaction', acquire_seconds)
+    return TimedTransaction(tx, timer)
+
+
+class LabeledQuery(str):
+    label: str
+
+    def __new__(cls, text, label):
+        query = super().__new__(cls, text)
+        query.label = label
+        return query
+
+
+def instrument_builders(module):
+    """
+    Wraps every `*_query` builder in `module`, so that the queries they build are labeled for the query
+    histograms: by their template if they were rendered from one, and by the builder's name otherwise.
+    """
+    for name, builder in list(vars(module).items()):
+        if name.endswith('_query') and callable(builder) and not getattr(builder, '_instrumented', False):
+            setattr(module, name, _labeled(name, builder))
+
+
+def _labeled(name, builder):
+    label = name[:-len('_query')]
+
+    @wraps(builder)
+    def wrapper(*args, **kwargs):
+        query = builder(*args, **kwargs)
+        return query if hasattr(query, 'label') else LabeledQuery(query, label)
+
+    wrapper._instrumented = True
+    return wrapper
+
+
+metrics = Metrics()
@@ -0,0 +1,47 @@
+import queries
+from services import page_counters, place_index
+
+
+class FieldSelectionError(Exception):
+    pass
+
+
+def selected_fields(value):
+    """
+    Reads the `fields` query argument, a comma-separated list of page fields. Returns None when it is absent,
+    in which case every field is fetched as before.
+    """
+    if value is None:
+        return None
+    fields = frozenset(field.strip() for field in value.split(',') if field.strip())
+    if not fields:
+        raise FieldSelectionError("Expected at least one field.")
+    unknown = fields.difference(queries.PAGE_FIELDS)
+    if unknown:
+        raise FieldSelectionError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+    return fields
+
+
+def fetch_page(tx, id, fields=None):
+    """
+    Fetches a page, taking its counts and its chain of places from the in-memory indexes where they are enabled.
+    With `fields`, only those fields are fetched.
+    """
+    wanted = queries.PAGE_FIELDS if fields is None else fields
+    counts = None
+    # Counts alone are still queried, since the query also tells whether the page exists.
+    if page_counters is not None and not set(wanted) <= set(queries.PAGE_COUNT_FIELDS):
+        counts = page_counters.get(id)
+    query = queries.page_query(id, counts=counts is None, location=place_index is None, fields=fields)
+    page = next(tx.query(query).resolve().as_concept_documents(), None)
+    if page is None:
+        return None
+    if counts is not None:
+        page.update((name, count) for name, count in counts.items() if name in wanted)
+    if place_index is not None and 'location' in wanted:
+        location = place_index.parent_links(page.pop('locationIds'))
+        if location is None:
+            # The page is in a place added since the index was loaded.
+            location = next(tx.query(queries.page_query(id, fields=('location',))).resolve().as_concept_documents())['location']
+        page['location'] = location
+    return page
@@ -0,0 +1,42 @@
+import base64
+import json
+
+
+class PaginationError(Exception):
+    pass
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, arity):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise PaginationError("Malformed cursor.") from None
+    if not isinstance(values, list) or len(values) != arity or not all(isinstance(value, str) for value in values):
+        raise PaginationError("Malformed cursor.")
+    return tuple(values)
+
+
+def page_args(args, arity, max_limit):
+    """
+    Reads the `limit` and `cursor` query arguments. Returns `(None, None)` when `limit` is absent,
+    in which case the endpoint returns every result as before.
+    """
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    if limit is None:
+        if cursor is not None:
+            raise PaginationError("A cursor requires a limit.")
+        return None, None
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise PaginationError("Limit must be an integer.") from None
+    if not 1 <= limit <= max_limit:
+        raise PaginationError(f"Limit must be between 1 and {max_limit}.")
+
+    return limit, decode_cursor(cursor, arity) if cursor is not None else None
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+import queries
+
+logger = logging.getLogger(__name__)
+
+
+class _Snapshot:
+    def __init__(self, names, parents):
+        self.names = names
+        self.parents = parents
+        self.ancestors = {}
+        for place_id in names:
+            self.ancestors[place_id] = self._ancestors_of(place_id)
+        self.descendants = {place_id: {place_id} for place_id in names}
+        for place_id, ancestors in self.ancestors.items():
+            for ancestor in ancestors:
+                self.descendants[ancestor].add(place_id)
+
+    def _ancestors_of(self, place_id):
+        # Walked, rather than recursed, so that a cycle in the data neither recurses forever nor leaves a place
+        # in the cycle with only the ancestors found before it was reached.
+        ancestors = set()
+        pending = list(self.parents.get(place_id, ()))
+        while pending:
+            parent = pending.pop()
+            if parent in ancestors:
+                continue
+            ancestors.add(parent)
+            known = self.ancestors.get(parent)
+            if known is not None:
+                ancestors |= known
+            else:
+                pending.extend(self.parents.get(parent, ()))
+        ancestors.discard(place_id)
+        return frozenset(ancestors)
+
+
+class PlaceIndex:
+    """
+    The place tree, held in memory with the ancestors and descendants of every place precomputed, so that
+    location lookups become membership tests on place ids instead of recursive functions over the tree.
+
+    The tree is reloaded every `refresh_interval` seconds (never, if 0) and whenever `refresh` is called.
+    Lookups of places missing from the index return None, and should fall back to querying the tree.
+    """
+
+    def __init__(self, transaction, refresh_interval):
+        self._transaction = transaction
+        self._refresh_interval = refresh_interval
+        self._snapshot = _Snapshot({}, {})
+        self._closed = threading.Event()
+        self._refresher = None
+        self._loaded_at = None
+
+    def start(self):
+        self.refresh()
+        if self._refresh_interval > 0:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="place-index-refresher", daemon=True)
+            self._refresher.start()
+        return self
+
+    def close(self):
+        self._closed.set()
+        if self._refresher is not None:
+            self._refresher.join()
+
+    def refresh(self):
+        started = time.monotonic()
+        with self._transaction() as tx:
+            names = {_value(row, 'id'): _value(row, 'name') for row in tx.query(queries.PLACES_QUERY).resolve().as_concept_rows()}
+            parents = {}
+            for row in tx.query(queries.PLACE_PARENTS_QUERY).resolve().as_concept_rows():
+                parents.setdefault(_value(row, 'child-id'), set()).add(_value(row, 'parent-id'))
+        # Replaced whole, so that readers never see a half-built index.
+        self._snapshot = _Snapshot(names, parents)
+        self._loaded_at = time.time()
+        logger.info("Indexed %d places in %.2fs.", len(names), time.monotonic() - started)
+
+    def _refresh_loop(self):
+        while not self._closed.wait(self._refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Refreshing the place index failed; keeping the previous one.")
+
+    def within(self, place_id):
+        """The ids of the place and of every place within it."""
+        return self._snapshot.descendants.get(place_id)
+
+    def parent_links(self, place_ids):
+        """
+        Every (child, parent) link from the given places up to the root, in the shape of the page query's
+        `location` field. Returns None if any place is missing from the index.
+        """
+        snapshot = self._snapshot
+        if any(place_id not in snapshot.names for place_id in place_ids):
+            return None
+        children = set(place_ids)
+        for place_id in place_ids:
+            children |= snapshot.ancestors[place_id]
+        return [
+            {
+                "placeName": snapshot.names[child],
+                "placeId": child,
+                "parentName": snapshot.names[parent],
+                "parentId": parent,
+            }
+            for child in sorted(children)
+            for parent in sorted(snapshot.parents.get(child, ()))
+            if parent in snapshot.names
+        ]
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {"places": len(snapshot.names), "loadedAt": self._loaded_at}
+
+
+def _value(row, column):
+    return row.get(column).try_get_value()
@@ -0,0 +1,255 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typedb.driver import TransactionType
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class _PooledTransaction:
+    def __init__(self, tx, generation):
+        self.tx = tx
+        self.generation = generation
+        self.opened_at = time.monotonic()
+        self.uses = 0
+
+
+class TransactionPool:
+    """
+    A bounded pool of READ transactions shared between requests.
+
+    A read transaction sees a snapshot of the database taken when it was opened, so each pooled
+    transaction is retired after `max_age` seconds or after being handed out `max_uses` times (once per
+    request, however many queries it runs), which bounds how stale a read can be. A background thread
+    replaces retired transactions and keeps the pool topped up, so that requests in the steady state never
+    pay for opening one.
+
+    Writers must call `invalidate` after committing so that later reads observe their changes.
+
+    If `instrument` is given, it is called with each transaction handed out, the seconds spent acquiring it and
+    the generation it was opened under, and what it returns is handed out instead.
+    """
+
+    def __init__(self, driver, database, size, max_age, max_uses, acquire_timeout, refresh_interval, instrument=None):
+        self._driver = driver
+        self._database = database
+        self._size = size
+        self._max_age = max_age
+        self._max_uses = max_uses
+        self._acquire_timeout = acquire_timeout
+        self._refresh_interval = refresh_interval
+        self._instrument = instrument
+        self._idle: list[_PooledTransaction] = []
+        self._queue: deque[object] = deque()
+        self._total = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._timeouts = 0
+        self._evictions = 0
+        self._refresher = threading.Thread(target=self._refresh_loop, name="typedb-read-pool", daemon=True)
+
+    def start(self):
+        self._refresher.start()
+        return self
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._condition.notify_all()
+        for entry in idle:
+            self._close_quietly(entry)
+
+    @property
+    def generation(self):
+        """Changes on every `invalidate`, so transactions opened under different generations may see different data."""
+        return self._generation
+
+    def invalidate(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def transaction(self):
+        started = time.perf_counter()
+        entry = self._acquire()
+        try:
+            if self._instrument is None:
+                yield entry.tx
+            else:
+                yield self._instrument(entry.tx, time.perf_counter() - started, entry.generation)
+        except BaseException:
+            # The transaction may have been left unusable by the failed query, so never reuse it.
+            self._release(entry, discard=True)
+            raise
+        else:
+            self._release(entry)
+
+    def stats(self):
+        with self._condition:
+            return {
+                "size": self._size,
+                "open": self._total,
+                "idle": len(self._idle),
+                "hits": self._hits,
+                "misses": self._misses,
+                "waits": self._waits,
+                "waitSeconds": self._wait_seconds,
+                "timeouts": self._timeouts,
+                "evictions": self._evictions,
+            }
+
+    def _is_expired(self, entry):
+        return (
+            entry.generation != self._generation
+            or entry.uses >= self._max_uses
+            or time.monotonic() - entry.opened_at >= self._max_age
+            or not entry.tx.is_open()
+        )
+
+    def _open(self):
+        generation = self._generation
+        return _PooledTransaction(self._driver.transaction(self._database, TransactionType.READ), generation)
+
+    def _close_quietly(self, entry):
+        try:
+            entry.tx.close()
+        except Exception:
+            pass
+
+    def _acquire(self):
+        deadline = time.monotonic() + self._acquire_timeout
+        waited_since = None
+        expired = []
+        ticket = object()
+
+        with self._condition:
+            # Requests are served in arrival order, so a burst of new arrivals cannot starve earlier waiters.
+            self._queue.append(ticket)
+            try:
+                while True:
+                    entry = None
+                    if self._queue[0] is ticket:
+                        while self._idle:
+                            candidate = self._idle.pop()
+                            if self._is_expired(candidate):
+                                self._total -= 1
+                                self._evictions += 1
+                                expired.append(candidate)
+                            else:
+                                entry = candidate
+                                break
+
+                        if entry is not None:
+                            self._hits += 1
+                            break
+
+                        if self._total < self._size:
+                            self._total += 1
+                            self._misses += 1
+                            break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(f"No read transaction became available within {self._acquire_timeout}s.")
+
+                    if waited_since is None:
+                        waited_since = time.monotonic()
+                        self._waits += 1
+
+                    self._condition.wait(remaining)
+            finally:
+                self._queue.remove(ticket)
+                if waited_since is not None:
+                    self._wait_seconds += time.monotonic() - waited_since
+                self._condition.notify_all()
+
+        for stale in expired:
+            self._close_quietly(stale)
+
+        if entry is None:
+            try:
+                entry = self._open()
+            except BaseException:
+                with self._condition:
+                    self._total -= 1
+                    self._condition.notify_all()
+                raise
+
+        return entry
+
+    def _release(self, entry, discard=False):
+        entry.uses += 1
+
+        with self._condition:
+            retire = discard or self._closed or self._is_expired(entry)
+            if retire:
+                self._total -= 1
+                self._evictions += 1
+            else:
+                self._idle.append(entry)
+            self._condition.notify_all()
+
+        if retire:
+            self._close_quietly(entry)
+
+    def warm(self):
+        """Opens transactions until the pool is full, so that the first requests are served without opening any."""
+        self._replenish(raise_errors=True)
+
+    def _refresh_loop(self):
+        while True:
+            with self._condition:
+                generation = self._generation
+                self._condition.wait_for(lambda: self._closed or self._generation != generation, self._refresh_interval)
+                if self._closed:
+                    return
+
+            self._replenish(raise_errors=False)
+
+    def _replenish(self, raise_errors):
+        with self._condition:
+            expired = [entry for entry in self._idle if self._is_expired(entry)]
+            self._idle = [entry for entry in self._idle if entry not in expired]
+            self._total -= len(expired)
+            self._evictions += len(expired)
+            missing = self._size - self._total
+            self._total += missing
+
+        for entry in expired:
+            self._close_quietly(entry)
+
+        opened = []
+        error = None
+        for _ in range(missing):
+            try:
+                opened.append(self._open())
+            except Exception as e:
+                error = e
+                break
+
+        with self._condition:
+            self._total -= missing - len(opened)
+            if self._closed:
+                self._total -= len(opened)
+            else:
+                self._idle.extend(opened)
+                opened = []
+            self._condition.notify_all()
+
+        for entry in opened:
+            self._close_quietly(entry)
+
+        if error is not None and raise_errors:
+            raise error
@@ -1,25 +1,52 @@
 # Query strings and builders translated from Rust backend
 
-PAGE_LIST_QUERY = '''
-match $page isa page;
-fetch {
+from functools import lru_cache
+from templates import QueryTemplate, template, literal, Datetime
+
+# Variant templates (one per number of ids, or per selection of fields) kept per shape, least recently used first out.
+VARIANT_TEMPLATES_PER_SHAPE = 128
+
+PAGE_LIST_FETCH = '''
+fetch {{
     "name": $page.name,
     "bio": $page.bio,
     "id": $page.page-id,
     "profile-picture": $page.profile-picture,
     "type": (
         match
-        { $ty label person; } or { $ty label organization; } or { $ty label group; };
+        {{ $ty label person; }} or {{ $ty label organization; }} or {{ $ty label group; }};
         $page isa $ty;
         return first $ty;
     ),
-};
+}};
 '''
 
-def location_query(place_id):
-    return f'''
+PAGE_LIST_TEMPLATE = template('page_list', '''
+match $page isa page;''' + PAGE_LIST_FETCH)
+
+PAGE_LIST_PAGE_TEMPLATE = template('page_list_page', '''
+match $page isa page, has page-id $page-id;
+sort $page-id;
+limit {limit};''' + PAGE_LIST_FETCH)
+
+PAGE_LIST_PAGE_AFTER_TEMPLATE = template('page_list_page_after', '''
+match $page isa page, has page-id $page-id; $page-id > {after_id};
+sort $page-id;
+limit {limit};''' + PAGE_LIST_FETCH)
+
+PAGE_LIST_QUERY = PAGE_LIST_TEMPLATE.render()
+
+def page_list_query(limit=None, after=None):
+    if limit is None:
+        return PAGE_LIST_QUERY
+    if after is None:
+        return PAGE_LIST_PAGE_TEMPLATE.render(limit=limit)
+    after_id, = after
+    return PAGE_LIST_PAGE_AFTER_TEMPLATE.render(limit=limit, after_id=after_id)
+
+LOCATION_TEXT = '''
         match 
-            $place has place-id "{place_id}", has name $place-name;
+            $place has place-id {place_id}, has name $place-name;
         fetch {{
             "placeName": $place-name,
             "pages": [
@@ -43,44 +70,45 @@ def location_query(place_id):
         }};
     '''
 
-def page_query(id):
-    return f'''
-        match $page isa page, has id "{id}";
-        fetch {{
-            "name": $page.name,
-            "bio": $page.bio,
-            "profilePicture": $page.profile-picture,
-            "badge": $page.badge,
-            "isActive": $page.is-active,
-            "username": (match $page isa profile, has username $username; return first $username;),
-            "canPublish": (match $page isa profile, has can-publish $can-publish; return first $can-publish;),
-            "gender": (match $page isa profile, has gender $gender; return first $gender;),
-            "language": (match $page isa profile, has language $language; return first $language;),
-            "email": (match $page isa profile, has email $email; return first $email;),
-            "phone": (match $page isa profile, has phone $phone; return first $phone;),
-            "relationshipStatus": (match $page isa profile, has relationship-status $relationship-status; return first $relationship-status;),
-            "pageVisibility": (match $page isa profile, has page-visibility $page-visibility; return first $page-visibility;),
-            "postVisibility": (match $page isa profile, has post-visibility $post-visibility; return first $post-visibility;),
-            "tags": [match {{ $page isa group, has tag $tag; }} or {{ $page isa organization, has tag $tag; }}; return {{  $tag  }};],
-            "friends": [
+LOCATION_TEMPLATE = template('location', LOCATION_TEXT)
+
+def location_query(place_id, place_ids=None):
+    """
+    Without `place_ids`, pages in the place are found by walking the place tree. Otherwise `place_ids` must
+    hold the place and every place within it, and pages are matched by the id of the place they are in.
+    """
+    if place_ids is None:
+        return LOCATION_TEMPLATE.render(place_id=place_id)
+    place_ids = sorted(place_ids)
+    return _location_in_template(len(place_ids)).render(place_id=place_id, **_indexed('place_id', place_ids))
+
+PAGE_FIELD_TEXT = {
+    "name": '"name": $page.name',
+    "bio": '"bio": $page.bio',
+    "profilePicture": '"profilePicture": $page.profile-picture',
+    "badge": '"badge": $page.badge',
+    "isActive": '"isActive": $page.is-active',
+    "username": '"username": (match $page isa profile, has username $username; return first $username;)',
+    "canPublish": '"canPublish": (match $page isa profile, has can-publish $can-publish; return first $can-publish;)',
+    "gender": '"gender": (match $page isa profile, has gender $gender; return first $gender;)',
+    "language": '"language": (match $page isa profile, has language $language; return first $language;)',
+    "email": '"email": (match $page isa profile, has email $email; return first $email;)',
+    "phone": '"phone": (match $page isa profile, has phone $phone; return first $phone;)',
+    "relationshipStatus": '"relationshipStatus": (match $page isa profile, has relationship-status $relationship-status; return first $relationship-status;)',
+    "pageVisibility": '"pageVisibility": (match $page isa profile, has page-visibility $page-visibility; return first $page-visibility;)',
+    "postVisibility": '"postVisibility": (match $page isa profile, has post-visibility $post-visibility; return first $post-visibility;)',
+    "tags": '"tags": [match {{ $page isa group, has tag $tag; }} or {{ $page isa organization, has tag $tag; }}; return {{  $tag  }};]',
+    "friends": '''"friends": [
                 match ($page, $friend) isa friendship; $friend has id $friend-id;
                 limit 9;
                 return {{ $friend-id }};
-            ],
-            "numberOfFriends": (
-                match ($page, $friend) isa friendship;
-                return count;
-            ),
-            "followers": [
+            ]''',
+    "followers": '''"followers": [
                 match (page: $page, follower: $follower) isa following; $follower has id $follower-id;
                 limit 9;
                 return {{ $follower-id }};
-            ],
-            "numberOfFollowers": (
-                match (page: $page, follower: $follower) isa following;
-                return count;
-            ),
-            "location": [
+            ]''',
+    "location": '''"location": [
                 match
                     (place: $place, located: $page) isa location;
                     let $child, $parent = parent_places_linked_list($place);
@@ -90,15 +118,146 @@ def page_query(id):
                     "parentName": $parent.name,
                     "parentId": $parent.place-id,
                 }};
-            ]
+            ]''',
+    # Only the page's own places, for the place index to expand into their chains of parents.
+    "locationIds": '''"locationIds": [
+                match (place: $place, located: $page) isa location; $place has place-id $place-id;
+                return {{ $place-id }};
+            ]''',
+    "numberOfFriends": '''"numberOfFriends": (
+                match ($page, $friend) isa friendship;
+                return count;
+            )''',
+    "numberOfFollowers": '''"numberOfFollowers": (
+                match (page: $page, follower: $follower) isa following;
+                return count;
+            )''',
+}
+
+PAGE_BASE_FIELDS = (
+    "name", "bio", "profilePicture", "badge", "isActive", "username", "canPublish", "gender", "language", "email",
+    "phone", "relationshipStatus", "pageVisibility", "postVisibility", "tags", "friends", "followers",
+)
+PAGE_LOCATION_FIELDS = ("location",)
+PAGE_LOCATION_ID_FIELDS = ("locationIds",)
+# Served from the counter cache instead, when it is enabled.
+PAGE_COUNT_FIELDS = ("numberOfFriends", "numberOfFollowers")
+
+PAGE_FIELDS = PAGE_BASE_FIELDS + PAGE_LOCATION_FIELDS + PAGE_COUNT_FIELDS
+
+def _fetch_fields(names):
+    return ','.join('\n            ' + PAGE_FIELD_TEXT[name] for name in names)
+
+def _page_text(fields):
+    return '''
+        match $page isa page, has id {id};
+        fetch {{''' + _fetch_fields(fields) + '''
         }};
     '''
 
-def posts_query(page_id):
-    return f"""
+def _page_template(name, fields):
+    return template(name, _page_text(fields))
+
+PAGE_TEMPLATE = _page_template('page', PAGE_FIELDS)
+
+_PAGE_TEMPLATES = {
+    (True, True): PAGE_TEMPLATE,
+    (False, True): _page_template('page_without_counts', PAGE_BASE_FIELDS + PAGE_LOCATION_FIELDS),
+    (True, False): _page_template('page_with_location_ids', PAGE_BASE_FIELDS + PAGE_LOCATION_ID_FIELDS + PAGE_COUNT_FIELDS),
+    (False, False): _page_template('page_without_counts_with_location_ids', PAGE_BASE_FIELDS + PAGE_LOCATION_ID_FIELDS),
+}
+
+def _selected_fields(fields, counts=True, location=True):
+    # In the order of PAGE_FIELDS, so that the same selection always renders the same template.
+    names = []
+    for name in PAGE_FIELDS:
+        if name not in fields or (not counts and name in PAGE_COUNT_FIELDS):
+            continue
+        names.append(name if location or name != 'location' else 'locationIds')
+    return tuple(names)
+
+def page_query(id, counts=True, location=True, fields=None):
+    """
+    Without counts, or with only the ids of the page's own places, for pages served from in-memory indexes.
+    With `fields`, only those of PAGE_FIELDS are fetched, and the subqueries of the others are never run.
+    """
+    if fields is None:
+        return _PAGE_TEMPLATES[counts, location].render(id=id)
+    names = _selected_fields(fields, counts, location)
+    return _page_fields_template(names).render(id=id)
+
+@lru_cache(maxsize=VARIANT_TEMPLATES_PER_SHAPE)
+def _page_fields_template(names):
+    return _variant_template('page_fields', '+'.join(names), _page_text(names))
+
+PAGE_IDS_QUERY = template('page_ids', '''
+        match $page isa page, has page-id $id;
+        select $id;
+    ''').render()
+
+PLACES_QUERY = template('places', '''
+        match $place isa place, has place-id $id, has name $name;
+        select $id, $name;
+    ''').render()
+
+PLACE_PARENTS_QUERY = template('place_parents', '''
         match
-            $page has id \"{page_id}\";
-            (page: $page, post: $post) isa posting;
+            location (located: $child, place: $parent);
+            $child isa place, has place-id $child-id;
+            $parent isa place, has place-id $parent-id;
+        select $child-id, $parent-id;
+    ''').render()
+
+FRIEND_COUNTS_QUERY = template('friend_counts', '''
+        match $page isa page, has page-id $id; ($page, $friend) isa friendship;
+        reduce $count = count groupby $id;
+    ''').render()
+
+FOLLOWER_COUNTS_QUERY = template('follower_counts', '''
+        match $page isa page, has page-id $id; (page: $page, follower: $follower) isa following;
+        reduce $count = count groupby $id;
+    ''').render()
+
+def _variant_template(group, variant, text):
+    # Built on first use, and not registered, since a shape can have any number of variants. Callers keep
+    # them in bounded caches, keyed by the variant in a canonical form, such as fields in PAGE_FIELDS order.
+    return QueryTemplate(f'{group}_{variant}', text, group)
+
+def _one_of(variable, param, size):
+    if size == 1:
+        return f'{variable} == {{{param}0}}'
+    return ' or '.join(f'{{{{ {variable} == {{{param}{index}}}; }}}}' for index in range(size))
+
+def _indexed(param, values):
+    return {f'{param}{index}': value for index, value in enumerate(values)}
+
+@lru_cache(maxsize=VARIANT_TEMPLATES_PER_SHAPE)
+def _location_in_template(size):
+    return _variant_template('location_in', size, LOCATION_TEXT.replace(
+        'let $_ = located_in_transitive($page-place, $place);',
+        f'$page-place has place-id $page-place-id; {_one_of("$page-place-id", "place_id", size)};',
+    ))
+
+@lru_cache(maxsize=VARIANT_TEMPLATES_PER_SHAPE)
+def _page_batch_template(size, fields):
+    variant = size if fields == PAGE_FIELDS else f'{size}_' + '+'.join(fields)
+    return _variant_template('page_batch', variant, f'''
+        match $page isa page, has id $page-id; {_one_of("$page-id", "id", size)};
+        fetch {{{{
+            "id": $page-id,''' + _fetch_fields(fields) + '''
+        }};
+    ''')
+
+def page_batch_query(ids, fields=None):
+    fields = PAGE_FIELDS if fields is None else _selected_fields(fields)
+    return _page_batch_template(len(ids), fields).render(**_indexed('id', ids))
+
+POSTS_MATCH = '''
+        match
+            $page has id {page_id};
+            (page: $page, post: $post) isa posting;'''
+
+POSTS_FETCH = '''
         fetch {{
             "postText": $post.post-text,
             "postVisibility": $post.post-visibility,
@@ -122,14 +281,38 @@ def posts_query(page_id):
                 return {{ $emoji }};
             ],
         }};
-    """
+    '''
+
+POSTS_TEMPLATE = template('posts', POSTS_MATCH + POSTS_FETCH)
+
+# Newest posts first, with the post id breaking ties between equal timestamps.
+POSTS_PAGE_TEMPLATE = template('posts_page', POSTS_MATCH + '''
+            $post has creation-timestamp $timestamp, has post-id $post-id;
+        sort $timestamp desc, $post-id asc;
+        limit {limit};''' + POSTS_FETCH)
+
+POSTS_PAGE_AFTER_TEMPLATE = template('posts_page_after', POSTS_MATCH + '''
+            $post has creation-timestamp $timestamp, has post-id $post-id;
+            {{ $timestamp < {after_timestamp}; }} or {{ $timestamp == {after_timestamp}; $post-id > {after_id}; }};
+        sort $timestamp desc, $post-id asc;
+        limit {limit};''' + POSTS_FETCH)
 
-def comments_query(post_id):
-    return f"""
+def posts_query(page_id, limit=None, after=None):
+    if limit is None:
+        return POSTS_TEMPLATE.render(page_id=page_id)
+    if after is None:
+        return POSTS_PAGE_TEMPLATE.render(page_id=page_id, limit=limit)
+    after_timestamp, after_id = after
+    return POSTS_PAGE_AFTER_TEMPLATE.render(page_id=page_id, limit=limit, after_timestamp=Datetime(after_timestamp), after_id=after_id)
+
+COMMENTS_MATCH = '''
         match
-            $post has id \"{post_id}\";
-            ($post, comment: $comment, author: $author) isa commenting;
+            $post has id {post_id};
+            ($post, comment: $comment, author: $author) isa commenting;'''
+
+COMMENTS_FETCH = '''
         fetch {{
+            "commentId": $comment.comment-id,
             "commentText": $comment.comment-text,
             "creationTimestamp": $comment.creation-timestamp,
             "isVisible": $comment.is-visible,
@@ -147,61 +330,99 @@ def comments_query(post_id):
                 return {{ $emoji }};
             ],
         }};
-    """
+    '''
+
+COMMENTS_TEMPLATE = template('comments', COMMENTS_MATCH + COMMENTS_FETCH)
+
+# Oldest comments first, so that a thread reads in order, with the comment id breaking ties.
+COMMENTS_PAGE_TEMPLATE = template('comments_page', COMMENTS_MATCH + '''
+            $comment has creation-timestamp $timestamp, has comment-id $comment-id;
+        sort $timestamp asc, $comment-id asc;
+        limit {limit};''' + COMMENTS_FETCH)
+
+COMMENTS_PAGE_AFTER_TEMPLATE = template('comments_page_after', COMMENTS_MATCH + '''
+            $comment has creation-timestamp $timestamp, has comment-id $comment-id;
+            {{ $timestamp > {after_timestamp}; }} or {{ $timestamp == {after_timestamp}; $comment-id > {after_id}; }};
+        sort $timestamp asc, $comment-id asc;
+        limit {limit};''' + COMMENTS_FETCH)
+
+def comments_query(post_id, limit=None, after=None):
+    if limit is None:
+        return COMMENTS_TEMPLATE.render(post_id=post_id)
+    if after is None:
+        return COMMENTS_PAGE_TEMPLATE.render(post_id=post_id, limit=limit)
+    after_timestamp, after_id = after
+    return COMMENTS_PAGE_AFTER_TEMPLATE.render(post_id=post_id, limit=limit, after_timestamp=Datetime(after_timestamp), after_id=after_id)
 
 def create_user_query(payload):
     query = "insert $_ isa person"
-    query += f", has name \"{payload['name']}\""
-    query += f", has username \"{payload['username']}\""
+    query += f", has name {literal(payload['name'])}"
+    query += f", has username {literal(payload['username'])}"
     if payload.get('profilePicture'):
-        query += f", has profile-picture \"{payload['profilePicture']}\""
-    query += f", has gender \"{payload['gender']}\""
+        query += f", has profile-picture {literal(payload['profilePicture'])}"
+    query += f", has gender {literal(payload['gender'])}"
     if payload.get('language'):
-        query += f", has language \"{payload['language']}\""
-    query += f", has email \"{payload['email']}\""
+        query += f", has language {literal(payload['language'])}"
+    query += f", has email {literal(payload['email'])}"
     if payload.get('phone'):
-        query += f", has phone \"{payload['phone']}\""
+        query += f", has phone {literal(payload['phone'])}"
     if payload.get('relationshipStatus'):
-        query += f", has relationship-status \"{payload['relationshipStatus']}\""
+        query += f", has relationship-status {literal(payload['relationshipStatus'])}"
     if payload.get('badge'):
-        query += f", has badge \"{payload['badge']}\""
-    query += f", has bio \"{payload['bio']}\""
-    query += f", has can-publish {payload['canPublish']}".lower()
-    query += f", has is-active {payload['isActive']}".lower()
-    query += f", has page-visibility \"{payload['pageVisibility']}\""
-    query += f", has post-visibility \"{payload['postVisibility']}\""
+        query += f", has badge {literal(payload['badge'])}"
+    query += f", has bio {literal(payload['bio'])}"
+    query += f", has can-publish {literal(payload['canPublish'])}"
+    query += f", has is-active {literal(payload['isActive'])}"
+    query += f", has page-visibility {literal(payload['pageVisibility'])}"
+    query += f", has post-visibility {literal(payload['postVisibility'])}"
     query += ";"
     return query
 
 def create_group_query(payload):
     query = "insert $_ isa group"
-    query += f", has name \"{payload['name']}\""
-    query += f", has group-id \"{payload['groupId']}\""
+    query += f", has name {literal(payload['name'])}"
+    query += f", has group-id {literal(payload['groupId'])}"
     if payload.get('profilePicture'):
-        query += f", has profile-picture \"{payload['profilePicture']}\""
-    query += f", has bio \"{payload['bio']}\""
-    query += f", has is-active {payload['isActive']}".lower()
-    query += f", has page-visibility \"{payload['pageVisibility']}\""
-    query += f", has post-visibility \"{payload['postVisibility']}\""
+        query += f", has profile-picture {literal(payload['profilePicture'])}"
+    query += f", has bio {literal(payload['bio'])}"
+    query += f", has is-active {literal(payload['isActive'])}"
+    query += f", has page-visibility {literal(payload['pageVisibility'])}"
+    query += f", has post-visibility {literal(payload['postVisibility'])}"
     if payload.get('badge'):
-        query += f", has badge \"{payload['badge']}\""
+        query += f", has badge {literal(payload['badge'])}"
     for tag in payload.get('tags', []):
-        query += f", has tag \"{tag}\""
+        query += f", has tag {literal(tag)}"
     query += ";"
     return query
 
 def create_organization_query(payload):
     query = "insert $_ isa organization"
-    query += f", has name \"{payload['name']}\""
-    query += f", has username \"{payload['username']}\""
+    query += f", has name {literal(payload['name'])}"
+    query += f", has username {literal(payload['username'])}"
     if payload.get('profilePicture'):
-        query += f", has profile-picture \"{payload['profilePicture']}\""
-    query += f", has bio \"{payload['bio']}\""
-    query += f", has is-active {payload['isActive']}".lower()
-    query += f", has can-publish {payload['canPublish']}".lower()
+        query += f", has profile-picture {literal(payload['profilePicture'])}"
+    query += f", has bio {literal(payload['bio'])}"
+    query += f", has is-active {literal(payload['isActive'])}"
+    query += f", has can-publish {literal(payload['canPublish'])}"
     if payload.get('badge'):
-        query += f", has badge \"{payload['badge']}\""
+        query += f", has badge {literal(payload['badge'])}"
     for tag in payload.get('tags', []):
-        query += f", has tag \"{tag}\""
+        query += f", has tag {literal(tag)}"
     query += ";"
     return query
+
+CREATE_FRIENDSHIP_TEMPLATE = template('create_friendship', '''
+        match $page isa person, has id {page_id}; $friend isa person, has id {friend_id};
+        insert $_ isa friendship, links (friend: $page, friend: $friend);
+    ''')
+
+def create_friendship_query(payload):
+    return CREATE_FRIENDSHIP_TEMPLATE.render(page_id=payload['pageId'], friend_id=payload['friendId'])
+
+CREATE_FOLLOWING_TEMPLATE = template('create_following', '''
+        match $page isa page, has id {page_id}; $follower isa profile, has id {follower_id};
+        insert $_ isa following, links (page: $page, follower: $follower);
+    ''')
+
+def create_following_query(payload):
+    return CREATE_FOLLOWING_TEMPLATE.render(page_id=payload['pageId'], follower_id=payload['followerId'])
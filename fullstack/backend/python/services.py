@@ -0,0 +1,68 @@
+import os
+from typedb.driver import TypeDB, Credentials, DriverOptions, TransactionType
+from pool import TransactionPool
+from cache import ResponseCache
+from counters import PageCounters
+from places import PlaceIndex
+from coalesce import Coalescer
+import queries
+from metrics import metrics, instrument_builders, instrument_transaction
+from slowlog import SlowQueryLog
+from media import MediaStore
+from writebehind import WriteBehind
+from config import *
+
+if METRICS_ENABLED:
+    instrument_builders(queries)
+
+def _instrument(tx, acquire_seconds, generation):
+    # Coalescing sits under the timing, so a request that shares a query is still timed for its wait.
+    if coalescer is not None:
+        tx = coalescer.wrap(tx, generation)
+    return instrument_transaction(tx, acquire_seconds) if METRICS_ENABLED else tx
+
+typedb = TypeDB.driver(TYPEDB_ADDRESS, Credentials(TYPEDB_USERNAME, TYPEDB_PASSWORD), DriverOptions(TYPEDB_TLS_ENABLED, None))
+coalescer = Coalescer() if COALESCING_ENABLED else None
+if coalescer is not None:
+    metrics.add_exporter(coalescer.prometheus)
+read_pool = TransactionPool(
+    typedb,
+    TYPEDB_DATABASE,
+    size=TYPEDB_READ_POOL_SIZE,
+    max_age=TYPEDB_READ_POOL_MAX_AGE_SECONDS,
+    max_uses=TYPEDB_READ_POOL_MAX_USES,
+    acquire_timeout=TYPEDB_READ_POOL_ACQUIRE_TIMEOUT_SECONDS,
+    refresh_interval=TYPEDB_READ_POOL_REFRESH_INTERVAL_SECONDS,
+    instrument=_instrument if METRICS_ENABLED or COALESCING_ENABLED else None,
+).start()
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+metrics.add_exporter(response_cache.prometheus)
+page_counters = PageCounters(read_pool.transaction, COUNTER_CACHE_REFRESH_INTERVAL_SECONDS).start() if COUNTER_CACHE_ENABLED else None
+place_index = PlaceIndex(read_pool.transaction, PLACE_INDEX_REFRESH_INTERVAL_SECONDS).start() if PLACE_INDEX_ENABLED else None
+
+slow_query_log = None
+if METRICS_ENABLED and SLOW_QUERY_LOG_PATH:
+    slow_query_log = SlowQueryLog(
+        # "{pid}" gives each gunicorn worker its own file, since processes cannot share a rotating file.
+        SLOW_QUERY_LOG_PATH.format(pid=os.getpid()),
+        threshold=SLOW_QUERY_THRESHOLD_MS / 1000,
+        max_bytes=SLOW_QUERY_LOG_MAX_BYTES,
+        backups=SLOW_QUERY_LOG_BACKUPS,
+    ).start()
+    metrics.add_listener(slow_query_log)
+
+media_store = MediaStore(MEDIA_ROOT, MEDIA_MAX_BYTES, MEDIA_MEMORY_CACHE_BYTES, MEDIA_MEMORY_CACHE_MAX_ITEM_BYTES)
+
+def after_write():
+    read_pool.invalidate()
+    response_cache.clear()
+
+write_behind = None
+if WRITE_BEHIND_ENABLED:
+    write_behind = WriteBehind(
+        lambda: typedb.transaction(TYPEDB_DATABASE, TransactionType.WRITE),
+        linger=WRITE_BEHIND_LINGER_MS / 1000,
+        max_items=WRITE_BEHIND_MAX_ITEMS,
+        after_commit=after_write,
+    ).start()
+    metrics.add_exporter(write_behind.prometheus)
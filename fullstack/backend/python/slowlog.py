@@ -0,0 +1,92 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    # Drops records rather than blocking requests when the writer falls behind.
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, default=_jsonable, ensure_ascii=False)
+
+
+def _jsonable(value):
+    # Template parameters may be `Datetime` literals.
+    return getattr(value, 'value', str(value))
+
+
+class SlowQueryLog:
+    """
+    Writes a JSON line for every request slower than `threshold` seconds, with the queries it ran.
+
+    Records are handed to a background thread through a bounded queue, so the request path only pays for
+    building the record. The file is rotated once it reaches `max_bytes`, keeping `backups` old files.
+    """
+
+    def __init__(self, path, threshold, max_bytes, backups, queue_size=1024):
+        self._threshold = threshold
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        handler.setFormatter(_JSONFormatter())
+        self._queue_handler = _DroppingQueueHandler(queue.Queue(queue_size))
+        self._listener = logging.handlers.QueueListener(self._queue_handler.queue, handler)
+        self._logger = logging.Logger('slow-queries')
+        self._logger.addHandler(self._queue_handler)
+        self._logger.propagate = False
+        self._logged = 0
+
+    def start(self):
+        self._listener.start()
+        return self
+
+    def close(self):
+        self._listener.stop()
+
+    def __call__(self, timer):
+        """A `Metrics` listener."""
+        duration = timer.elapsed()
+        if duration < self._threshold:
+            return
+        self._logged += 1
+        self._logger.info({
+            "time": time.time(),
+            "pid": os.getpid(),
+            "route": timer.route,
+            "durationMs": duration * 1000,
+            "phasesMs": {phase: seconds * 1000 for phase, seconds in timer.phases.items()},
+            "bytes": timer.bytes,
+            "queries": [_query_record(record) for record in timer.queries],
+        })
+
+    def stats(self):
+        return {"logged": self._logged, "dropped": self._queue_handler.dropped}
+
+
+def _query_record(record):
+    template = getattr(record.query, 'template', None)
+    return {
+        "template": template.name if template is not None else None,
+        "templateHash": template.hash if template is not None else None,
+        "label": getattr(record.query, 'label', None),
+        "params": getattr(record.query, 'params', None),
+        "typeql": str(record.query),
+        "rows": record.rows,
+        "durationMs": record.seconds * 1000,
+    }
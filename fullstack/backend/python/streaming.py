@@ -0,0 +1,111 @@
+import json
+import sys
+from contextlib import ExitStack
+from flask import Response
+import metrics
+
+JSON = 'application/json'
+NDJSON = 'application/x-ndjson'
+
+# Documents are written in chunks of about this many bytes, rather than one write per document.
+CHUNK_SIZE = 16 * 1024
+
+
+def negotiate(accept_mimetypes):
+    return NDJSON if accept_mimetypes.best_match([JSON, NDJSON], default=JSON) == NDJSON else JSON
+
+
+def _dumps(document):
+    return json.dumps(document, separators=(',', ':'), ensure_ascii=False)
+
+
+def encode(documents, mimetype):
+    """Yields the documents as a JSON array or as NDJSON, one chunk at a time."""
+    # Taken now, while the request's context is current, since the chunks may be pulled from another thread.
+    return _encode(documents, mimetype, metrics.current())
+
+
+def _encode(documents, mimetype, timer):
+    if mimetype == NDJSON:
+        opening, separator, closing = '', '\n', '\n'
+    else:
+        opening, separator, closing = '[', ',', ']'
+
+    buffer = [opening]
+    size = 0
+    empty = True
+    for document in documents:
+        if not empty:
+            buffer.append(separator)
+        empty = False
+        with metrics.timed_phase('serialize', timer):
+            text = _dumps(document)
+        buffer.append(text)
+        size += len(text)
+        if size >= CHUNK_SIZE:
+            yield _counted(''.join(buffer).encode(), timer)
+            buffer = []
+            size = 0
+
+    if not empty or mimetype != NDJSON:
+        buffer.append(closing)
+    yield _counted(''.join(buffer).encode(), timer)
+
+
+def _counted(chunk, timer):
+    if timer is not None:
+        timer.add_bytes(len(chunk))
+    return chunk
+
+
+def head(chunks, min_bytes):
+    """
+    Reads a streamed body until at least `min_bytes` have been read. Returns the chunks read and an iterator over
+    the rest, or None for the rest if the body ended first.
+    """
+    buffered = []
+    size = 0
+    chunks = iter(chunks)
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size >= min_bytes:
+            return buffered, chunks
+    return buffered, None
+
+
+def resume(buffered, rest):
+    """The body again, from the chunks `head` read and the rest. Closing it closes the rest."""
+    yield from buffered
+    yield from rest
+
+
+def documents_response(documents, mimetype):
+    return Response(b''.join(encode(documents, mimetype)), mimetype=mimetype, headers={'Vary': 'Accept'})
+
+
+def open_stream(transaction, run):
+    """
+    Opens `transaction` and calls `run` with it to start a query. Returns the query's documents together with an
+    `ExitStack` that keeps the transaction borrowed until it is closed, once the last document has been sent.
+    """
+    with ExitStack() as stack:
+        tx = stack.enter_context(transaction)
+        documents = run(tx)
+        # Nothing failed before the first byte, so from here on the caller owns the transaction.
+        return documents, stack.pop_all()
+
+
+def stream_response(transaction, run, mimetype):
+    documents, cleanup = open_stream(transaction, run)
+
+    def chunks():
+        try:
+            yield from encode(documents, mimetype)
+        except BaseException:
+            cleanup.__exit__(*sys.exc_info())
+            raise
+
+    response = Response(chunks(), mimetype=mimetype, headers={'Vary': 'Accept'})
+    response.call_on_close(cleanup.close)
+    return response
@@ -0,0 +1,116 @@
+import hashlib
+import re
+from string import Formatter
+
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\"": "\\\"", "\n": "\\n", "\r": "\\r"})
+
+
+class Datetime:
+    """A datetime value in TypeQL literal syntax, validated so that it can be rendered unquoted."""
+
+    _pattern = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(:\d{2}(\.\d{1,9})?)?", re.ASCII)
+
+    def __init__(self, value):
+        if not isinstance(value, str) or not self._pattern.fullmatch(value):
+            raise ValueError(f"Not a datetime literal: {value!r}")
+        self.value = value
+
+    def __repr__(self):
+        return f"Datetime({self.value!r})"
+
+
+def literal(value):
+    """Renders a Python value as a TypeQL literal, escaping strings so they cannot break out of their quotes."""
+    if type(value) is str:
+        text = value
+    elif isinstance(value, Datetime):
+        return value.value
+    elif isinstance(value, bool):
+        return "true" if value else "false"
+    elif isinstance(value, (int, float)):
+        return repr(value)
+    else:
+        text = str(value)
+    if "\"" in text or "\\" in text or "\n" in text or "\r" in text:
+        text = text.translate(_ESCAPES)
+    return f"\"{text}\""
+
+
+class RenderedQuery(str):
+    """A query string that remembers the template and parameters it was rendered from."""
+
+    template: "QueryTemplate"
+    params: dict
+
+    @property
+    def label(self):
+        return self.template.group
+
+
+class QueryTemplate:
+    """
+    A TypeQL query shape with named placeholders, written with `str.format` syntax (`{name}`, braces doubled).
+
+    The template is split once, when it is registered, into its literal segments, and `render` joins them with
+    the bound values. Bound values are always rendered through `literal`, which makes the placeholders safe
+    against injection. Every render of the same template shares the same `hash`. Templates generated from one
+    shape, such as one per number of ids, share a `group`.
+    """
+
+    def __init__(self, name, text, group=None):
+        self.name = name
+        self.group = group or name
+        self.text = text
+        self.hash = hashlib.sha256(text.encode()).hexdigest()[:16]
+        self.params = []
+        segments = []
+        pending = ""
+
+        for literal_text, field_name, format_spec, conversion in Formatter().parse(text):
+            pending += literal_text
+            if field_name is None:
+                continue
+            if format_spec or conversion:
+                raise ValueError(f"Template '{name}' uses a format spec or conversion on '{field_name}'.")
+            if not field_name.isidentifier():
+                raise ValueError(f"Template '{name}' has an invalid placeholder '{field_name}'.")
+            segments += [pending, field_name]
+            if field_name not in self.params:
+                self.params.append(field_name)
+            pending = ""
+
+        segments.append(pending)
+        # Rendered queries find their template on their class, so that a render only has to set its params.
+        self._query_type = type(RenderedQuery.__name__, (RenderedQuery,), {"template": self})
+        self.render = self._compile(segments)
+
+    def _compile(self, segments):
+        if not self.params:
+            query = self._query_type("".join(segments))
+            query.params = {}
+            return lambda **params: query
+
+        # Placeholders sit at the odd positions, between the literal segments.
+        placeholders = [(index, segments[index]) for index in range(1, len(segments), 2)]
+        query_type = self._query_type
+
+        def render(**params):
+            parts = segments.copy()
+            for index, name in placeholders:
+                parts[index] = literal(params[name])
+            query = query_type("".join(parts))
+            query.params = params
+            return query
+
+        return render
+
+
+TEMPLATES: dict[str, QueryTemplate] = {}
+
+
+def template(name, text, group=None):
+    if name in TEMPLATES:
+        raise ValueError(f"Template '{name}' is already registered.")
+    TEMPLATES[name] = QueryTemplate(name, text, group)
+    return TEMPLATES[name]
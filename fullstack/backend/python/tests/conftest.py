@@ -0,0 +1,228 @@
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import pytest
+from typedb.driver import TypeDB
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The backend reads its configuration, and connects, when it is first imported, so both are set up here, before
+# any test imports it.
+os.environ.setdefault("MEDIA_ROOT", tempfile.mkdtemp(prefix="backend-tests-media-"))
+os.environ.setdefault("SERVER_WORKERS", "1")
+
+
+class FakeConcept:
+    def __init__(self, value):
+        self._value = value
+
+    def try_get_value(self):
+        return self._value
+
+
+class FakeRow:
+    def __init__(self, values):
+        self._values = values
+
+    def get(self, column):
+        return FakeConcept(self._values[column])
+
+
+class FakeAnswer:
+    def __init__(self, kind, answers):
+        self._kind = kind
+        self._answers = answers
+
+    def is_ok(self):
+        return self._kind == 'ok'
+
+    def is_concept_rows(self):
+        return self._kind == 'rows'
+
+    def is_concept_documents(self):
+        return self._kind == 'documents'
+
+    def as_concept_rows(self):
+        return iter([FakeRow(values) for values in self._answers])
+
+    def as_concept_documents(self):
+        # Copies, as the driver builds new documents for every answer.
+        return iter([dict(document) for document in self._answers])
+
+
+class FakePromise:
+    def __init__(self, database, query):
+        self._database = database
+        self._query = query
+
+    def resolve(self):
+        return self._database.answer(self._query)
+
+
+class FakeTransaction:
+    def __init__(self, database, type):
+        self._database = database
+        self.type = type
+        self.queries = []
+        self._open = True
+
+    def is_open(self):
+        return self._open
+
+    def query(self, query, options=None):
+        self.queries.append(query)
+        return FakePromise(self._database, query)
+
+    def commit(self):
+        self._database.commit(self.queries)
+        self._open = False
+
+    def close(self):
+        self._open = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FakeDriver:
+    """
+    Stands in for the TypeDB driver. Queries are answered by the first rule registered with `on` whose text
+    they contain, and otherwise with no documents (for fetch queries) or no rows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._rules = []
+            self.queries = []
+            self.committed = []
+            self.opened = 0
+
+    def on(self, text, documents=None, rows=None, error=None):
+        if error is not None:
+            rule = error
+        elif documents is not None:
+            rule = FakeAnswer('documents', documents)
+        else:
+            rule = FakeAnswer('rows', rows or [])
+        with self._lock:
+            self._rules.insert(0, (text, rule))
+
+    def answer(self, query):
+        with self._lock:
+            self.queries.append(query)
+            rule = next((rule for text, rule in self._rules if text in query), None)
+        if rule is None:
+            return FakeAnswer('documents' if 'fetch' in query else 'rows', [])
+        if isinstance(rule, BaseException):
+            raise rule
+        return rule
+
+    def commit(self, queries):
+        with self._lock:
+            self.committed.append(list(queries))
+
+    def transaction(self, database, type, options=None):
+        with self._lock:
+            self.opened += 1
+        return FakeTransaction(self, type)
+
+    def is_open(self):
+        return True
+
+    def close(self):
+        pass
+
+
+fake_driver = FakeDriver()
+TypeDB.driver = staticmethod(lambda *args, **kwargs: fake_driver)
+
+
+@pytest.fixture
+def driver():
+    """A driver of its own, for tests of components that are given one."""
+    return FakeDriver()
+
+
+@pytest.fixture
+def database():
+    """The driver the backend's services are connected to, emptied, with no cached reads or transactions."""
+    import services
+    fake_driver.reset()
+    services.read_pool.invalidate()
+    services.response_cache.clear()
+    yield fake_driver
+    fake_driver.reset()
+
+
+class ClientResponse:
+    """The parts of a response the tests use, alike for both test clients."""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def decode(content, encoding):
+    """Decompresses a body as the ASGI app's client does, so that both clients return the content itself."""
+    if encoding == 'gzip':
+        return gzip.decompress(content)
+    if encoding == 'br':
+        import brotli
+        return brotli.decompress(content)
+    return content
+
+
+class AppClient:
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+
+class FlaskClient(AppClient):
+    def __init__(self):
+        from app import app
+        self._client = app.test_client()
+
+    def request(self, method, path, **kwargs):
+        response = self._client.open(path, method=method, **kwargs)
+        content = decode(response.get_data(), response.headers.get('Content-Encoding'))
+        # Closed, as servers do once they have sent a response, which runs its `call_on_close` callbacks.
+        response.close()
+        return ClientResponse(response.status_code, response.headers, content)
+
+
+class ASGIClient(AppClient):
+    def __init__(self):
+        from starlette.testclient import TestClient
+        from asgi import app
+        # Not entered, so that the app's lifespan never closes the services the other tests share.
+        self._client = TestClient(app)
+
+    def request(self, method, path, data=None, **kwargs):
+        response = self._client.request(method, path, content=data, **kwargs)
+        return ClientResponse(response.status_code, response.headers, response.content)
+
+
+@pytest.fixture(params=['flask', 'asgi'])
+def client(request, database):
+    """A client of the Flask app and of the ASGI app in turn, since both must answer every request alike."""
+    if request.param == 'asgi':
+        pytest.importorskip('starlette')
+        return ASGIClient()
+    return FlaskClient()
@@ -0,0 +1,85 @@
+import pytest
+import handlers
+from pool import TransactionPool
+
+USER = {
+    "name": 'Test "User"', "username": "test-user", "email": "test@example.com", "bio": "Bio", "gender": "other",
+    "canPublish": True, "isActive": True, "pageVisibility": "public", "postVisibility": "public",
+}
+
+
+class TestApps:
+    def test_index(self, client):
+        response = client.get('/')
+        assert response.status_code == 200
+        assert 'running' in response.json()['message']
+
+    def test_stats(self, client):
+        stats = client.get('/api/stats').json()
+        assert {'readPool', 'responseCache', 'latency', 'media'} <= stats.keys()
+
+    def test_reads_pages(self, client, database):
+        database.on('has id "page-1"', documents=[{'name': 'Page 1', 'username': 'page-1'}])
+        response = client.get('/api/user/page-1')
+        assert response.status_code == 200
+        assert response.json() == {'name': 'Page 1', 'username': 'page-1'}
+
+    def test_unknown_pages_are_not_found(self, client, database):
+        for _ in range(2):
+            response = client.get('/api/user/page-1')
+            assert response.status_code == 404
+            assert response.json() == {'error': 'Unknown page'}
+            assert 'ETag' not in response.headers
+        # Not cached, so a page created since is found.
+        assert len(database.queries) == 2
+
+    def test_creates_pages(self, client, database):
+        response = client.post('/api/create-user', json=USER)
+        assert response.status_code == 200
+        [[query]] = database.committed
+        assert query.startswith('insert $_ isa person, has name "Test \\"User\\""')
+
+    @pytest.mark.parametrize('path', [
+        '/api/create-user', '/api/create-friendship', '/api/create-users:bulk', '/api/pages/batch',
+    ])
+    @pytest.mark.parametrize('body', [b'{"name": ', b'not json', b'\xff'])
+    def test_malformed_json_is_a_bad_request(self, client, database, path, body):
+        response = client.post(path, data=body, headers={'Content-Type': 'application/json'})
+        assert response.status_code == 400
+        assert response.json() == {'error': 'Malformed JSON body.'}
+        assert database.committed == []
+
+    def test_exhausted_read_pool_is_unavailable(self, client, driver, monkeypatch):
+        pool = TransactionPool(driver, 'test', size=0, max_age=60, max_uses=100, acquire_timeout=0, refresh_interval=60)
+        monkeypatch.setattr(handlers, 'read_pool', pool)
+        response = client.get('/api/user/page-1')
+        assert response.status_code == 503
+        assert 'error' in response.json()
+
+
+class Closable:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestASGILifespan:
+    def test_shutdown_closes_every_service(self, driver, monkeypatch):
+        pytest.importorskip('starlette')
+        from concurrent.futures import ThreadPoolExecutor
+        from starlette.testclient import TestClient
+        import asgi
+
+        # Shutdown closes the services, so the app runs on its own copies rather than those of the other tests.
+        names = ['read_pool', 'place_index', 'page_counters', 'write_behind', 'slow_query_log']
+        services = {name: Closable() for name in names}
+        for name, service in services.items():
+            monkeypatch.setattr(asgi, name, service)
+        monkeypatch.setattr(asgi, 'executor', ThreadPoolExecutor(max_workers=1))
+        with TestClient(asgi.app) as client:
+            assert client.get('/').status_code == 200
+            assert not any(service.closed for service in services.values())
+        assert all(service.closed for service in services.values())
+        assert asgi.executor._shutdown
@@ -0,0 +1,49 @@
+import pytest
+from batch import BatchError, batch_ids
+
+
+class TestBatchIds:
+    @pytest.mark.parametrize('payload', [['a', 'b', 'a'], {'ids': ['a', 'b', 'a']}])
+    def test_reads_distinct_ids_in_order(self, payload):
+        assert batch_ids(payload, 10) == ['a', 'b']
+
+    @pytest.mark.parametrize('payload', [None, 'a', {'id': ['a']}, [1, 2], {'ids': 'a'}])
+    def test_rejects_anything_but_a_list_of_ids(self, payload):
+        with pytest.raises(BatchError):
+            batch_ids(payload, 10)
+
+    def test_rejects_too_many_ids(self):
+        with pytest.raises(BatchError):
+            batch_ids(['a', 'b', 'c'], 2)
+
+
+class TestPageBatchEndpoint:
+    def test_resolves_every_id_in_one_query(self, client, database):
+        database.on('$page-id ==', documents=[{'id': 'page-1', 'name': 'Page 1'}])
+        response = client.post('/api/pages/batch', json=['page-1', 'page-2', 'page-1'])
+        assert response.status_code == 200
+        assert response.json() == {'page-1': {'id': 'page-1', 'name': 'Page 1'}, 'page-2': None}
+        [query] = database.queries
+        assert '$page-id == "page-1"' in query and '$page-id == "page-2"' in query
+
+    def test_selects_fields(self, client, database):
+        client.post('/api/pages/batch?fields=name,bio', json={'ids': ['page-1']})
+        [query] = database.queries
+        assert '"name": $page.name' in query and '"bio": $page.bio' in query
+        assert 'friendship' not in query
+
+    def test_empty_batches_run_no_query(self, client, database):
+        response = client.post('/api/pages/batch', json=[])
+        assert response.json() == {}
+        assert database.queries == []
+
+    @pytest.mark.parametrize('path, payload', [
+        ('/api/pages/batch', {'ids': 'page-1'}),
+        ('/api/pages/batch', [str(index) for index in range(101)]),
+        ('/api/pages/batch?fields=password', ['page-1']),
+    ])
+    def test_invalid_requests_are_bad_requests(self, client, database, path, payload):
+        response = client.post(path, json=payload)
+        assert response.status_code == 400
+        assert 'error' in response.json()
+        assert database.queries == []
@@ -0,0 +1,54 @@
+import pytest
+
+
+def user(username):
+    return {
+        "name": username, "username": username, "email": f"{username}@example.com", "bio": "Bio", "gender": "other",
+        "canPublish": True, "isActive": True, "pageVisibility": "public", "postVisibility": "public",
+    }
+
+
+class TestBulkCreateEndpoints:
+    def test_commits_in_chunks(self, client, database):
+        response = client.post('/api/create-users:bulk?chunkSize=2', json=[user(f'user-{index}') for index in range(5)])
+        assert response.status_code == 200
+        result = response.json()
+        assert (result['created'], result['failed'], result['transactions']) == (5, 0, 3)
+        assert [len(queries) for queries in database.committed] == [2, 2, 1]
+
+    def test_reports_invalid_items_without_writing_them(self, client, database):
+        items = [user('user-0'), {'name': 'no username'}, user('user-2')]
+        result = client.post('/api/create-users:bulk', json={'items': items}).json()
+        assert (result['created'], result['failed']) == (2, 1)
+        assert result['errors'][0]['index'] == 1
+        [queries] = database.committed
+        assert len(queries) == 2
+
+    def test_retries_failed_chunks_one_item_at_a_time(self, client, database):
+        database.on('has username "user-1"', error=RuntimeError("Constraint violated."))
+        items = [user(f'user-{index}') for index in range(4)]
+        result = client.post('/api/create-users:bulk?chunkSize=2', json=items).json()
+        assert (result['created'], result['failed']) == (3, 1)
+        assert result['errors'] == [{'index': 1, 'error': 'Constraint violated.'}]
+        # The first chunk failed, and was retried as two transactions.
+        assert result['transactions'] == 4
+        assert [len(queries) for queries in database.committed] == [1, 2]
+
+    def test_creates_groups_and_organizations(self, client, database):
+        group = {"name": "Group", "groupId": "group-1", "bio": "Bio", "isActive": True, "pageVisibility": "public",
+                 "postVisibility": "public", "tags": ["a"]}
+        organization = {"name": "Org", "username": "org-1", "bio": "Bio", "isActive": True, "canPublish": True}
+        assert client.post('/api/create-groups:bulk', json=[group]).json()['created'] == 1
+        assert client.post('/api/create-organizations:bulk', json=[organization]).json()['created'] == 1
+        assert [queries[0].split(',')[0] for queries in database.committed] == ['insert $_ isa group', 'insert $_ isa organization']
+
+    @pytest.mark.parametrize('path, payload', [
+        ('/api/create-users:bulk', {'users': []}),
+        ('/api/create-users:bulk?chunkSize=0', []),
+        ('/api/create-users:bulk?chunkSize=many', []),
+    ])
+    def test_invalid_requests_are_bad_requests(self, client, database, path, payload):
+        response = client.post(path, json=payload)
+        assert response.status_code == 400
+        assert 'error' in response.json()
+        assert database.committed == []
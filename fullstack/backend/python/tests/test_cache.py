@@ -0,0 +1,110 @@
+from cache import ResponseCache
+
+KEY = ResponseCache.key('pages', '/api/pages', [('limit', '10')], 'application/json')
+
+USER = {
+    "name": "Test User", "username": "test-user", "email": "test@example.com", "bio": "Bio", "gender": "other",
+    "canPublish": True, "isActive": True, "pageVisibility": "public", "postVisibility": "public",
+}
+
+
+def put(cache, key, body, ttl=60, generation=None):
+    cache.put(key, body, 200, [('Content-Type', 'application/json')], ttl, cache.generation if generation is None else generation)
+
+
+class TestResponseCache:
+    def test_serves_cached_responses(self):
+        cache = ResponseCache(1024)
+        assert cache.get(KEY) is None
+        put(cache, KEY, b'[]')
+        entry = cache.get(KEY)
+        assert entry.body == b'[]' and entry.status == 200
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    def test_keys_ignore_the_order_of_arguments(self):
+        assert ResponseCache.key('r', '/p', [('a', '1'), ('b', '2')], None) == ResponseCache.key('r', '/p', [('b', '2'), ('a', '1')], None)
+        assert ResponseCache.key('r', '/p', [], 'application/json') != ResponseCache.key('r', '/p', [], 'application/x-ndjson')
+
+    def test_expires_entries_after_their_ttl(self):
+        cache = ResponseCache(1024)
+        put(cache, KEY, b'[]', ttl=0)
+        assert cache.get(KEY) is None
+        assert cache.stats()["expirations"] == 1
+        assert cache.stats()["bytes"] == 0
+
+    def test_evicts_least_recently_used_entries_beyond_max_bytes(self):
+        cache = ResponseCache(10)
+        put(cache, 'a', b'aaaa')
+        put(cache, 'b', b'bbbb')
+        cache.get('a')
+        put(cache, 'c', b'cccc')
+        assert cache.get('b') is None
+        assert cache.get('a') is not None and cache.get('c') is not None
+        assert cache.stats()["bytes"] == 8
+
+    def test_never_caches_bodies_larger_than_max_bytes(self):
+        cache = ResponseCache(4)
+        put(cache, KEY, b'12345')
+        assert cache.get(KEY) is None
+
+    def test_clear_drops_every_entry(self):
+        cache = ResponseCache(1024)
+        put(cache, KEY, b'[]')
+        cache.clear()
+        assert cache.get(KEY) is None
+        assert cache.stats()["invalidations"] == 1
+
+    def test_drops_responses_built_before_a_clear(self):
+        cache = ResponseCache(1024)
+        generation = cache.generation
+        cache.clear()
+        put(cache, KEY, b'[]', generation=generation)
+        assert cache.get(KEY) is None
+
+    def test_captures_streamed_bodies_once_finished(self):
+        cache = ResponseCache(1024)
+        capture = cache.capture(KEY, 200, [], 60, cache.generation)
+        capture.add(b'[1,')
+        assert cache.get(KEY) is None
+        capture.add(b'2]')
+        capture.finish()
+        assert cache.get(KEY).body == b'[1,2]'
+
+    def test_never_captures_bodies_larger_than_max_bytes(self):
+        cache = ResponseCache(4)
+        capture = cache.capture(KEY, 200, [], 60, cache.generation)
+        capture.add(b'123')
+        capture.add(b'456')
+        capture.finish()
+        assert cache.get(KEY) is None
+
+    def test_exports_its_counters(self):
+        cache = ResponseCache(1024)
+        put(cache, KEY, b'[]')
+        cache.get(KEY)
+        lines = cache.prometheus()
+        assert 'backend_cache_hits_total 1' in lines
+        assert 'backend_cache_misses_total 0' in lines
+        assert 'backend_cache_bytes 2' in lines
+
+
+class TestCachedEndpoints:
+    def page_list_queries(self, database):
+        return [query for query in database.queries if 'sort $page-id' in query]
+
+    def test_serves_repeated_reads_from_the_cache(self, client, database):
+        database.on('sort $page-id', documents=[{'id': 'page-1'}])
+        first = client.get('/api/pages?limit=10')
+        second = client.get('/api/pages?limit=10')
+        assert first.status_code == second.status_code == 200
+        assert second.content == first.content
+        assert len(self.page_list_queries(database)) == 1
+
+    def test_writes_clear_the_cache(self, client, database):
+        database.on('sort $page-id', documents=[{'id': 'page-1'}])
+        client.get('/api/pages?limit=10')
+        assert client.post('/api/create-user', json=USER).status_code == 200
+        database.on('sort $page-id', documents=[{'id': 'page-1'}, {'id': 'page-2'}])
+        response = client.get('/api/pages?limit=10')
+        assert [page['id'] for page in response.json()] == ['page-1', 'page-2']
+        assert len(self.page_list_queries(database)) == 2
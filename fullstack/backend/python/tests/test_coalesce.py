@@ -0,0 +1,164 @@
+import threading
+import time
+import pytest
+import coalesce
+from coalesce import Coalescer, CoalescedError
+from pool import TransactionPool
+from typedb.driver import TransactionType
+
+QUERY = 'match $page isa page; fetch { "id": $page.page-id };'
+PAGES = [{'id': 'page-1'}, {'id': 'page-2'}]
+
+
+class GatedTransaction:
+    """A transaction whose queries only start once the gate is opened, so that other requests can join them."""
+
+    def __init__(self, tx, gate):
+        self._tx = tx
+        self._gate = gate
+
+    def query(self, query, *args, **kwargs):
+        self._gate.wait()
+        return self._tx.query(query, *args, **kwargs)
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for the coalescer."
+        time.sleep(0.001)
+
+
+class Request(threading.Thread):
+    def __init__(self, coalescer, tx, generation=0):
+        super().__init__()
+        self._tx = coalescer.wrap(tx, generation)
+        self.documents = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.documents = list(self._tx.query(QUERY).resolve().as_concept_documents())
+        except BaseException as error:
+            self.error = error
+
+
+class TestCoalescer:
+    @pytest.fixture
+    def gate(self):
+        return threading.Event()
+
+    def gated(self, driver, gate):
+        return GatedTransaction(driver.transaction('test', TransactionType.READ), gate)
+
+    def run_shared(self, coalescer, driver, gate, followers):
+        leader = Request(coalescer, self.gated(driver, gate))
+        leader.start()
+        wait_until(lambda: coalescer.stats()["inFlight"] == 1)
+        requests = [Request(coalescer, driver.transaction('test', TransactionType.READ)) for _ in range(followers)]
+        for request in requests:
+            request.start()
+        wait_until(lambda: coalescer.stats()["coalesced"] == followers)
+        gate.set()
+        for request in [leader, *requests]:
+            request.join()
+        return leader, requests
+
+    def test_lone_requests_get_the_driver_s_answer(self, driver):
+        driver.on(QUERY, documents=PAGES)
+        coalescer = Coalescer()
+        tx = driver.transaction('test', TransactionType.READ)
+        answer = coalescer.wrap(tx, 0).query(QUERY).resolve()
+        # Not read into a list first, so it still streams from the driver.
+        assert not isinstance(answer, coalesce._SharedAnswer)
+        assert list(answer.as_concept_documents()) == PAGES
+        assert coalescer.stats()["inFlight"] == 0
+
+    def test_identical_queries_in_flight_share_one_execution(self, driver, gate):
+        driver.on(QUERY, documents=PAGES)
+        coalescer = Coalescer()
+        leader, followers = self.run_shared(coalescer, driver, gate, followers=2)
+        assert [request.documents for request in [leader, *followers]] == [PAGES] * 3
+        assert driver.queries == [QUERY]
+        assert coalescer.stats() == {"executions": 1, "coalesced": 2, "inFlight": 0, "maxFanOut": 2}
+
+    def test_shared_documents_are_copies(self, driver, gate):
+        driver.on(QUERY, documents=PAGES)
+        leader, [follower] = self.run_shared(Coalescer(), driver, gate, followers=1)
+        leader.documents[0]['id'] = 'changed'
+        assert follower.documents == PAGES
+
+    def test_failures_raise_a_new_error_in_each_follower(self, driver, gate):
+        error = RuntimeError("The query failed.")
+        driver.on(QUERY, error=error)
+        leader, followers = self.run_shared(Coalescer(), driver, gate, followers=2)
+        assert leader.error is error
+        for follower in followers:
+            assert isinstance(follower.error, CoalescedError)
+            assert follower.error.__cause__ is error
+        assert followers[0].error is not followers[1].error
+
+    def test_later_queries_run_again_after_a_failure(self, driver):
+        coalescer = Coalescer()
+        tx = coalescer.wrap(driver.transaction('test', TransactionType.READ), 0)
+        driver.on(QUERY, error=RuntimeError("The query failed."))
+        with pytest.raises(RuntimeError):
+            tx.query(QUERY).resolve()
+        driver.on(QUERY, documents=PAGES)
+        assert list(tx.query(QUERY).resolve().as_concept_documents()) == PAGES
+
+    def test_queries_across_a_write_are_not_shared(self, driver, gate):
+        driver.on(QUERY, documents=PAGES)
+        coalescer = Coalescer()
+        leader = Request(coalescer, self.gated(driver, gate), generation=0)
+        leader.start()
+        wait_until(lambda: coalescer.stats()["inFlight"] == 1)
+        later = Request(coalescer, driver.transaction('test', TransactionType.READ), generation=1)
+        later.start()
+        wait_until(lambda: not later.is_alive() or coalescer.stats()["coalesced"])
+        gate.set()
+        for request in [leader, later]:
+            request.join()
+        assert leader.documents == later.documents == PAGES
+        assert coalescer.stats()["executions"] == 2 and coalescer.stats()["coalesced"] == 0
+
+    def test_transactions_opened_before_a_write_are_not_shared_after_it(self, driver, gate):
+        driver.on(QUERY, documents=PAGES)
+        coalescer = Coalescer()
+        gates = [gate]
+
+        def instrument(tx, acquire_seconds, generation):
+            # Only the first transaction handed out waits for the gate.
+            return coalescer.wrap(GatedTransaction(tx, gates.pop()) if gates else tx, generation)
+
+        pool = TransactionPool(driver, 'test', size=2, max_age=60, max_uses=100, acquire_timeout=1,
+                               refresh_interval=60, instrument=instrument)
+        acquired = threading.Event()
+        written = threading.Event()
+        documents = {}
+
+        def read(name, before=lambda: None):
+            with pool.transaction() as tx:
+                before()
+                documents[name] = list(tx.query(QUERY).resolve().as_concept_documents())
+
+        # The leader takes its transaction before the write, and only runs its query after it.
+        leader = threading.Thread(target=read, args=('leader', lambda: (acquired.set(), written.wait())))
+        leader.start()
+        acquired.wait()
+        pool.invalidate()
+        written.set()
+        wait_until(lambda: coalescer.stats()["inFlight"] == 1)
+        later = threading.Thread(target=read, args=('later',))
+        later.start()
+        wait_until(lambda: 'later' in documents or coalescer.stats()["coalesced"])
+        gate.set()
+        for thread in [leader, later]:
+            thread.join()
+        assert documents == {'leader': PAGES, 'later': PAGES}
+        assert coalescer.stats()["executions"] == 2 and coalescer.stats()["coalesced"] == 0
+
+    def test_queries_with_options_are_never_shared(self, driver):
+        coalescer = Coalescer()
+        coalescer.wrap(driver.transaction('test', TransactionType.READ), 0).query(QUERY, None).resolve()
+        assert coalescer.stats()["executions"] == 0
@@ -0,0 +1,58 @@
+import gzip
+import pytest
+import compression
+from compression import Compression
+
+PAGES = [{'id': f'page-{index}', 'bio': 'A bio that repeats itself. ' * 4} for index in range(50)]
+
+
+class TestCompression:
+    @pytest.fixture
+    def gzip_only(self, monkeypatch):
+        monkeypatch.setattr(compression, 'brotli', None)
+
+    def test_prefers_brotli(self):
+        pytest.importorskip('brotli')
+        assert Compression(0, 6, 4).negotiate('gzip, br', 'application/json') == 'br'
+
+    def test_falls_back_to_gzip_without_brotli(self, gzip_only):
+        assert Compression(0, 6, 4).negotiate('gzip, br', 'application/json') == 'gzip'
+
+    @pytest.mark.parametrize('accept_encoding, content_type', [
+        (None, 'application/json'), ('identity', 'application/json'), ('gzip', 'image/png'), ('gzip', None),
+    ])
+    def test_leaves_other_bodies_alone(self, gzip_only, accept_encoding, content_type):
+        assert Compression(0, 6, 4).negotiate(accept_encoding, content_type) is None
+
+    def test_compresses_streams_chunk_by_chunk(self):
+        gzip_compression = Compression(4, 6, 4)
+        buffered, rest = gzip_compression.head(iter([b'ab', b'cd', b'ef', b'gh']))
+        assert buffered == [b'ab', b'cd']
+        chunks = list(gzip_compression.compress_stream(buffered, rest, 'gzip'))
+        assert len(chunks) == 4
+        assert gzip.decompress(b''.join(chunks)) == b'abcdefgh'
+
+    def test_short_streams_are_read_whole(self):
+        buffered, rest = Compression(100, 6, 4).head(iter([b'ab', b'cd']))
+        assert buffered == [b'ab', b'cd'] and rest is None
+
+
+class TestCompressedEndpoints:
+    @pytest.mark.parametrize('path', ['/api/pages', '/api/pages?limit=100'])
+    def test_compresses_large_responses(self, client, database, path):
+        database.on('isa page', documents=PAGES)
+        response = client.get(path, headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert response.json() == PAGES
+
+    def test_weakens_the_etag_of_compressed_responses(self, client, database):
+        database.on('isa page', documents=PAGES)
+        response = client.get('/api/pages?limit=100', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['ETag'].startswith('W/')
+
+    def test_leaves_small_responses_alone(self, client, database):
+        database.on('isa page', documents=PAGES[:1])
+        response = client.get('/api/pages', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+        assert response.json() == PAGES[:1]
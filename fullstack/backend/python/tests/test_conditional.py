@@ -0,0 +1,66 @@
+import sys
+import pytest
+import conditional
+import streaming
+
+PAGES = [{'id': f'page-{index}', 'bio': 'A bio.'} for index in range(100)]
+
+
+class TestConditionalEndpoints:
+    @pytest.mark.parametrize('path', [
+        '/api/pages?limit=10', '/api/user/page-1', '/api/posts?pageId=page-1&limit=10', '/api/comments?postId=post-1&limit=10',
+        # Unpaginated lists are streamed, and still polled this way.
+        '/api/pages', '/api/posts?pageId=page-1', '/api/comments?postId=post-1',
+    ])
+    def test_unchanged_responses_are_not_modified(self, client, database, path):
+        database.on('match', documents=[{'id': 'page-1', 'postId': 'post-1', 'commentId': 'comment-1'}])
+        response = client.get(path)
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert response.headers['Cache-Control'] == 'no-cache'
+
+        response = client.get(path, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.content == b''
+        assert response.headers['ETag'] == etag
+
+        # Weak validators match too, as compression may have weakened the tag.
+        assert client.get(path, headers={'If-None-Match': f'W/{etag}'}).status_code == 304
+
+    def test_changed_responses_are_sent_in_full(self, client, database):
+        database.on('has id "page-1"', documents=[{'name': 'Before'}])
+        etag = client.get('/api/user/page-1').headers['ETag']
+        database.on('has id "page-1"', documents=[{'name': 'After'}])
+        client.post('/api/create-user', json={
+            "name": "After", "username": "page-1", "email": "page-1@example.com", "bio": "Bio", "gender": "other",
+            "canPublish": True, "isActive": True, "pageVisibility": "public", "postVisibility": "public",
+        })
+        response = client.get('/api/user/page-1', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.json() == {'name': 'After'}
+        assert response.headers['ETag'] != etag
+
+    def test_unpaginated_lists_change_with_their_content(self, client, database):
+        database.on('commenting', documents=[{'commentId': 'comment-1'}])
+        etag = client.get('/api/comments?postId=post-1').headers['ETag']
+        database.on('commenting', documents=[{'commentId': 'comment-1'}, {'commentId': 'comment-2'}])
+        response = client.get('/api/comments?postId=post-1', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+
+    def test_large_streamed_lists_are_sent_without_an_etag(self, client, database, monkeypatch):
+        for module in [conditional, sys.modules.get('asgi')]:
+            if module is not None:
+                monkeypatch.setattr(module, 'CONDITIONAL_MAX_BYTES', 1000)
+        # Several chunks are read before the limit, and must still be sent ahead of the rest.
+        monkeypatch.setattr(streaming, 'CHUNK_SIZE', 100)
+        database.on('isa page', documents=PAGES)
+        response = client.get('/api/pages')
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+        assert response.json() == PAGES
+
+    def test_errors_have_no_etag(self, client, database):
+        response = client.get('/api/posts')
+        assert response.status_code == 400
+        assert 'ETag' not in response.headers
@@ -0,0 +1,111 @@
+import time
+import pytest
+import handlers
+import pages
+import queries
+from counters import PageCounters
+from typedb.driver import TransactionType
+
+
+def load(driver, friends, followers):
+    driver.on(queries.PAGE_IDS_QUERY, rows=[{'id': id} for id in ['page-1', 'page-2', 'page-3']])
+    driver.on(queries.FRIEND_COUNTS_QUERY, rows=[{'id': id, 'count': count} for id, count in friends.items()])
+    driver.on(queries.FOLLOWER_COUNTS_QUERY, rows=[{'id': id, 'count': count} for id, count in followers.items()])
+
+
+def make_counters(driver, refresh_interval=0):
+    return PageCounters(lambda: driver.transaction('test', TransactionType.READ), refresh_interval)
+
+
+class TestPageCounters:
+    def test_loads_counts_of_every_page(self, driver):
+        load(driver, {'page-1': 2}, {'page-2': 5})
+        counters = make_counters(driver).start()
+        assert counters.get('page-1') == {'numberOfFriends': 2, 'numberOfFollowers': 0}
+        assert counters.get('page-2') == {'numberOfFriends': 0, 'numberOfFollowers': 5}
+        assert counters.get('page-3') == {'numberOfFriends': 0, 'numberOfFollowers': 0}
+        assert counters.get('page-4') is None
+        assert counters.stats()["pages"] == 3 and counters.stats()["loadedAt"] is not None
+
+    def test_counts_the_backend_s_own_writes(self, driver):
+        load(driver, {}, {})
+        counters = make_counters(driver).start()
+        counters.add_friendship('page-1', 'page-2')
+        counters.add_following('page-3')
+        counters.add_following('page-4')
+        assert counters.get('page-1')['numberOfFriends'] == counters.get('page-2')['numberOfFriends'] == 1
+        assert counters.get('page-3')['numberOfFollowers'] == 1
+        assert counters.get('page-4') is None
+
+    def test_refreshes_replace_counts(self, driver):
+        load(driver, {'page-1': 1}, {})
+        counters = make_counters(driver, refresh_interval=0.01).start()
+        try:
+            counters.add_friendship('page-1', 'page-2')
+            load(driver, {'page-1': 7}, {})
+            deadline = time.monotonic() + 2
+            while counters.get('page-1')['numberOfFriends'] != 7:
+                assert time.monotonic() < deadline, "The counters were never refreshed."
+                time.sleep(0.01)
+        finally:
+            counters.close()
+
+    def test_keeps_counts_when_a_refresh_fails(self, driver):
+        load(driver, {'page-1': 1}, {})
+        counters = make_counters(driver).start()
+        driver.on(queries.PAGE_IDS_QUERY, error=RuntimeError("Connection lost."))
+        with pytest.raises(RuntimeError):
+            counters.refresh()
+        assert counters.get('page-1')['numberOfFriends'] == 1
+
+
+class TestRelationEndpoints:
+    @pytest.fixture
+    def counters(self, database, monkeypatch):
+        load(database, {'page-1': 1}, {'page-1': 4})
+        counters = make_counters(database).start()
+        monkeypatch.setattr(handlers, 'page_counters', counters)
+        monkeypatch.setattr(pages, 'page_counters', counters)
+        database.reset()
+        return counters
+
+    def test_creates_friendships(self, client, database):
+        database.on('isa friendship', rows=[{'_': 'friendship'}])
+        response = client.post('/api/create-friendship', json={'pageId': 'page-1', 'friendId': 'page-2'})
+        assert response.status_code == 200
+        [[query]] = database.committed
+        assert 'has id "page-1"' in query and 'has id "page-2"' in query
+
+    def test_creates_followings(self, client, database):
+        database.on('isa following', rows=[{'_': 'following'}])
+        response = client.post('/api/create-following', json={'pageId': 'page-1', 'followerId': 'page-2'})
+        assert response.status_code == 200
+        [[query]] = database.committed
+        assert 'follower: $follower' in query
+
+    @pytest.mark.parametrize('path, payload', [
+        ('/api/create-friendship', {'pageId': 'page-1', 'friendId': 'nobody'}),
+        ('/api/create-following', {'pageId': 'nobody', 'followerId': 'page-2'}),
+    ])
+    def test_unknown_pages_are_not_found(self, client, database, path, payload):
+        response = client.post(path, json=payload)
+        assert response.status_code == 404
+        assert 'error' in response.json()
+
+    def test_writes_are_counted(self, client, database, counters):
+        database.on('isa friendship', rows=[{'_': 'friendship'}])
+        database.on('isa following', rows=[{'_': 'following'}])
+        client.post('/api/create-friendship', json={'pageId': 'page-1', 'friendId': 'page-2'})
+        client.post('/api/create-following', json={'pageId': 'page-1', 'followerId': 'page-2'})
+        assert counters.get('page-1') == {'numberOfFriends': 2, 'numberOfFollowers': 5}
+        assert counters.get('page-2') == {'numberOfFriends': 1, 'numberOfFollowers': 0}
+
+    def test_failed_writes_are_not_counted(self, client, database, counters):
+        client.post('/api/create-friendship', json={'pageId': 'page-1', 'friendId': 'nobody'})
+        assert counters.get('page-1') == {'numberOfFriends': 1, 'numberOfFollowers': 4}
+
+    def test_page_reads_take_counts_from_the_counters(self, client, database, counters):
+        database.on('has id "page-1"', documents=[{'name': 'Page 1'}])
+        page = client.get('/api/user/page-1').json()
+        assert page == {'name': 'Page 1', 'numberOfFriends': 1, 'numberOfFollowers': 4}
+        assert 'return count' not in database.queries[-1]
@@ -0,0 +1,51 @@
+import pytest
+import queries
+from pages import FieldSelectionError, selected_fields
+from templates import TEMPLATES
+
+
+class TestSelectedFields:
+    def test_without_fields_every_field_is_fetched(self):
+        assert selected_fields(None) is None
+
+    def test_reads_a_comma_separated_list(self):
+        assert selected_fields(' name, bio ,,') == {'name', 'bio'}
+
+    @pytest.mark.parametrize('value', ['', ' , ', 'name,password'])
+    def test_rejects_empty_and_unknown_fields(self, value):
+        with pytest.raises(FieldSelectionError):
+            selected_fields(value)
+
+
+class TestFieldQueries:
+    def test_fetches_only_the_selected_fields(self):
+        query = queries.page_query('page-1', fields={'name', 'numberOfFriends'})
+        assert '"name": $page.name' in query and 'friendship' in query
+        assert '"bio"' not in query and 'following' not in query
+
+    def test_selections_in_any_order_share_a_template(self):
+        first = queries.page_query('page-1', fields=['bio', 'name'])
+        second = queries.page_query('page-2', fields=['name', 'bio'])
+        assert first.template is second.template
+        assert first.label == 'page_fields'
+
+    def test_variant_templates_are_bounded_and_not_registered(self):
+        for size in range(1, queries.VARIANT_TEMPLATES_PER_SHAPE + 10):
+            queries.page_batch_query([f'page-{index}' for index in range(size)])
+        assert queries._page_batch_template.cache_info().currsize == queries.VARIANT_TEMPLATES_PER_SHAPE
+        assert not any(name.startswith('page_batch') for name in TEMPLATES)
+
+
+class TestFieldEndpoints:
+    def test_returns_only_the_selected_fields(self, client, database):
+        database.on('has id "page-1"', documents=[{'name': 'Page 1'}])
+        response = client.get('/api/user/page-1?fields=name')
+        assert response.status_code == 200
+        assert response.json() == {'name': 'Page 1'}
+        assert '"bio"' not in database.queries[-1]
+
+    def test_unknown_fields_are_bad_requests(self, client, database):
+        response = client.get('/api/user/page-1?fields=password')
+        assert response.status_code == 400
+        assert 'password' in response.json()['error']
+        assert database.queries == []
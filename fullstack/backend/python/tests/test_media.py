@@ -0,0 +1,117 @@
+import os
+import pytest
+import services
+from media import FALLBACK_TYPE, MediaStore, MediaTooLargeError, media_type
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256))
+
+
+def store_blob(store, content, content_type):
+    upload = store.upload()
+    upload.write(content)
+    return upload.commit(content_type)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MediaStore(str(tmp_path), max_bytes=1024, memory_bytes=1024, memory_item_bytes=512)
+
+
+class TestMediaType:
+    @pytest.mark.parametrize('content_type, expected', [
+        ('image/png', 'image/png'),
+        ('Image/PNG; charset=binary', 'image/png'),
+        ('video/mp4', 'video/mp4'),
+        ('image/svg+xml', FALLBACK_TYPE),
+        ('text/html', FALLBACK_TYPE),
+        ('application/javascript', FALLBACK_TYPE),
+        ('image/png\r\nSet-Cookie: a=b', FALLBACK_TYPE),
+        ('', FALLBACK_TYPE),
+        (None, FALLBACK_TYPE),
+    ])
+    def test_only_images_and_videos_keep_their_type(self, content_type, expected):
+        assert media_type(content_type) == expected
+
+
+class TestMediaStore:
+    def test_stores_blobs_under_their_digest(self, store):
+        id = store_blob(store, PNG, 'image/png')
+        assert store_blob(store, PNG, 'image/png') == id
+        blob = store.lookup(id)
+        assert (blob.content_type, blob.size) == ('image/png', len(PNG))
+        with open(blob.path, 'rb') as file:
+            assert file.read() == PNG
+
+    def test_leaves_no_temporary_files(self, store):
+        store_blob(store, PNG, 'image/png')
+        assert os.listdir(store.incoming) == []
+
+    def test_rejects_uploads_over_max_bytes(self, store):
+        upload = store.upload()
+        with pytest.raises(MediaTooLargeError):
+            upload.write(b'x' * 1025)
+        upload.abort()
+        assert os.listdir(store.incoming) == []
+
+    @pytest.mark.parametrize('id', ['med-' + '0' * 32, 'med-../../etc/passwd', 'nonsense'])
+    def test_unknown_ids_are_not_found(self, store, id):
+        assert store.lookup(id) is None
+
+    def test_sanitizes_types_stored_before_they_were(self, store):
+        id = store_blob(store, b'<script></script>', 'text/plain')
+        with open(store.blob_path(id) + '.type', 'w') as type_file:
+            type_file.write('text/html')
+        assert store.lookup(id).content_type == FALLBACK_TYPE
+
+    def test_keeps_small_blobs_in_memory(self, store):
+        blob = store.lookup(store_blob(store, PNG, 'image/png'))
+        assert store.read_small(blob) == PNG
+        os.remove(blob.path)
+        assert store.read_small(blob) == PNG
+        assert store.stats()["memoryHits"] == 1
+
+    def test_never_keeps_large_blobs_in_memory(self, store):
+        blob = store.lookup(store_blob(store, b'x' * 1000, 'image/png'))
+        assert store.read_small(blob) is None
+
+
+class TestMediaEndpoints:
+    def upload(self, client, content, content_type):
+        response = client.post('/api/media', data=content, headers={'Content-Type': content_type})
+        assert response.status_code == 200
+        return response.json()['id']
+
+    def test_serves_uploads(self, client):
+        id = self.upload(client, PNG, 'image/png')
+        response = client.get(f'/api/media/{id}')
+        assert response.status_code == 200
+        assert response.content == PNG
+        assert response.headers['Content-Type'] == 'image/png'
+        assert response.headers['X-Content-Type-Options'] == 'nosniff'
+        assert 'immutable' in response.headers['Cache-Control']
+        assert 'Content-Disposition' not in response.headers
+
+        response = client.get(f'/api/media/{id}', headers={'If-None-Match': response.headers['ETag']})
+        assert response.status_code == 304
+
+    def test_serves_other_uploads_as_downloads(self, client):
+        id = self.upload(client, b'<html><script>alert(1)</script></html>', 'text/html')
+        response = client.get(f'/api/media/{id}')
+        assert response.headers['Content-Type'] == FALLBACK_TYPE
+        assert response.headers['Content-Disposition'] == 'attachment'
+        assert response.headers['X-Content-Type-Options'] == 'nosniff'
+
+    def test_serves_ranges(self, client):
+        id = self.upload(client, PNG, 'image/png')
+        response = client.get(f'/api/media/{id}', headers={'Range': 'bytes=0-7'})
+        assert response.status_code == 206
+        assert response.content == PNG[:8]
+
+    def test_unknown_media_is_not_found(self, client):
+        assert client.get('/api/media/med-' + 'f' * 32).status_code == 404
+
+    def test_rejects_uploads_over_max_bytes(self, client, monkeypatch):
+        monkeypatch.setattr(services.media_store, 'max_bytes', 16)
+        response = client.post('/api/media', data=PNG, headers={'Content-Type': 'image/png'})
+        assert response.status_code == 413
+        assert os.listdir(services.media_store.incoming) == []
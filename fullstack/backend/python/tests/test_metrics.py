@@ -0,0 +1,56 @@
+from metrics import Histogram, histogram_lines, query_label
+import queries
+
+
+class TestHistogram:
+    def test_estimates_quantiles_within_buckets(self):
+        histogram = Histogram((1.0, 2.0, 4.0))
+        for value in [0.5, 1.5, 1.5, 3.0]:
+            histogram.observe(value)
+        assert histogram.count == 4 and histogram.sum == 6.5
+        assert histogram.quantile(0.25) == 1.0
+        assert histogram.quantile(0.5) == 1.5
+        assert histogram.quantile(1.0) == 4.0
+
+    def test_quantiles_beyond_the_last_bucket_are_its_bound(self):
+        histogram = Histogram((1.0,))
+        histogram.observe(10.0)
+        assert histogram.quantile(0.99) == 1.0
+
+    def test_empty_histograms_have_no_quantiles(self):
+        assert Histogram().quantile(0.5) is None
+
+    def test_exports_cumulative_buckets(self):
+        histogram = Histogram((1.0, 2.0))
+        histogram.observe(0.5)
+        histogram.observe(1.5)
+        lines = []
+        histogram_lines(lines, 'test_seconds', 'Help.', {(('route', '/a"b'),): histogram})
+        assert 'test_seconds_bucket{route="/a\\"b",le="1.0"} 1' in lines
+        assert 'test_seconds_bucket{route="/a\\"b",le="+Inf"} 2' in lines
+        assert 'test_seconds_count{route="/a\\"b"} 2' in lines
+
+
+class TestQueryLabels:
+    def test_rendered_queries_are_labeled_by_template(self):
+        assert query_label(queries.posts_query('page-1')) == 'posts'
+
+    def test_other_queries_are_adhoc(self):
+        assert query_label('match $x isa page;') == 'adhoc'
+
+
+class TestTimedEndpoints:
+    def test_responses_report_server_timing(self, client, database):
+        response = client.get('/api/pages?limit=1')
+        assert 'total;dur=' in response.headers['Server-Timing']
+
+    def test_metrics_are_exported(self, client, database):
+        client.get('/api/posts?pageId=page-1&limit=1')
+        metrics = client.get('/metrics').content.decode()
+        assert 'backend_request_duration_seconds_count{route="/api/posts"}' in metrics
+        assert 'backend_query_duration_seconds_count{query="posts_page"}' in metrics
+        assert 'backend_cache_misses_total' in metrics
+
+    def test_stats_report_latency(self, client, database):
+        client.get('/api/pages?limit=1')
+        assert '/api/pages' in client.get('/api/stats').json()['latency']['routes']
@@ -0,0 +1,83 @@
+import pytest
+from pagination import PaginationError, encode_cursor, decode_cursor, page_args
+
+PAGES = [{'id': f'page-{index}'} for index in range(1, 4)]
+POSTS = [{'creationTimestamp': f'2024-01-0{day}T00:00:00', 'postId': f'post-{day}'} for day in (3, 2, 1)]
+COMMENTS = [{'creationTimestamp': f'2024-01-0{day}T00:00:00', 'commentId': f'comment-{day}'} for day in (1, 2, 3)]
+
+
+class TestCursors:
+    @pytest.mark.parametrize('values', [['page-1'], ['2024-01-01T00:00:00', 'post-1'], ['ünïcödé', '"quoted"']])
+    def test_round_trip(self, values):
+        assert decode_cursor(encode_cursor(values), len(values)) == tuple(values)
+
+    def test_are_url_safe(self):
+        cursor = encode_cursor(['?&=/+' * 10])
+        assert all(character.isalnum() or character in '-_' for character in cursor)
+
+    @pytest.mark.parametrize('cursor', ['', 'not a cursor', encode_cursor(['a', 'b']), encode_cursor([1]), encode_cursor({'id': 'a'})])
+    def test_malformed_cursors_are_rejected(self, cursor):
+        with pytest.raises(PaginationError):
+            decode_cursor(cursor, 1)
+
+
+class TestPageArgs:
+    def test_without_a_limit_every_result_is_returned(self):
+        assert page_args({}, 1, 100) == (None, None)
+
+    def test_reads_the_limit_and_cursor(self):
+        assert page_args({'limit': '10', 'cursor': encode_cursor(['page-1'])}, 1, 100) == (10, ('page-1',))
+
+    @pytest.mark.parametrize('args', [{'cursor': encode_cursor(['page-1'])}, {'limit': 'ten'}, {'limit': '0'}, {'limit': '101'}])
+    def test_invalid_arguments_are_rejected(self, args):
+        with pytest.raises(PaginationError):
+            page_args(args, 1, 100)
+
+
+class TestPaginatedEndpoints:
+    def test_pages_are_followed_with_their_cursor(self, client, database):
+        database.on('sort $page-id', documents=PAGES)
+        response = client.get('/api/pages?limit=2')
+        assert response.status_code == 200
+        assert [page['id'] for page in response.json()] == ['page-1', 'page-2']
+        cursor = response.headers['X-Next-Cursor']
+        assert decode_cursor(cursor, 1) == ('page-2',)
+
+        database.on('sort $page-id', documents=PAGES[2:])
+        response = client.get(f'/api/pages?limit=2&cursor={cursor}')
+        assert [page['id'] for page in response.json()] == ['page-3']
+        assert 'X-Next-Cursor' not in response.headers
+        assert '$page-id > "page-2"' in database.queries[-1]
+        assert 'limit 3;' in database.queries[-1]
+
+    def test_posts_are_followed_with_their_cursor(self, client, database):
+        database.on('posting', documents=POSTS)
+        response = client.get('/api/posts?pageId=page-1&limit=2')
+        cursor = response.headers['X-Next-Cursor']
+        assert decode_cursor(cursor, 2) == ('2024-01-02T00:00:00', 'post-2')
+
+        client.get(f'/api/posts?pageId=page-1&limit=2&cursor={cursor}')
+        assert '$timestamp == 2024-01-02T00:00:00; $post-id > "post-2";' in database.queries[-1]
+
+    def test_comments_are_followed_with_their_cursor(self, client, database):
+        database.on('commenting', documents=COMMENTS)
+        response = client.get('/api/comments?postId=post-1&limit=1')
+        cursor = response.headers['X-Next-Cursor']
+        assert decode_cursor(cursor, 2) == ('2024-01-01T00:00:00', 'comment-1')
+
+        client.get(f'/api/comments?postId=post-1&limit=1&cursor={cursor}')
+        assert '$timestamp == 2024-01-01T00:00:00; $comment-id > "comment-1";' in database.queries[-1]
+
+    @pytest.mark.parametrize('path', [
+        '/api/pages?limit=2&cursor=garbage',
+        '/api/pages?cursor=' + encode_cursor(['page-1']),
+        '/api/pages?limit=1000',
+        '/api/posts?pageId=page-1&limit=2&cursor=' + encode_cursor(['page-1']),
+        '/api/posts?pageId=page-1&limit=2&cursor=' + encode_cursor(['2024-01-01"; delete', 'post-1']),
+        '/api/comments?postId=post-1&limit=2&cursor=' + encode_cursor(['not a timestamp', 'comment-1']),
+    ])
+    def test_invalid_arguments_are_bad_requests(self, client, database, path):
+        response = client.get(path)
+        assert response.status_code == 400
+        assert 'error' in response.json()
+        assert database.queries == []
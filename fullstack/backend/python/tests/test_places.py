@@ -0,0 +1,86 @@
+import sys
+import pytest
+import queries
+from places import PlaceIndex
+from typedb.driver import TransactionType
+
+NAMES = {'world': 'World', 'europe': 'Europe', 'france': 'France', 'paris': 'Paris', 'spain': 'Spain'}
+PARENTS = [('europe', 'world'), ('france', 'europe'), ('paris', 'france'), ('spain', 'europe')]
+
+
+def load(driver, names=NAMES, parents=PARENTS):
+    driver.on(queries.PLACES_QUERY, rows=[{'id': id, 'name': name} for id, name in names.items()])
+    driver.on(queries.PLACE_PARENTS_QUERY, rows=[{'child-id': child, 'parent-id': parent} for child, parent in parents])
+
+
+def make_index(driver):
+    return PlaceIndex(lambda: driver.transaction('test', TransactionType.READ), 0)
+
+
+class TestPlaceIndex:
+    def test_finds_every_place_within_a_place(self, driver):
+        load(driver)
+        index = make_index(driver).start()
+        assert index.within('europe') == {'europe', 'france', 'paris', 'spain'}
+        assert index.within('paris') == {'paris'}
+        assert index.within('atlantis') is None
+
+    def test_links_places_up_to_the_root(self, driver):
+        load(driver)
+        index = make_index(driver).start()
+        assert [(link['placeId'], link['parentId']) for link in index.parent_links(['paris'])] == [
+            ('europe', 'world'), ('france', 'europe'), ('paris', 'france'),
+        ]
+        assert index.parent_links(['paris'])[0]['parentName'] == 'World'
+        assert index.parent_links(['paris', 'atlantis']) is None
+
+    def test_survives_cycles(self, driver):
+        load(driver, {'a': 'A', 'b': 'B'}, [('a', 'b'), ('b', 'a')])
+        index = make_index(driver).start()
+        assert index.within('a') == {'a', 'b'}
+        assert len(index.parent_links(['a'])) == 2
+
+    def test_refresh_replaces_the_tree(self, driver):
+        load(driver)
+        index = make_index(driver).start()
+        load(driver, {'world': 'World'}, [])
+        index.refresh()
+        assert index.within('europe') is None
+        assert index.stats()["places"] == 1
+
+
+class TestLocationEndpoints:
+    @pytest.fixture
+    def index(self, client, database, monkeypatch):
+        load(database)
+        index = make_index(database).start()
+        for module in ['app', 'asgi', 'pages']:
+            if module in sys.modules:
+                monkeypatch.setattr(sys.modules[module], 'place_index', index)
+        database.reset()
+        return index
+
+    def test_location_walks_the_tree_without_the_index(self, client, database):
+        client.get('/api/location/europe')
+        assert 'located_in_transitive' in database.queries[-1]
+
+    def test_location_matches_place_ids_with_the_index(self, client, database, index):
+        client.get('/api/location/europe')
+        query = database.queries[-1]
+        assert 'located_in_transitive' not in query
+        assert all(f'$page-place-id == "{id}"' in query for id in ['europe', 'france', 'paris', 'spain'])
+
+    def test_page_locations_come_from_the_index(self, client, database, index):
+        database.on('has id "page-1"', documents=[{'name': 'Page 1', 'locationIds': ['paris']}])
+        page = client.get('/api/user/page-1').json()
+        assert [link['placeId'] for link in page['location']] == ['europe', 'france', 'paris']
+        assert 'locationIds' not in page
+
+    def test_refresh_without_the_index_is_not_found(self, client, database):
+        assert client.post('/api/places/refresh').status_code == 404
+
+    def test_refresh_reloads_the_index(self, client, database, index):
+        load(database, {'world': 'World'}, [])
+        response = client.post('/api/places/refresh')
+        assert response.status_code == 200
+        assert response.json()['places'] == 1
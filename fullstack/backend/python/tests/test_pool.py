@@ -0,0 +1,127 @@
+import threading
+import time
+import pytest
+from pool import TransactionPool, PoolTimeoutError
+
+
+def make_pool(driver, size=2, max_age=60, max_uses=100, acquire_timeout=1):
+    # Not started, so that transactions are only opened by the requests of the test.
+    return TransactionPool(driver, 'test', size=size, max_age=max_age, max_uses=max_uses,
+                           acquire_timeout=acquire_timeout, refresh_interval=60)
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for the pool."
+        time.sleep(0.001)
+
+
+class TestTransactionPool:
+    def test_reuses_idle_transactions(self, driver):
+        pool = make_pool(driver)
+        with pool.transaction() as first:
+            pass
+        with pool.transaction() as second:
+            pass
+        assert second is first
+        assert driver.opened == 1
+        assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 1
+
+    def test_retires_transactions_after_max_uses(self, driver):
+        pool = make_pool(driver, max_uses=2)
+        for _ in range(3):
+            with pool.transaction() as tx:
+                # Several queries in one checkout count as one use.
+                tx.query('match $x isa page;')
+                tx.query('match $x isa post;')
+        assert driver.opened == 2
+
+    def test_retires_transactions_after_max_age(self, driver):
+        pool = make_pool(driver, max_age=0)
+        with pool.transaction() as first:
+            pass
+        with pool.transaction():
+            pass
+        assert not first.is_open()
+        assert driver.opened == 2
+
+    def test_invalidate_retires_transactions_opened_before(self, driver):
+        pool = make_pool(driver)
+        with pool.transaction() as first:
+            pass
+        generation = pool.generation
+        pool.invalidate()
+        assert pool.generation != generation
+        with pool.transaction() as second:
+            pass
+        assert second is not first
+        assert not first.is_open()
+
+    def test_invalidate_retires_transactions_in_use(self, driver):
+        pool = make_pool(driver)
+        with pool.transaction() as first:
+            pool.invalidate()
+        assert not first.is_open()
+        assert pool.stats()["idle"] == 0
+
+    def test_discards_transactions_of_failed_requests(self, driver):
+        pool = make_pool(driver)
+        with pytest.raises(RuntimeError):
+            with pool.transaction() as first:
+                raise RuntimeError("query failed")
+        assert not first.is_open()
+        with pool.transaction() as second:
+            pass
+        assert second is not first
+        assert pool.stats()["open"] == 1
+
+    def test_times_out_when_every_transaction_is_in_use(self, driver):
+        pool = make_pool(driver, size=1, acquire_timeout=0.05)
+        with pool.transaction():
+            with pytest.raises(PoolTimeoutError):
+                with pool.transaction():
+                    pass
+        assert pool.stats()["timeouts"] == 1
+        # The waiter gave up its place, so the pool is still usable.
+        with pool.transaction():
+            pass
+
+    def test_serves_waiters_in_arrival_order(self, driver):
+        pool = make_pool(driver, size=1)
+        served = []
+
+        def request(name):
+            with pool.transaction():
+                served.append(name)
+
+        holder = pool.transaction()
+        holder.__enter__()
+        waiters = []
+        for name in ['first', 'second', 'third']:
+            waiter = threading.Thread(target=request, args=(name,))
+            waiter.start()
+            waiters.append(waiter)
+            wait_until(lambda: pool.stats()["waits"] == len(waiters))
+        holder.__exit__(None, None, None)
+        for waiter in waiters:
+            waiter.join()
+
+        assert served == ['first', 'second', 'third']
+
+    def test_warm_fills_the_pool(self, driver):
+        pool = make_pool(driver, size=3)
+        pool.warm()
+        assert driver.opened == 3
+        assert pool.stats()["idle"] == 3
+        with pool.transaction():
+            pass
+        assert driver.opened == 3
+
+    def test_close_closes_idle_transactions(self, driver):
+        pool = make_pool(driver)
+        with pool.transaction() as tx:
+            pass
+        pool.close()
+        assert not tx.is_open()
+        assert pool.stats()["open"] == 0
@@ -0,0 +1,50 @@
+import json
+import queries
+from metrics import RequestTimer
+from slowlog import SlowQueryLog
+
+
+def finished_timer(route, seconds):
+    timer = RequestTimer(route)
+    timer.duration = seconds
+    return timer
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+class TestSlowQueryLog:
+    def test_logs_slow_requests_with_their_queries(self, tmp_path):
+        path = tmp_path / 'slow.log'
+        log = SlowQueryLog(str(path), threshold=0.5, max_bytes=1024 * 1024, backups=1).start()
+        timer = finished_timer('/api/posts', 0.75)
+        record = timer.record_query(queries.posts_query('pägé-1', limit=10, after=('2024-01-01T00:00:00', 'post-1')))
+        record.rows = 10
+        log(timer)
+        log(finished_timer('/api/pages', 0.25))
+        log.close()
+
+        [line] = read_lines(path)
+        assert line['route'] == '/api/posts' and line['durationMs'] == 750
+        [query] = line['queries']
+        assert query['template'] == query['label'] == 'posts_page_after'
+        assert query['params']['page_id'] == 'pägé-1'
+        assert query['params']['after_timestamp'] == '2024-01-01T00:00:00'
+        assert query['rows'] == 10
+        assert log.stats() == {"logged": 1, "dropped": 0}
+
+    def test_rotates_files(self, tmp_path):
+        path = tmp_path / 'slow.log'
+        log = SlowQueryLog(str(path), threshold=0, max_bytes=300, backups=2).start()
+        for _ in range(10):
+            log(finished_timer('/api/pages', 1))
+        log.close()
+        assert sorted(file.name for file in tmp_path.iterdir()) == ['slow.log', 'slow.log.1', 'slow.log.2']
+
+    def test_drops_records_when_the_writer_falls_behind(self, tmp_path):
+        # Never started, so nothing drains the queue.
+        log = SlowQueryLog(str(tmp_path / 'slow.log'), threshold=0, max_bytes=1024, backups=1, queue_size=2)
+        for _ in range(5):
+            log(finished_timer('/api/pages', 1))
+        assert log.stats() == {"logged": 5, "dropped": 3}
@@ -0,0 +1,51 @@
+import json
+import time
+import pytest
+import services
+import streaming
+from streaming import JSON, NDJSON, encode
+
+PAGES = [{'id': f'page-{index}', 'name': 'Ünïcode "page"'} for index in range(3)]
+
+
+def encoded(documents, mimetype):
+    return b''.join(encode(documents, mimetype)).decode()
+
+
+class TestEncode:
+    @pytest.mark.parametrize('documents', [[], PAGES])
+    def test_json(self, documents):
+        assert json.loads(encoded(documents, JSON)) == documents
+
+    @pytest.mark.parametrize('documents', [[], PAGES])
+    def test_ndjson(self, documents):
+        assert [json.loads(line) for line in encoded(documents, NDJSON).splitlines()] == documents
+
+    def test_writes_in_chunks(self, monkeypatch):
+        monkeypatch.setattr(streaming, 'CHUNK_SIZE', 10)
+        chunks = list(encode(PAGES, JSON))
+        assert len(chunks) > 1
+        assert json.loads(b''.join(chunks)) == PAGES
+
+
+class TestStreamedEndpoints:
+    def test_streams_lists_as_json(self, client, database):
+        database.on('match $page isa page;', documents=PAGES)
+        response = client.get('/api/pages')
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith(JSON)
+        assert response.json() == PAGES
+
+    def test_streams_lists_as_ndjson(self, client, database):
+        database.on('posting', documents=PAGES)
+        response = client.get('/api/posts?pageId=page-1', headers={'Accept': NDJSON})
+        assert response.headers['Content-Type'].startswith(NDJSON)
+        assert [json.loads(line) for line in response.content.splitlines()] == PAGES
+
+    def test_returns_the_transaction_once_sent(self, client, database):
+        client.get('/api/pages')
+        # The pool's refresher may be opening transactions of its own meanwhile, which are only idle once open.
+        deadline = time.monotonic() + 2
+        while services.read_pool.stats()["idle"] != services.read_pool.stats()["open"]:
+            assert time.monotonic() < deadline, "The streamed response kept its transaction."
+            time.sleep(0.01)
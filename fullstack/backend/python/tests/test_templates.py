@@ -0,0 +1,89 @@
+import pytest
+import legacy_queries
+import queries
+from templates import QueryTemplate, Datetime, RenderedQuery, literal, template
+
+
+class TestLiteral:
+    @pytest.mark.parametrize('value, expected', [
+        ('plain', '"plain"'),
+        ('say "hi"', r'"say \"hi\""'),
+        ('back\\slash', r'"back\\slash"'),
+        ('two\nlines\r', r'"two\nlines\r"'),
+        (True, 'true'),
+        (False, 'false'),
+        (42, '42'),
+        (1.5, '1.5'),
+        (Datetime('2024-01-02T03:04:05.678'), '2024-01-02T03:04:05.678'),
+    ])
+    def test_renders_typeql_literals(self, value, expected):
+        assert literal(value) == expected
+
+    def test_strings_cannot_break_out_of_their_quotes(self):
+        rendered = literal('x"; delete $page; match $y isa page, has id "y')
+        assert rendered.startswith('"') and rendered.endswith('"')
+        # Every quote inside is escaped, so the whole value is one string literal.
+        assert '"' not in rendered[1:-1].replace('\\"', '')
+
+    @pytest.mark.parametrize('value', ['2024-01-02', '2024-01-02T03:04"; delete', 20240102, None])
+    def test_datetime_rejects_anything_but_a_datetime(self, value):
+        with pytest.raises(ValueError):
+            Datetime(value)
+
+
+class TestQueryTemplate:
+    def test_renders_placeholders_as_literals(self):
+        query = QueryTemplate('test', 'match $p has id {id}, has name {name}; limit {limit}; {{ }}').render(id='p"1', name='n', limit=3)
+        assert query == r'match $p has id "p\"1", has name "n"; limit 3; { }'
+
+    def test_repeated_placeholders_take_one_parameter(self):
+        query_template = QueryTemplate('test', '{a} {b} {a}')
+        assert query_template.params == ['a', 'b']
+        assert query_template.render(a='x', b='y') == '"x" "y" "x"'
+
+    def test_rendered_queries_know_their_template(self):
+        query_template = QueryTemplate('test_member', 'match $p has id {id};', group='test')
+        query = query_template.render(id='p1')
+        assert isinstance(query, RenderedQuery)
+        assert query.template is query_template
+        assert query.params == {'id': 'p1'}
+        assert query.label == 'test'
+
+    def test_renders_static_templates(self):
+        query_template = QueryTemplate('test', 'match $p isa page; {{ }}')
+        assert query_template.render() == 'match $p isa page; { }'
+        assert query_template.render().params == {}
+
+    def test_renders_of_one_template_share_its_hash(self):
+        query_template = QueryTemplate('test', 'match $p has id {id};')
+        assert query_template.render(id='a').template.hash == query_template.render(id='b').template.hash
+
+    def test_missing_parameters_fail(self):
+        with pytest.raises(KeyError):
+            QueryTemplate('test', 'match $p has id {id};').render()
+
+    @pytest.mark.parametrize('text', ['{id!r}', '{id:>10}', '{0}', '{page.id}'])
+    def test_rejects_placeholders_that_are_not_plain_names(self, text):
+        with pytest.raises(ValueError):
+            QueryTemplate('test', text)
+
+    def test_names_are_registered_once(self):
+        template('test_registered_once', 'match $p isa page;')
+        with pytest.raises(ValueError):
+            template('test_registered_once', 'match $p isa post;')
+
+
+class TestQueries:
+    @pytest.mark.parametrize('builder, legacy_builder, id', [
+        (queries.location_query, legacy_queries.location_query, 'place-1'),
+        (queries.posts_query, legacy_queries.posts_query, 'page-1'),
+    ])
+    def test_render_as_the_builders_they_replaced(self, builder, legacy_builder, id):
+        assert builder(id) == legacy_builder(id)
+
+    def test_escape_ids(self):
+        assert 'has id "p\\"; delete $page;"' in queries.page_query('p"; delete $page;')
+
+    def test_cursor_timestamps_are_validated(self):
+        with pytest.raises(ValueError):
+            queries.posts_query('page-1', limit=10, after=('2024-01-01"; delete', 'post-1'))
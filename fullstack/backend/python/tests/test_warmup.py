@@ -0,0 +1,20 @@
+import services
+from warmup import warm_up
+
+
+class TestWarmUp:
+    def test_runs_each_read_query_shape_once_with_limits(self, database):
+        database.on('sort $page-id', documents=[{'id': 'page-1'}])
+        database.on('posting', documents=[{'postId': 'post-1'}])
+        warm_up()
+        assert services.read_pool.stats()["idle"] > 0
+        page_list, page, posts, comments = database.queries
+        assert 'limit 1;' in page_list
+        assert 'has id "page-1"' in page
+        assert 'has id "page-1"' in posts and 'limit 1;' in posts
+        assert 'has id "post-1"' in comments and 'limit 1;' in comments
+
+    def test_works_against_an_empty_database(self, database):
+        warm_up()
+        [page_list] = database.queries
+        assert 'limit 1;' in page_list
@@ -0,0 +1,119 @@
+import sys
+import threading
+import pytest
+import services
+from typedb.driver import TransactionType
+from writebehind import WriteBehind, WriteBehindClosedError
+
+
+class TestWriteBehind:
+    @pytest.fixture
+    def commits(self):
+        return []
+
+    def make(self, driver, commits, linger=0.05, max_items=3):
+        return WriteBehind(lambda: driver.transaction('test', TransactionType.WRITE), linger=linger,
+                           max_items=max_items, after_commit=lambda: commits.append(len(driver.committed)))
+
+    def test_batches_queries_up_to_max_items(self, driver, commits):
+        write_behind = self.make(driver, commits, linger=10, max_items=3)
+        futures = [write_behind.submit(f'insert {index};') for index in range(3)]
+        write_behind.start()
+        for future in futures:
+            assert future.result(timeout=2) is None
+        write_behind.close()
+        assert driver.committed == [['insert 0;', 'insert 1;', 'insert 2;']]
+        assert commits == [1]
+
+    def test_writes_partial_batches_after_lingering(self, driver, commits):
+        write_behind = self.make(driver, commits, linger=0.01).start()
+        write_behind.write('insert 0;')
+        assert driver.committed == [['insert 0;']]
+        assert write_behind.stats()["batches"] == 1
+        write_behind.close()
+
+    def test_close_writes_queued_queries(self, driver, commits):
+        write_behind = self.make(driver, commits, linger=10, max_items=100)
+        futures = [write_behind.submit(f'insert {index};') for index in range(5)]
+        write_behind.start()
+        write_behind.close()
+        assert all(future.done() for future in futures)
+        assert driver.committed == [[f'insert {index};' for index in range(5)]]
+        with pytest.raises(WriteBehindClosedError):
+            write_behind.submit('insert 5;')
+
+    def test_failed_batches_are_retried_one_query_at_a_time(self, driver, commits):
+        error = RuntimeError("Invalid insert.")
+        driver.on('insert 1;', error=error)
+        write_behind = self.make(driver, commits, linger=10, max_items=3)
+        futures = [write_behind.submit(f'insert {index};') for index in range(3)]
+        write_behind.start()
+        write_behind.close()
+        assert [future.exception() for future in futures] == [None, error, None]
+        assert driver.committed == [['insert 0;'], ['insert 2;']]
+        assert commits == [2]
+        assert write_behind.stats()["failed"] == 1 and write_behind.stats()["transactions"] == 4
+
+    def test_batches_that_all_fail_do_not_invalidate_reads(self, driver, commits):
+        driver.on('insert', error=RuntimeError("Invalid insert."))
+        write_behind = self.make(driver, commits).start()
+        with pytest.raises(RuntimeError):
+            write_behind.write('insert 0;')
+        write_behind.close()
+        assert commits == []
+
+    def test_callers_never_wait_on_a_batch_that_failed_to_finish(self, driver):
+        def after_commit():
+            raise RuntimeError("Invalidation failed.")
+
+        write_behind = WriteBehind(lambda: driver.transaction('test', TransactionType.WRITE), linger=0,
+                                   max_items=10, after_commit=after_commit).start()
+        with pytest.raises(RuntimeError):
+            write_behind.submit('insert 0;').result(timeout=2)
+        write_behind.close()
+
+    def test_callers_are_acknowledged_after_the_commit(self, driver, commits):
+        write_behind = self.make(driver, commits, linger=0.01).start()
+        done = threading.Event()
+
+        def writer():
+            write_behind.write('insert 0;')
+            # Acknowledged only once committed and reads have been invalidated.
+            assert commits == [1]
+            done.set()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        thread.join()
+        write_behind.close()
+        assert done.is_set()
+
+    def test_exports_batch_histograms(self, driver, commits):
+        write_behind = self.make(driver, commits, linger=0).start()
+        write_behind.write('insert 0;')
+        write_behind.close()
+        lines = write_behind.prometheus()
+        assert 'backend_write_batch_size_count 1' in lines
+        assert 'backend_write_batch_queued 0' in lines
+
+
+class TestWriteBehindEndpoints:
+    @pytest.fixture
+    def write_behind(self, client, database, monkeypatch):
+        write_behind = WriteBehind(lambda: database.transaction('test', TransactionType.WRITE), linger=0.01,
+                                   max_items=10, after_commit=services.after_write).start()
+        for module in ['app', 'asgi', 'handlers']:
+            if module in sys.modules:
+                monkeypatch.setattr(sys.modules[module], 'write_behind', write_behind)
+        yield write_behind
+        write_behind.close()
+
+    def test_creates_go_through_the_batches(self, client, database, write_behind):
+        response = client.post('/api/create-group', json={
+            "name": "Group", "groupId": "group-1", "bio": "Bio", "isActive": True, "pageVisibility": "public",
+            "postVisibility": "public",
+        })
+        assert response.status_code == 200
+        [[query]] = database.committed
+        assert query.startswith('insert $_ isa group')
+        assert write_behind.stats()["items"] == 1
@@ -0,0 +1,30 @@
+import logging
+import time
+import queries
+from pages import fetch_page
+from services import read_pool
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """
+    Fills the read transaction pool and runs each read query shape once, so that the first real requests
+    find open transactions and warm server-side caches. Ids for the parameterized queries are taken from
+    the first page, so the warm-up works against any dataset. Every worker runs it, so the list queries
+    are limited to one result to keep its cost independent of the dataset's size.
+    """
+    started = time.monotonic()
+    read_pool.warm()
+
+    with read_pool.transaction() as tx:
+        page = next(tx.query(queries.page_list_query(limit=1)).resolve().as_concept_documents(), None)
+        page_id = page.get('id') if page is not None else None
+        if page_id is not None:
+            fetch_page(tx, page_id)
+            post = next(tx.query(queries.posts_query(page_id, limit=1)).resolve().as_concept_documents(), None)
+            post_id = post.get('postId') if post is not None else None
+            if post_id is not None:
+                list(tx.query(queries.comments_query(post_id, limit=1)).resolve().as_concept_documents())
+
+    logger.info("Warm-up finished in %.2fs.", time.monotonic() - started)
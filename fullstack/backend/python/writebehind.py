@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from metrics import Histogram, histogram_lines
+
+# Upper bounds of the batch size histogram buckets, in queries.
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindClosedError(Exception):
+    pass
+
+
+class WriteBehind:
+    """
+    Commits insert queries in batches from a background thread, one WRITE transaction per batch.
+
+    A batch is written once it holds `max_items` queries, or once its oldest query has waited `linger`
+    seconds. Callers are only acknowledged after their batch has committed and `after_commit` has run, so
+    an acknowledged write is durable and visible to reads, as without batching. A batch that fails is
+    retried one query per transaction, so that an invalid insert only fails its own caller.
+    """
+
+    def __init__(self, transaction, linger, max_items, after_commit):
+        self._transaction = transaction
+        self._linger = linger
+        self._max_items = max_items
+        self._after_commit = after_commit
+        self._pending: list[tuple[str, Future, float]] = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._batches = 0
+        self._items = 0
+        self._failed = 0
+        self._transactions = 0
+        self._batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self._linger_seconds = Histogram()
+        self._commit_seconds = Histogram()
+        self._committer = threading.Thread(target=self._run, name="write-behind", daemon=True)
+
+    def start(self):
+        self._committer.start()
+        return self
+
+    def close(self):
+        """Stops accepting queries, and returns once those already queued have been written."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._committer.join()
+
+    def submit(self, query):
+        """Queues a query. The returned future resolves once its batch has committed, or fails with its error."""
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise WriteBehindClosedError("The write-behind queue is closed.")
+            self._pending.append((query, future, time.monotonic()))
+            self._condition.notify_all()
+        return future
+
+    def write(self, query):
+        self.submit(query).result()
+
+    def stats(self):
+        def summary(histogram):
+            return {
+                "count": histogram.count,
+                "mean": histogram.sum / histogram.count if histogram.count else None,
+                "p50": histogram.quantile(0.50),
+                "p99": histogram.quantile(0.99),
+            }
+
+        with self._condition:
+            return {
+                "queued": len(self._pending),
+                "batches": self._batches,
+                "items": self._items,
+                "failed": self._failed,
+                "transactions": self._transactions,
+                "batchSize": summary(self._batch_sizes),
+                "lingerSeconds": summary(self._linger_seconds),
+                "commitSeconds": summary(self._commit_seconds),
+            }
+
+    def prometheus(self):
+        lines = []
+        with self._condition:
+            histogram_lines(lines, 'backend_write_batch_size', "Queries committed per write-behind batch.",
+                            {(): self._batch_sizes})
+            histogram_lines(lines, 'backend_write_batch_linger_seconds', "Time the oldest query of a write-behind batch waited before its batch was written.",
+                            {(): self._linger_seconds})
+            histogram_lines(lines, 'backend_write_batch_commit_seconds', "Time to write and commit a write-behind batch, retries included.",
+                            {(): self._commit_seconds})
+            lines.append('# HELP backend_write_batch_queued Queries waiting for a write-behind batch.')
+            lines.append('# TYPE backend_write_batch_queued gauge')
+            lines.append(f'backend_write_batch_queued {len(self._pending)}')
+        return lines
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                deadline = self._pending[0][2] + self._linger
+                self._condition.wait_for(
+                    lambda: len(self._pending) >= self._max_items or self._closed,
+                    max(0.0, deadline - time.monotonic()),
+                )
+                batch = self._pending[:self._max_items]
+                del self._pending[:self._max_items]
+            self._flush(batch)
+
+    def _flush(self, batch):
+        lingered = time.monotonic() - batch[0][2]
+        started = time.perf_counter()
+        transactions = 1
+        errors = {}
+        try:
+            try:
+                self._commit([query for query, _, _ in batch])
+            except Exception:
+                for index, (query, _, _) in enumerate(batch):
+                    transactions += 1
+                    try:
+                        self._commit([query])
+                    except Exception as error:
+                        errors[index] = error
+            seconds = time.perf_counter() - started
+            if len(errors) < len(batch):
+                self._after_commit()
+        except Exception as error:
+            # Never leave a caller waiting on a batch the committer gave up on.
+            logger.exception("Write-behind batch of %d queries failed.", len(batch))
+            seconds = time.perf_counter() - started
+            errors = dict.fromkeys(range(len(batch)), error)
+
+        with self._condition:
+            self._batches += 1
+            self._items += len(batch)
+            self._failed += len(errors)
+            self._transactions += transactions
+            self._batch_sizes.observe(len(batch))
+            self._linger_seconds.observe(lingered)
+            self._commit_seconds.observe(seconds)
+
+        for index, (_, future, _) in enumerate(batch):
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(None)
+
+    def _commit(self, queries):
+        with self._transaction() as tx:
+            for query in queries:
+                tx.query(query).resolve()
+            tx.commit()
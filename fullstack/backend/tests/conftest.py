@@ -13,6 +13,23 @@ class TestConfig:
 # Fixture to get test configuration
 def pytest_addoption(parser):
     parser.addoption("--base-url", action="store", default="http://localhost:8080")
+    parser.addoption("--load", action="store_true", default=False, help="run the load test in test_load.py")
+    parser.addoption("--load-concurrency", action="store", type=int, default=8)
+    parser.addoption("--load-duration", action="store", type=float, default=30, help="seconds")
+    parser.addoption("--load-mix", action="store", default=None, help="weights per scenario, e.g. profile=50,posts=30")
+    parser.addoption("--load-report", action="store", default="load-report.json")
+    parser.addoption("--load-max-error-rate", action="store", type=float, default=0.01)
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "load: load tests, which only run with --load")
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--load"):
+        return
+    skip = pytest.mark.skip(reason="load tests only run with --load")
+    for item in items:
+        if "load" in item.keywords:
+            item.add_marker(skip)
 
 @pytest.fixture(scope="session")
 def config(pytestconfig):
@@ -0,0 +1,272 @@
+"""
+Load test for the backend API, against any of the backends.
+
+Each worker thread has its own session and picks a scenario at random by weight, until the duration is
+up. The default mix is read-heavy: page list, profiles, posts, comments, and a few creates. It reports
+throughput, latency percentiles and error rates per scenario and overall, as JSON:
+
+    python loadtest.py --base-url http://localhost:8080 --concurrency 16 --duration 60
+    python loadtest.py --mix profile=50,posts=30,create_user=20 --output report.json
+
+It also runs under pytest, against the same `--base-url` as the other tests, when `--load` is given:
+
+    pytest test_load.py --base-url http://localhost:8080 --load --load-concurrency 16 --load-duration 60
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+import requests
+
+# Relative weights of the scenarios, after the share of each request in production traffic.
+DEFAULT_MIX = {
+    "page_list": 10,
+    "profile": 40,
+    "posts": 25,
+    "comments": 15,
+    "create_user": 6,
+    "create_group": 2,
+    "create_organization": 2,
+}
+
+PROFILE_ROUTES = {"person": "/api/user", "group": "/api/group", "organization": "/api/organization"}
+
+# How many pages have their posts read up front, to have post ids for the comments scenario.
+SEED_PAGES = 20
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Targets:
+    """Ids of existing pages and posts for the read scenarios, read from the backend before the run."""
+
+    def __init__(self, pages, post_ids):
+        self.pages = pages
+        self.post_ids = post_ids
+
+    @classmethod
+    def seed(cls, session, base_url, timeout):
+        response = session.get(f"{base_url}/api/pages", timeout=timeout)
+        response.raise_for_status()
+        # The type is fetched as a type document, with its name under "label".
+        pages = [(page["id"], (page.get("type") or {}).get("label")) for page in response.json() if page.get("id")]
+        if not pages:
+            raise RuntimeError("The backend has no pages to read; load the dataset first.")
+
+        post_ids = []
+        for id, _ in random.sample(pages, min(SEED_PAGES, len(pages))):
+            response = session.get(f"{base_url}/api/posts", params={"pageId": id}, timeout=timeout)
+            if response.ok:
+                post_ids.extend(post["postId"] for post in response.json() if post.get("postId"))
+        return cls(pages, post_ids)
+
+
+def _unique():
+    return uuid.uuid4().hex[:12]
+
+
+def page_list(session, base_url, targets, timeout):
+    return session.get(f"{base_url}/api/pages", timeout=timeout)
+
+
+def profile(session, base_url, targets, timeout):
+    id, type = random.choice(targets.pages)
+    return session.get(f"{base_url}{PROFILE_ROUTES.get(type, '/api/user')}/{id}", timeout=timeout)
+
+
+def posts(session, base_url, targets, timeout):
+    id, _ = random.choice(targets.pages)
+    return session.get(f"{base_url}/api/posts", params={"pageId": id}, timeout=timeout)
+
+
+def comments(session, base_url, targets, timeout):
+    if not targets.post_ids:
+        return posts(session, base_url, targets, timeout)
+    return session.get(f"{base_url}/api/comments", params={"postId": random.choice(targets.post_ids)}, timeout=timeout)
+
+
+def create_user(session, base_url, targets, timeout):
+    unique = _unique()
+    return session.post(f"{base_url}/api/create-user", timeout=timeout, json={
+        "name": f"Load User {unique}",
+        "username": f"load_user_{unique}",
+        "email": f"load_{unique}@example.com",
+        "bio": "Created by the load test",
+        "canPublish": True,
+        "isActive": True,
+        "gender": "other",
+        "language": "en",
+        "pageVisibility": "public",
+        "postVisibility": "public",
+    })
+
+
+def create_group(session, base_url, targets, timeout):
+    unique = _unique()
+    return session.post(f"{base_url}/api/create-group", timeout=timeout, json={
+        "name": f"Load Group {unique}",
+        "groupId": f"load_group_{unique}",
+        "bio": "Created by the load test",
+        "isActive": True,
+        "pageVisibility": "public",
+        "postVisibility": "public",
+    })
+
+
+def create_organization(session, base_url, targets, timeout):
+    unique = _unique()
+    return session.post(f"{base_url}/api/create-organization", timeout=timeout, json={
+        "name": f"Load Org {unique}",
+        "username": f"load_org_{unique}",
+        "bio": "Created by the load test",
+        "isActive": True,
+        "canPublish": True,
+    })
+
+
+SCENARIOS = {
+    "page_list": page_list,
+    "profile": profile,
+    "posts": posts,
+    "comments": comments,
+    "create_user": create_user,
+    "create_group": create_group,
+    "create_organization": create_organization,
+}
+
+
+def parse_mix(text):
+    """Reads a mix such as `profile=50,posts=30`. Scenarios left out are not run."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; expected one of {', '.join(SCENARIOS)}.")
+        mix[name] = float(weight)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("At least one scenario needs a positive weight.")
+    return mix
+
+
+class _Results:
+    def __init__(self, names):
+        self.latencies = {name: [] for name in names}
+        self.errors = {name: Counter() for name in names}
+
+    def record(self, name, seconds, error):
+        # Each worker has its own results, so recording needs no lock.
+        self.latencies[name].append(seconds)
+        if error is not None:
+            self.errors[name][error] += 1
+
+
+def _worker(base_url, targets, mix, deadline, timeout, results):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    with requests.Session() as session:
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = SCENARIOS[name](session, base_url, targets, timeout)
+                # Read to the end, so that streamed responses are timed in full.
+                response.content
+                error = None if response.ok else f"HTTP {response.status_code}"
+            except requests.RequestException as exception:
+                error = type(exception).__name__
+            except Exception as exception:
+                # Counted like any other failed request, rather than silently ending the worker.
+                error = f"unexpected {type(exception).__name__}"
+            results.record(name, time.perf_counter() - started, error)
+
+
+def _summary(latencies, errors, seconds):
+    latencies = sorted(latencies)
+    failed = sum(errors.values())
+    summary = {
+        "requests": len(latencies),
+        "errors": failed,
+        "errorRate": failed / len(latencies) if latencies else None,
+        "throughput": len(latencies) / seconds if seconds else None,
+        "latencyMs": None,
+    }
+    if latencies:
+        summary["latencyMs"] = {
+            "mean": sum(latencies) / len(latencies) * 1000,
+            **{f"p{percentile}": latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))] * 1000
+               for percentile in PERCENTILES},
+            "max": latencies[-1] * 1000,
+        }
+    if errors:
+        summary["errorsByKind"] = dict(errors.most_common())
+    return summary
+
+
+def run(base_url, concurrency, duration, mix=None, timeout=30):
+    """Runs the mix against `base_url` for `duration` seconds, and returns the report."""
+    mix = {name: weight for name, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+    base_url = base_url.rstrip("/")
+    with requests.Session() as session:
+        targets = Targets.seed(session, base_url, timeout)
+
+    started = time.monotonic()
+    deadline = started + duration
+    worker_results = [_Results(mix) for _ in range(concurrency)]
+    workers = [
+        threading.Thread(target=_worker, args=(base_url, targets, mix, deadline, timeout, results), daemon=True)
+        for results in worker_results
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.monotonic() - started
+
+    scenarios = {}
+    all_latencies = []
+    all_errors = Counter()
+    for name in mix:
+        latencies = [latency for results in worker_results for latency in results.latencies[name]]
+        errors = sum((results.errors[name] for results in worker_results), Counter())
+        scenarios[name] = _summary(latencies, errors, seconds)
+        all_latencies.extend(latencies)
+        all_errors.update(errors)
+
+    return {
+        "baseUrl": base_url,
+        "concurrency": concurrency,
+        "durationSeconds": seconds,
+        "mix": mix,
+        "seededPages": len(targets.pages),
+        "seededPosts": len(targets.post_ids),
+        "total": _summary(all_latencies, all_errors, seconds),
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8080")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, default=None, help="weights per scenario, e.g. profile=50,posts=30")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds per request")
+    parser.add_argument("--output", default=None, help="file to write the report to, instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args.base_url, args.concurrency, args.duration, args.mix, args.timeout)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import json
+import pytest
+from loadtest import parse_mix, run
+
+@pytest.mark.load
+class TestLoad:
+    def test_mixed_load(self, pytestconfig, config):
+        """Runs the mixed read/write load, writes its JSON report, and checks the error rate."""
+        mix = pytestconfig.getoption("--load-mix")
+        report = run(
+            config.base_url,
+            concurrency=pytestconfig.getoption("--load-concurrency"),
+            duration=pytestconfig.getoption("--load-duration"),
+            mix=parse_mix(mix) if mix else None,
+            timeout=config.timeout,
+        )
+        with open(pytestconfig.getoption("--load-report"), "w") as output:
+            json.dump(report, output, indent=2)
+        assert report["total"]["requests"] > 0
+        assert report["total"]["errorRate"] <= pytestconfig.getoption("--load-max-error-rate")
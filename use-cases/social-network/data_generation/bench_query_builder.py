@@ -0,0 +1,75 @@
+"""
+Generation time of the query builder against population size.
+
+For each number of persons, builds that many persons alongside the organizations and groups from the
+resource files, then the relations between them in the proportions `query_generator.py` uses for its
+dataset: educations, employments, group memberships, social relations and followings. Prints the time
+each phase took, in seconds, as JSON:
+
+    python bench_query_builder.py --persons 100 400 1600
+
+Run from this directory, as it reads the same resource files as the generator.
+"""
+
+import argparse
+import json
+import time
+from json import load
+from query_builder import QueryBuilder
+from enums import OrganizationType
+
+# Relations per person in the generated dataset: 30 educations and employments, 50 group memberships,
+# 200 social relations and 100 random followings, for the 30 persons of `bios.txt`.
+EDUCATIONS_PER_PERSON = 1.0
+MEMBERSHIPS_PER_PERSON = 50 / 30
+SOCIAL_RELATIONS_PER_PERSON = 200 / 30
+RANDOM_FOLLOWINGS_PER_PERSON = 100 / 30
+
+
+def build(persons, seed):
+    query_builder = QueryBuilder(seed)
+    timings = dict()
+
+    def phase(name, count, build_query):
+        started = time.perf_counter()
+        for _ in range(count):
+            build_query()
+        timings[name] = time.perf_counter() - started
+
+    query_builder.region("Europe", "plc-europe")
+    query_builder.country("United Kingdom", "plc-europe/united-kingdom", "plc-europe", ["English"])
+    query_builder.city("London", "plc-europe/united-kingdom/london", "plc-europe/united-kingdom")
+    query_builder.city("Bristol", "plc-europe/united-kingdom/bristol", "plc-europe/united-kingdom")
+
+    with open("resources/organisations.json", "r") as resource_file:
+        for organization in load(resource_file):
+            query_builder.organization(OrganizationType(organization["type"]), organization["name"], organization["bio"], organization["tags"])
+
+    with open("resources/groups.json", "r") as resource_file:
+        for group in load(resource_file):
+            query_builder.group(group["name"], group["bio"], group["tags"])
+
+    bios = iter(range(persons))
+    phase("persons", persons, lambda: query_builder.person(f"Bio {next(bios)}"))
+    phase("educations", int(persons * EDUCATIONS_PER_PERSON), query_builder.education)
+    phase("employments", int(persons * EDUCATIONS_PER_PERSON), query_builder.employment)
+    phase("groupMemberships", int(persons * MEMBERSHIPS_PER_PERSON), query_builder.group_membership)
+    phase("socialRelations", int(persons * SOCIAL_RELATIONS_PER_PERSON), query_builder.social_relation)
+    phase("relationshipStatuses", 1, lambda: list(query_builder.relationship_statuses()))
+    phase("followings", 1, lambda: (list(query_builder.relation_followings()), list(query_builder.member_followings())))
+    phase("randomFollowings", int(persons * RANDOM_FOLLOWINGS_PER_PERSON), query_builder.random_following)
+    timings["total"] = sum(timings.values())
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, nargs="+", default=[100, 400, 1600])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps({str(persons): build(persons, args.seed) for persons in args.persons}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
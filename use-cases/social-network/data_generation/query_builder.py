@@ -1,11 +1,10 @@
-from collections.abc import Iterator
-from itertools import product
 from random import Random
-from typing import Any
+from typing import Any, Callable, Iterator
 from uuid import UUID
 from warnings import warn
 from yaml import safe_load
 from conversation import Conversation
+from relation_store import RelationStore
 
 from enums import (
     NameType,
@@ -58,23 +57,30 @@ class QueryBuilder:
     _start_year = 2020
     _end_year = 2024
     _username_warning_threshold = 10 ** _username_suffix_digits
+    _unrelated_pair_rejection_threshold = 0.5
+    _rejection_sampling_attempts = 32
 
-    def __init__(self, seed=0):
+    def __init__(self, seed=0, username_suffix_digits: int = None):
         self._random = Random(seed)
-        self._pages: dict[str, Page] = dict()
-        self._places: dict[str, Place] = dict()
-        self._social_relations: list[SocialRelation] = list()
-        self._educations: list[Education] = list()
-        self._employments: list[Employment] = list()
-        self._group_memberships: list[GroupMembership] = list()
+
+        if username_suffix_digits is not None:
+            self._username_suffix_digits = username_suffix_digits
+            self._username_warning_threshold = 10 ** username_suffix_digits
+
+        self._store = RelationStore()
+        self._pages: dict[str, Page] = self._store.pages
+        self._places: dict[str, Place] = self._store.places
         self._posts: dict[str, Post] = dict()
         self._comments: dict[str, Comment] = dict()
         self._polls: dict[str, Poll] = dict()
+        self._post_list: list[Post] = list()
+        self._contents: list[Post | Comment] = list()
+        self._poll_list: list[Poll] = list()
+        self._following_pages: list[Page] = self._store.all_pages
         self._reactions: list[Reaction] = list()
         self._responses: list[Response] = list()
-        self._followings: list[Following] = list()
         self._conversations: list[MappedConversation] = list()
-        self._viewings: list[Viewing] = list()
+        self._root_post_ids: dict[str, str] = dict()
 
         with open("resources/female_names.yml", "r") as file:
             self._female_names: list[dict[str, Any]] = safe_load(file)
@@ -86,76 +92,47 @@ class QueryBuilder:
             self._last_names: list[dict[str, Any]] = safe_load(file)
 
     @property
-    def _persons(self) -> Iterator[Page]:
-        return (page for page in self._pages.values() if page.type is PageType.PERSON)
+    def _persons(self) -> list[Page]:
+        return self._store.persons
 
     @property
-    def _organizations(self) -> Iterator[Page]:
-        return (page for page in self._pages.values() if page.type.is_organization)
+    def _organizations(self) -> list[Page]:
+        return self._store.organizations
 
     @property
-    def _institutes(self) -> Iterator[Page]:
-        return (page for page in self._pages.values() if page.type.is_institute)
+    def _institutes(self) -> list[Page]:
+        return self._store.institutes
 
     @property
-    def _groups(self) -> Iterator[Page]:
-        return (page for page in self._pages.values() if page.type is PageType.GROUP)
+    def _groups(self) -> list[Page]:
+        return self._store.groups
 
     @property
-    def _profiles(self) -> Iterator[Page]:
-        return (page for page in self._pages.values() if page.type.is_profile)
-
-    def _get_social_relation(self, persons: tuple[Page, Page]) -> SocialRelation | None:
-        for relation in self._social_relations:
-            if persons[0] in relation.persons and persons[1] in relation.persons:
-                return relation
-
-        return None
+    def _profiles(self) -> list[Page]:
+        return self._store.profiles
 
-    def _get_education(self, person: Page) -> Education | None:
-        for education in self._educations:
-            if person is education.attendee:
-                return education
-
-        return None
-
-    def _get_employment(self, person: Page) -> Employment | None:
-        for employment in self._employments:
-            if person is employment.employee:
-                return employment
+    @property
+    def _social_relations(self) -> list[SocialRelation]:
+        return self._store.social_relations
 
-        return None
+    @property
+    def _group_memberships(self) -> list[GroupMembership]:
+        return self._store.group_memberships
 
-    def _get_members(self, group: Page) -> Iterator[Page]:
-        for membership in self._group_memberships:
-            if group is membership.group:
-                yield membership.member
+    def _get_social_relation(self, persons: tuple[Page, Page]) -> SocialRelation | None:
+        return self._store.social_relation(persons)
 
     def _social_relation_count(self, person: Page) -> int:
-        return len([relation for relation in self._social_relations if person in relation.persons])
+        return self._store.social_relation_count(person)
 
     def _relationship_count(self, person: Page) -> int:
-        return len([relation for relation in self._social_relations if relation.type.is_relationship and person in relation.persons])
+        return self._store.relationship_count(person)
 
     def _parent_count(self, person: Page) -> int:
-        return len([relation for relation in self._social_relations if relation.type is SocialRelationType.PARENTSHIP and relation.persons[1] == person])
+        return self._store.parent_count(person)
 
     def _has_owner(self, group: Page) -> bool:
-        for membership in self._group_memberships:
-            if membership.group is group and membership.rank is GroupMemberRank.OWNER:
-                return True
-
-        return False
-
-    def _get_followers(self, page: Page) -> Iterator[Page]:
-        for following in self._followings:
-            if page is following.page:
-                yield following.follower
-
-    def _get_viewer_ids(self, post: Post) -> Iterator[str]:
-        for viewing in self._viewings:
-            if post.id == viewing.post:
-                yield viewing.profile
+        return self._store.has_owner(group)
 
     def _generate_new_uuid(self) -> str:
         return UUID(version=4, int=self._random.getrandbits(128)).hex
@@ -176,7 +153,7 @@ class QueryBuilder:
         if place_type is None:
             choices = list(self._places.values())
         else:
-            choices = [place for place in self._places.values() if place.type is place_type]
+            choices = self._store.places_of_type(place_type)
 
         if len(choices) == 0:
             raise RuntimeError("No places of the desired type exist.")
@@ -185,7 +162,7 @@ class QueryBuilder:
 
     def _get_random_organization(self, organization_type: OrganizationType = None) -> Page:
         if organization_type is None:
-            choices = list(self._organizations)
+            choices = self._organizations
         else:
             choices = [organization for organization in self._organizations if organization.type is organization_type.page_type]
 
@@ -196,7 +173,7 @@ class QueryBuilder:
 
     def _get_random_institute(self, institute_type: InstituteType = None) -> Page:
         if institute_type is None:
-            choices = list(self._institutes)
+            choices = self._institutes
         else:
             choices = [institute for institute in self._institutes if institute.type is institute_type.page_type]
 
@@ -205,6 +182,47 @@ class QueryBuilder:
 
         return self._random.choice(choices)
 
+    def _choose_random_matching(self, choices: list, condition: Callable[[Any], bool], saturation_message: str):
+        """
+        A random choice among those meeting the condition, each equally likely. Random choices are tried first,
+        and the choices are only filtered if all attempts fail, so that picking from a large pool is not linear.
+        """
+        if len(choices) > 0:
+            for _ in range(self._rejection_sampling_attempts):
+                choice = self._random.choice(choices)
+
+                if condition(choice):
+                    return choice
+
+        choices = [choice for choice in choices if condition(choice)]
+
+        if len(choices) == 0:
+            raise RuntimeError(saturation_message)
+
+        return self._random.choice(choices)
+
+    def _get_random_unrelated_persons(self) -> tuple[Page, Page]:
+        unrelated = self._store.unrelated_pair_count()
+
+        if unrelated <= 0:
+            raise RuntimeError("User pool has been saturated with plausible social relations.")
+
+        persons = self._persons
+
+        if unrelated < len(persons) * (len(persons) - 1) * self._unrelated_pair_rejection_threshold:
+            # Most pairs are already related, so draw from the unrelated ones directly.
+            return self._store.unrelated_pair(self._random.randrange(unrelated))
+
+        while True:
+            first = self._random.randrange(len(persons))
+            second = self._random.randrange(len(persons) - 1)
+
+            if second >= first:
+                second += 1
+
+            if not self._store.is_related(persons[first], persons[second]):
+                return persons[first], persons[second]
+
     def _generate_new_media_id(self) -> str:
         return f"{self._media_id_prefix}-{self._generate_new_uuid()}"
 
@@ -246,11 +264,11 @@ class QueryBuilder:
             return Gender.FEMALE
 
     def _generate_new_person_username(self, name: str) -> str:
-        if len(list(self._persons)) >= self._username_warning_threshold:
+        if len(self._persons) >= self._username_warning_threshold:
             message = " ".join((
                 f"The number of usernames generated has exceeded {self._username_warning_threshold}.",
                 f"This has a small chance to deadlock the query builder if generation continues significantly.",
-                f"Consider raising the username suffix digit count (class attribute) to prevent deadlock.",
+                f"Consider raising the username suffix digit count to prevent deadlock.",
             ))
 
             warn(message, RuntimeWarning)
@@ -260,7 +278,7 @@ class QueryBuilder:
             number_part = "".join(str(self._random.randint(0, 9)) for _ in range(self._username_suffix_digits))
             username = name_part + number_part
 
-            if username not in (person.id for person in self._persons):
+            if username not in self._pages or self._pages[username].type is not PageType.PERSON:
                 return username
 
     def _generate_new_email(self, username: str) -> str:
@@ -291,7 +309,7 @@ class QueryBuilder:
         email = self._generate_new_email(username)
         profile_picture = self._generate_new_media_id()
         birth_date = self._get_random_timestamp(TimestampFormat.DATE, self._birth_range)
-        self._pages[username] = Page(PageType.PERSON, username, name)
+        self._store.add_page(Page(PageType.PERSON, username, name))
 
         if location_id is None:
             location_id = self._get_random_place(PlaceType.CITY).id
@@ -342,7 +360,7 @@ class QueryBuilder:
             can_publish: bool = True,
     ) -> str:
         username = "".join(name.split())
-        self._pages[username] = Page(organization_type.page_type, username, name)
+        self._store.add_page(Page(organization_type.page_type, username, name))
         profile_picture = self._generate_new_media_id()
 
         if location_id is None:
@@ -382,7 +400,7 @@ class QueryBuilder:
     ) -> str:
         group_id = self._generate_new_group_id()
         profile_picture = self._generate_new_media_id()
-        self._pages[group_id] = Page(PageType.GROUP, group_id, name)
+        self._store.add_page(Page(PageType.GROUP, group_id, name))
 
         queries = "# group\n" + " ".join((
             f"""insert""",
@@ -423,7 +441,10 @@ class QueryBuilder:
         if creation_timestamp is None:
             creation_timestamp = self._get_random_timestamp(TimestampFormat.PRECISE_DATETIME, range=self._post_range)
 
-        self._posts[post_id] = Post(post_type, post_id, self._pages[author_username], creation_timestamp)
+        post = Post(post_type, post_id, self._pages[author_username], creation_timestamp)
+        self._posts[post_id] = post
+        self._post_list.append(post)
+        self._contents.append(post)
 
         match_clause = " ".join((
             f"""match""",
@@ -658,7 +679,9 @@ class QueryBuilder:
         for answer in answers:
             queries += f""" $post has answer "{answer}";"""
 
-        self._polls[post_id] = Poll(post_id, question, answers)
+        poll = Poll(post_id, question, answers)
+        self._polls[post_id] = poll
+        self._poll_list.append(poll)
         return queries
 
     def comment(
@@ -677,7 +700,9 @@ class QueryBuilder:
         if creation_timestamp is None:
             creation_timestamp = self._get_random_timestamp(TimestampFormat.PRECISE_DATETIME, range=self._post_range)
 
-        self._comments[comment_id] = Comment(comment_id, self._pages[author_username], creation_timestamp)
+        comment = Comment(comment_id, self._pages[author_username], creation_timestamp)
+        self._comments[comment_id] = comment
+        self._contents.append(comment)
 
         queries = "# comment\n" + " ".join((
             f"""match""",
@@ -717,25 +742,23 @@ class QueryBuilder:
 
         match posting_type:
             case "person-self":
-                choices = [person for person in self._persons if self._social_relation_count(person) >= commenter_count]
+                page = self._choose_random_matching(
+                    self._persons,
+                    lambda person: self._social_relation_count(person) >= commenter_count,
+                    "No users have sufficient social relations to build conversation.",
+                )
 
-                if len(choices) == 0:
-                    raise RuntimeError("No users have sufficient social relations to build conversation.")
-
-                page = self._random.choice(choices)
                 post_author = page
-                choices = [person for person in self._persons if self._get_social_relation((post_author, person)) is not None]
-                commenters = self._random.sample(choices, commenter_count)
+                commenters = self._random.sample(self._store.related_persons(post_author), commenter_count)
             case "person-group":
                 if page_name is None:
-                    choices = [group for group in self._groups if len([self._get_members(group)]) >= participant_count]
-
-                    if len(choices) == 0:
-                        raise RuntimeError("No groups has sufficient members to build conversation.")
-
-                    page = self._random.choice(choices)
+                    page = self._choose_random_matching(
+                        self._groups,
+                        lambda group: len(self._store.person_members(group)) >= participant_count,
+                        "No groups has sufficient members to build conversation.",
+                    )
                 else:
-                    pages = [page for page in self._pages.values() if page.name == page_name]
+                    pages = self._store.pages_named(page_name)
 
                     if len(pages) == 0:
                         raise RuntimeError("No page with the specified name exists.")
@@ -744,7 +767,11 @@ class QueryBuilder:
                     else:
                         raise RuntimeError("Multiple pages with the specified name exist.")
 
-                choices = [person for person in self._persons if person in self._get_members(page)]
+                choices = self._store.person_members(page)
+
+                if len(choices) < participant_count:
+                    raise RuntimeError("Group has insufficient members to build conversation.")
+
                 participants = self._random.sample(choices, participant_count)
                 post_author = participants.pop()
                 commenters = participants
@@ -783,6 +810,11 @@ class QueryBuilder:
             content_id_mapping[node.local_id] = content_id
 
         self._conversations.append(MappedConversation(conversation, usertag_mapping, content_id_mapping, page))
+        root_post_id = content_id_mapping[conversation.root.local_id]
+
+        for content_id in content_id_mapping.values():
+            self._root_post_ids.setdefault(content_id, root_post_id)
+
         queries: list[str] = list()
 
         for node in conversation.nodes:
@@ -870,7 +902,7 @@ class QueryBuilder:
         else:
             parent = self._places[parent_id]
 
-        self._places[place_id] = Place(place_type, place_id, name, parent)
+        self._store.add_place(Place(place_type, place_id, name, parent))
         queries = "# place\n"
 
         if parent_id is not None:
@@ -979,15 +1011,7 @@ class QueryBuilder:
             location_id: str = None,
     ):
         if usernames is None:
-            choices: list[tuple[Page, Page]] = list(
-                persons for persons in product(self._persons, self._persons)
-                if persons[0] != persons[1] and self._get_social_relation(persons) is None
-            )
-
-            if len(choices) == 0:
-                raise RuntimeError("User pool has been saturated with plausible social relations.")
-
-            persons = self._random.choice(choices)
+            persons = self._get_random_unrelated_persons()
         else:
             persons = self._pages[usernames[0]], self._pages[usernames[1]]
 
@@ -1018,7 +1042,7 @@ class QueryBuilder:
             location_id = self._get_random_place(PlaceType.CITY).id
 
         start_date = self._get_random_timestamp(TimestampFormat.DATE, self._social_relation_range)
-        self._social_relations.append(SocialRelation(relation_type, persons))
+        self._store.add_social_relation(SocialRelation(relation_type, persons))
 
         match_clause = " ".join((
             f"""match""",
@@ -1056,7 +1080,7 @@ class QueryBuilder:
             description: str = None,
     ) -> str:
         if person_username is None:
-            choices = list(person for person in self._persons if self._get_education(person) is None)
+            choices = self._store.persons_without_education()
 
             if len(choices) == 0:
                 raise RuntimeError("User pool has been saturated with plausible educations.")
@@ -1076,7 +1100,7 @@ class QueryBuilder:
         else:
             start_date, end_date = date_range
 
-        self._educations.append(Education(institute, person))
+        self._store.add_education(Education(institute, person))
 
         queries = "# education\n" + " ".join((
             f"""match""",
@@ -1106,7 +1130,7 @@ class QueryBuilder:
             description: str = None,
     ) -> str:
         if person_username is None:
-            choices = list(person for person in self._persons if self._get_employment(person) is None)
+            choices = self._store.persons_without_employment()
 
             if len(choices) == 0:
                 raise RuntimeError("User pool has been saturated with plausible employments.")
@@ -1126,7 +1150,7 @@ class QueryBuilder:
         else:
             start_date, end_date = date_range
 
-        self._employments.append(Employment(organization, person))
+        self._store.add_employment(Employment(organization, person))
 
         queries = "# employment\n" + " ".join((
             f"""match""",
@@ -1156,17 +1180,16 @@ class QueryBuilder:
             badges: list[str] = [],
     ) -> str:
         if group_id is None:
-            group = self._random.choice(list(group for group in self._groups))
+            group = self._random.choice(self._groups)
         else:
             group = self._pages[group_id]
 
         if username is None:
-            choices = list(profile for profile in self._profiles if profile not in self._get_members(group))
-
-            if len(choices) == 0:
-                raise RuntimeError("Group is saturated with members.")
-
-            profile = self._random.choice(choices)
+            profile = self._choose_random_matching(
+                self._profiles,
+                lambda profile: not self._store.is_member(group, profile),
+                "Group is saturated with members.",
+            )
         else:
             profile = self._pages[username]
 
@@ -1182,7 +1205,7 @@ class QueryBuilder:
             else:
                 rank = GroupMemberRank.choose(self._random)
 
-        self._group_memberships.append(GroupMembership(group, profile, rank))
+        self._store.add_group_membership(GroupMembership(group, profile, rank))
 
         queries = "# group membership\n" + " ".join((
             f"""match""",
@@ -1204,27 +1227,23 @@ class QueryBuilder:
 
         return queries
 
-    def relationship_statuses(self) -> str:
-        queries: list[str] = list()
-
+    def relationship_statuses(self) -> Iterator[str]:
         for person in self._persons:
             if self._relationship_count(person) == 0:
                 relationship_status = RelationshipStatus.choose(self._random)
 
-                queries.append("# relationship status\n" + " ".join((
+                yield "# relationship status\n" + " ".join((
                     f"""match""",
                     f"""$person isa person;""",
                     f"""$person has id "{person.id}";""",
                     f"""insert""",
                     f"""$person has relationship-status "{relationship_status.value}";""",
                     f"""end;""",
-                )))
-
-        return "\n".join(queries)
+                ))
 
     def reaction(self) -> str:
-        profile = self._random.choice([profile for profile in self._profiles])
-        content: Post | Comment = self._random.choice(list(self._posts.values()) + list(self._comments.values()))
+        profile = self._random.choice(self._profiles)
+        content: Post | Comment = self._random.choice(self._contents)
         emoji = Emoji.choose(self._random)
         creation_timestamp = self._get_random_timestamp(TimestampFormat.PRECISE_DATETIME, range=(content.timestamp, self._post_range[1]))
         self._reactions.append(Reaction(content, profile))
@@ -1244,8 +1263,8 @@ class QueryBuilder:
         return queries
 
     def response(self) -> str:
-        profile = self._random.choice([profile for profile in self._profiles])
-        poll = self._random.choice(list(self._polls.values()))
+        profile = self._random.choice(self._profiles)
+        poll = self._random.choice(self._poll_list)
         poll_timestamp = self._posts[poll.id].timestamp
         answer = self._random.choice(poll.answers)
         creation_timestamp = self._get_random_timestamp(TimestampFormat.PRECISE_DATETIME, range=(poll_timestamp, self._post_range[1]))
@@ -1278,39 +1297,27 @@ class QueryBuilder:
 
         return queries
 
-    def relation_followings(self) -> str:
-        queries: list[str] = list()
-
+    def relation_followings(self) -> Iterator[str]:
         for relation in self._social_relations:
             for page, profile in [relation.persons, relation.persons[::-1]]:
-                self._followings.append(Following(page, profile))
-                queries.append(self._following(page.id, profile.id) + " end;")
-
-        return "\n".join(queries)
-
-    def member_followings(self) -> str:
-        queries: list[str] = list()
+                self._store.add_following(Following(page, profile))
+                yield self._following(page.id, profile.id) + " end;"
 
+    def member_followings(self) -> Iterator[str]:
         for membership in self._group_memberships:
-            self._followings.append(Following(membership.group, membership.member))
-            queries.append(self._following(membership.group.id, membership.member.id) + " end;")
-
-        return "\n".join(queries)
+            self._store.add_following(Following(membership.group, membership.member))
+            yield self._following(membership.group.id, membership.member.id) + " end;"
 
     def random_following(self) -> str:
-        page = self._random.choice([page for page in self._pages.values()])
-
-        choices = [
-            profile for profile in self._profiles
-            if profile is not page and profile not in self._get_followers(page)
-        ]
+        page = self._random.choice(self._following_pages)
 
-        if len(choices) == 0:
-            raise RuntimeError("Page is saturated with followers.")
-
-        profile = self._random.choice(choices)
+        profile = self._choose_random_matching(
+            self._profiles,
+            lambda profile: profile is not page and not self._store.is_follower(page, profile),
+            "Page is saturated with followers.",
+        )
 
-        self._followings.append(Following(page, profile))
+        self._store.add_following(Following(page, profile))
         queries = self._following(page.id, profile.id) + " end;"
         return queries
 
@@ -1327,16 +1334,12 @@ class QueryBuilder:
 
         return queries
 
-    def content_subscriptions(self) -> str:
-        queries: list[str] = list()
-
+    def content_subscriptions(self) -> Iterator[str]:
         for post in self._posts.values():
-            queries.append(self._subscription(post.id, post.author.id) + " end;")
+            yield self._subscription(post.id, post.author.id) + " end;"
 
         for comment in self._comments.values():
-            queries.append(self._subscription(comment.id, comment.author.id) + " end;")
-
-        return "\n".join(queries)
+            yield self._subscription(comment.id, comment.author.id) + " end;"
 
     def _viewing(self, content_id: str, profile_id: str) -> str:
         queries = "# viewing\n" + " ".join((
@@ -1351,64 +1354,88 @@ class QueryBuilder:
 
         return queries
 
-    def participant_viewings(self) -> str:
-        queries: list[str] = list()
-
+    def participant_viewings(self) -> Iterator[str]:
         for conversation in self._conversations:
             post = self._posts[conversation.content_id_mapping[conversation.conversation.root.local_id]]
 
             for participant in conversation.conversation.participants:
                 username = conversation.usertag_mapping[participant].lstrip("@")
                 profile = self._pages[username]
-                viewing = Viewing(post, profile)
 
-                if viewing not in self._viewings:
-                    self._viewings.append(viewing)
-                    queries.append(self._viewing(post.id, profile.id) + " end;")
-
-        return "\n".join(queries)
-
-    def reaction_viewings(self) -> str:
-        queries: list[str] = list()
+                if self._store.add_viewing(Viewing(post, profile)):
+                    yield self._viewing(post.id, profile.id) + " end;"
 
+    def reaction_viewings(self) -> Iterator[str]:
         for reaction in self._reactions:
-            for conversation in self._conversations:
-                if reaction.content.id in conversation.content_id_mapping.values():
-                    post = self._posts[conversation.content_id_mapping[conversation.conversation.root.local_id]]
-                    viewing = Viewing(post, reaction.author)
+            root_post_id = self._root_post_ids.get(reaction.content.id)
 
-                    if viewing not in self._viewings:
-                        self._viewings.append(viewing)
-                        queries.append(self._viewing(post.id, reaction.author.id) + " end;")
+            if root_post_id is not None:
+                post = self._posts[root_post_id]
 
-        return "\n".join(queries)
-
-    def response_viewings(self) -> str:
-        queries: list[str] = list()
+                if self._store.add_viewing(Viewing(post, reaction.author)):
+                    yield self._viewing(post.id, reaction.author.id) + " end;"
 
+    def response_viewings(self) -> Iterator[str]:
         for response in self._responses:
             poll = self._posts[response.poll.id]
-            viewing = Viewing(poll, response.author)
-
-            if viewing not in self._viewings:
-                self._viewings.append(viewing)
-                queries.append(self._viewing(response.poll.id, response.author.id) + " end;")
 
-        return "\n".join(queries)
+            if self._store.add_viewing(Viewing(poll, response.author)):
+                yield self._viewing(response.poll.id, response.author.id) + " end;"
 
     def random_viewing(self) -> str:
-        post = self._random.choice([post for post in self._posts.values()])
+        post = self._random.choice(self._post_list)
 
-        choices = [
-            profile for profile in self._profiles
-            if profile.id != post.author and profile.id not in self._get_viewer_ids(post)
-        ]
-
-        if len(choices) == 0:
-            raise RuntimeError("Post is saturated with viewers.")
-
-        profile = self._random.choice(choices)
+        profile = self._choose_random_matching(
+            self._profiles,
+            lambda profile: profile is not post.author and not self._store.has_viewed(post.id, profile),
+            "Post is saturated with viewers.",
+        )
 
-        self._viewings.append(Viewing(post, profile))
+        self._store.add_viewing(Viewing(post, profile))
         queries = self._viewing(post.id, profile.id) + " end;"
         return queries
+
+    def _content_shards(self, shard_count: int) -> dict[str, int]:
+        """The shard of each content: that of the root post of its conversation, the roots being dealt in turn."""
+        root_shards: dict[str, int] = dict()
+        shards: dict[str, int] = dict()
+
+        for content in self._contents:
+            root_post_id = self._root_post_ids.get(content.id, content.id)
+            shards[content.id] = root_shards.setdefault(root_post_id, len(root_shards)) % shard_count
+
+        return shards
+
+    def shard_sizes(self, shard_count: int) -> list[dict[str, int]]:
+        """The contents, polls, posts and pages that each of the shards would choose from."""
+        shards = self._content_shards(shard_count)
+        sizes = [{"contents": 0, "polls": 0, "posts": 0, "pages": 0} for _ in range(shard_count)]
+
+        for content in self._contents:
+            sizes[shards[content.id]]["contents"] += 1
+
+        for poll in self._poll_list:
+            sizes[shards[poll.id]]["polls"] += 1
+
+        for post in self._post_list:
+            sizes[shards[post.id]]["posts"] += 1
+
+        for index in range(len(self._store.all_pages)):
+            sizes[index % shard_count]["pages"] += 1
+
+        return sizes
+
+    def shard(self, seed, shard_index: int, shard_count: int) -> None:
+        """
+        Makes this builder generate one shard of the reactions, responses, random followings and random viewings,
+        with its own seed. Each shard reacts to, responds to and views the content of its own conversations, and
+        adds followers to its own pages, so that shards never generate the same relation twice. Only meant for
+        a copy of the builder made once the pages, posts and derived relations all exist, such as in a forked
+        process, as the builder can no longer choose from the content of other shards.
+        """
+        shards = self._content_shards(shard_count)
+        self._random = Random(seed)
+        self._contents = [content for content in self._contents if shards[content.id] == shard_index]
+        self._post_list = [post for post in self._post_list if shards[post.id] == shard_index]
+        self._poll_list = [poll for poll in self._poll_list if shards[poll.id] == shard_index]
+        self._following_pages = self._store.all_pages[shard_index::shard_count]
@@ -1,154 +1,302 @@
+import os
+from argparse import ArgumentParser, ArgumentTypeError
 from json import load
-from typing import Any
+from multiprocessing import get_context
+from tempfile import TemporaryDirectory
+from random import Random
+from typing import Any, Iterator
 from query_builder import QueryBuilder
 from enums import OrganizationType, PostType
 from conversation import Conversation
+from scaling import scaled_counts, username_suffix_digits, bios, copies, copy_name, apportion
+from query_writer import QueryWriter, COMPRESSIONS
 
-query_builder = QueryBuilder()
-
-queries = [
-    query_builder.region("Americas", "plc-americas"),
-    query_builder.region("North America", "plc-americas/northern-america", "plc-americas"),
-    query_builder.country("United States", "plc-americas/northern-america/united-states", "plc-americas/northern-america", ["English"]),
-    query_builder.state("California", "plc-americas/northern-america/united-states/california", "plc-americas/northern-america/united-states"),
-    query_builder.state("Texas", "plc-americas/northern-america/united-states/texas", "plc-americas/northern-america/united-states"),
-    query_builder.state("New York", "plc-americas/northern-america/united-states/new-york", "plc-americas/northern-america/united-states"),
-    query_builder.state("New Jersey", "plc-americas/northern-america/united-states/new-jersey", "plc-americas/northern-america/united-states"),
-    query_builder.state("Washington", "plc-americas/northern-america/united-states/washington", "plc-americas/northern-america/united-states"),
-    query_builder.state("Massachusetts", "plc-americas/northern-america/united-states/massachusetts", "plc-americas/northern-america/united-states"),
-    query_builder.state("New Mexico", "plc-americas/northern-america/united-states/new-mexico", "plc-americas/northern-america/united-states"),
-    query_builder.state("Missouri", "plc-americas/northern-america/united-states/missouri", "plc-americas/northern-america/united-states"),
-    query_builder.city("Sacramento", "plc-americas/northern-america/united-states/california/sacramento", "plc-americas/northern-america/united-states/california"),
-    query_builder.city("Los Angeles", "plc-americas/northern-america/united-states/california/los-angeles", "plc-americas/northern-america/united-states/california"),
-    query_builder.city("San Francisco", "plc-americas/northern-america/united-states/california/san-francisco", "plc-americas/northern-america/united-states/california"),
-    query_builder.city("Sevastopol", "plc-americas/northern-america/united-states/california/sevastopol", "plc-americas/northern-america/united-states/california"),
-    query_builder.city("Austin", "plc-americas/northern-america/united-states/texas/austin", "plc-americas/northern-america/united-states/texas"),
-    query_builder.city("Albany", "plc-americas/northern-america/united-states/new-york/albany", "plc-americas/northern-america/united-states/new-york"),
-    query_builder.city("New York City", "plc-americas/northern-america/united-states/new-york/new-york-city", "plc-americas/northern-america/united-states/new-york"),
-    query_builder.city("Trenton", "plc-americas/northern-america/united-states/new-jersey/trenton", "plc-americas/northern-america/united-states/new-jersey"),
-    query_builder.city("Newark", "plc-americas/northern-america/united-states/new-jersey/newark", "plc-americas/northern-america/united-states/new-jersey"),
-    query_builder.city("Seattle", "plc-americas/northern-america/united-states/washington/seattle", "plc-americas/northern-america/united-states/washington"),
-    query_builder.city("Boston", "plc-americas/northern-america/united-states/massachusetts/boston", "plc-americas/northern-america/united-states/massachusetts"),
-    query_builder.city("Santa Fe", "plc-americas/northern-america/united-states/new-mexico/santa-fe", "plc-americas/northern-america/united-states/new-mexico"),
-    query_builder.city("Albuquerque", "plc-americas/northern-america/united-states/new-mexico/albuquerque", "plc-americas/northern-america/united-states/new-mexico"),
-    query_builder.city("Kansas City", "plc-americas/northern-america/united-states/missouri/kansas-city", "plc-americas/northern-america/united-states/missouri"),
-    query_builder.region("Europe", "plc-europe"),
-    query_builder.region("Northern Europe", "plc-europe/northern-europe", "plc-europe"),
-    query_builder.country("United Kingdom", "plc-europe/northern-europe/united-kingdom", "plc-europe/northern-europe", ["English"]),
-    query_builder.city("London", "plc-europe/northern-europe/united-kingdom/london", "plc-europe/northern-europe/united-kingdom"),
-    query_builder.city("Bristol", "plc-europe/northern-europe/united-kingdom/bristol", "plc-europe/northern-europe/united-kingdom"),
-    query_builder.city("Liverpool", "plc-europe/northern-europe/united-kingdom/liverpool", "plc-europe/northern-europe/united-kingdom"),
-    query_builder.country("Canada", "plc-americas/northern-america/canada", "plc-americas/northern-america", ["English", "French"]),
-    query_builder.state("Ontario", "plc-americas/northern-america/canada/ontario", "plc-americas/northern-america/canada"),
-    query_builder.state("Quebec", "plc-americas/northern-america/canada/quebec", "plc-americas/northern-america/canada"),
-    query_builder.city("Toronto", "plc-americas/northern-america/canada/ontario/toronto", "plc-americas/northern-america/canada/ontario"),
-    query_builder.city("Quebec City", "plc-americas/northern-america/canada/quebec/quebec-city", "plc-americas/northern-america/canada/quebec"),
-    query_builder.city("Montreal", "plc-americas/northern-america/canada/quebec/montreal", "plc-americas/northern-america/canada/quebec"),
-]
-
-with open("resources/landmarks.txt", "r") as resources_file:
-    for line in resources_file:
-        queries.append(query_builder.landmark(line.strip()))
-
-with open("resources/bios.txt", "r") as resource_file:
-    for bio in resource_file:
-        queries.append(query_builder.person(bio.strip()))
-
-with open("resources/organizations.json", "r") as resource_file:
-    organizations: list[dict[str, Any]] = load(resource_file)
-
-    for organization in organizations:
-        queries.append(query_builder.organization(
-            organization_type=OrganizationType(organization["type"]),
-            name=organization["name"],
-            bio=organization["bio"],
-            tags=organization["tags"],
-        ))
-
-with open("resources/groups.json", "r") as resource_file:
-    groups: list[dict[str, Any]] = load(resource_file)
-
-    for group in groups:
-        queries.append(query_builder.group(
-            name=group["name"],
-            bio=group["bio"],
-            tags=group["tags"],
-        ))
-
-for _ in range(30):
-    queries.append(query_builder.education())
-    queries.append(query_builder.employment())
-
-for _ in range(50):
-    queries.append(query_builder.group_membership())
-
-for _ in range(200):
-    queries.append(query_builder.social_relation())
-
-with open("resources/conversations/index.json", "r") as index_file:
-    conversation_index: list[dict[str, Any]] = load(index_file)
-
-    for entry in conversation_index:
-        conv = entry["ref"]
-        path = f"resources/conversations/{conv}.json"
-        post_type = PostType[entry["type"].upper()]
-        posting_type = entry["posting_type"]
-
-        if entry["page_name"] == "":
-            page_name: str | None = None
-        else:
-            page_name = entry["page_name"]
 
-        if entry["location_name"] == "":
-            location_name: str | None = None
-        else:
-            location_name = entry["location_name"]
-
-        with open(path, "r") as resource_file:
-            json_rep: dict[str, Any] = load(resource_file)
-            conversation = Conversation.from_json(json_rep, post_type)
-            queries += query_builder.conversation(
-                conversation=conversation,
-                posting_type=posting_type,
-                page_name=page_name,
-                location_name=location_name,
+def scale_factor(value: str) -> float:
+    # Below 1 there are too few pages to choose from, such as no institutes of some types for educations.
+    if float(value) < 1:
+        raise ArgumentTypeError("The scale factor must be at least 1.")
+
+    return float(value)
+
+
+def generate_graph(query_builder: QueryBuilder, counts: dict[str, int], synthesis_random: Random) -> Iterator[str]:
+    """The places, pages, relations between pages and conversations, built one at a time as they are consumed."""
+    yield from [
+        query_builder.region("Americas", "plc-americas"),
+        query_builder.region("North America", "plc-americas/northern-america", "plc-americas"),
+        query_builder.country("United States", "plc-americas/northern-america/united-states", "plc-americas/northern-america", ["English"]),
+        query_builder.state("California", "plc-americas/northern-america/united-states/california", "plc-americas/northern-america/united-states"),
+        query_builder.state("Texas", "plc-americas/northern-america/united-states/texas", "plc-americas/northern-america/united-states"),
+        query_builder.state("New York", "plc-americas/northern-america/united-states/new-york", "plc-americas/northern-america/united-states"),
+        query_builder.state("New Jersey", "plc-americas/northern-america/united-states/new-jersey", "plc-americas/northern-america/united-states"),
+        query_builder.state("Washington", "plc-americas/northern-america/united-states/washington", "plc-americas/northern-america/united-states"),
+        query_builder.state("Massachusetts", "plc-americas/northern-america/united-states/massachusetts", "plc-americas/northern-america/united-states"),
+        query_builder.state("New Mexico", "plc-americas/northern-america/united-states/new-mexico", "plc-americas/northern-america/united-states"),
+        query_builder.state("Missouri", "plc-americas/northern-america/united-states/missouri", "plc-americas/northern-america/united-states"),
+        query_builder.city("Sacramento", "plc-americas/northern-america/united-states/california/sacramento", "plc-americas/northern-america/united-states/california"),
+        query_builder.city("Los Angeles", "plc-americas/northern-america/united-states/california/los-angeles", "plc-americas/northern-america/united-states/california"),
+        query_builder.city("San Francisco", "plc-americas/northern-america/united-states/california/san-francisco", "plc-americas/northern-america/united-states/california"),
+        query_builder.city("Sevastopol", "plc-americas/northern-america/united-states/california/sevastopol", "plc-americas/northern-america/united-states/california"),
+        query_builder.city("Austin", "plc-americas/northern-america/united-states/texas/austin", "plc-americas/northern-america/united-states/texas"),
+        query_builder.city("Albany", "plc-americas/northern-america/united-states/new-york/albany", "plc-americas/northern-america/united-states/new-york"),
+        query_builder.city("New York City", "plc-americas/northern-america/united-states/new-york/new-york-city", "plc-americas/northern-america/united-states/new-york"),
+        query_builder.city("Trenton", "plc-americas/northern-america/united-states/new-jersey/trenton", "plc-americas/northern-america/united-states/new-jersey"),
+        query_builder.city("Newark", "plc-americas/northern-america/united-states/new-jersey/newark", "plc-americas/northern-america/united-states/new-jersey"),
+        query_builder.city("Seattle", "plc-americas/northern-america/united-states/washington/seattle", "plc-americas/northern-america/united-states/washington"),
+        query_builder.city("Boston", "plc-americas/northern-america/united-states/massachusetts/boston", "plc-americas/northern-america/united-states/massachusetts"),
+        query_builder.city("Santa Fe", "plc-americas/northern-america/united-states/new-mexico/santa-fe", "plc-americas/northern-america/united-states/new-mexico"),
+        query_builder.city("Albuquerque", "plc-americas/northern-america/united-states/new-mexico/albuquerque", "plc-americas/northern-america/united-states/new-mexico"),
+        query_builder.city("Kansas City", "plc-americas/northern-america/united-states/missouri/kansas-city", "plc-americas/northern-america/united-states/missouri"),
+        query_builder.region("Europe", "plc-europe"),
+        query_builder.region("Northern Europe", "plc-europe/northern-europe", "plc-europe"),
+        query_builder.country("United Kingdom", "plc-europe/northern-europe/united-kingdom", "plc-europe/northern-europe", ["English"]),
+        query_builder.city("London", "plc-europe/northern-europe/united-kingdom/london", "plc-europe/northern-europe/united-kingdom"),
+        query_builder.city("Bristol", "plc-europe/northern-europe/united-kingdom/bristol", "plc-europe/northern-europe/united-kingdom"),
+        query_builder.city("Liverpool", "plc-europe/northern-europe/united-kingdom/liverpool", "plc-europe/northern-europe/united-kingdom"),
+        query_builder.country("Canada", "plc-americas/northern-america/canada", "plc-americas/northern-america", ["English", "French"]),
+        query_builder.state("Ontario", "plc-americas/northern-america/canada/ontario", "plc-americas/northern-america/canada"),
+        query_builder.state("Quebec", "plc-americas/northern-america/canada/quebec", "plc-americas/northern-america/canada"),
+        query_builder.city("Toronto", "plc-americas/northern-america/canada/ontario/toronto", "plc-americas/northern-america/canada/ontario"),
+        query_builder.city("Quebec City", "plc-americas/northern-america/canada/quebec/quebec-city", "plc-americas/northern-america/canada/quebec"),
+        query_builder.city("Montreal", "plc-americas/northern-america/canada/quebec/montreal", "plc-americas/northern-america/canada/quebec"),
+    ]
+
+    with open("resources/landmarks.txt", "r") as resources_file:
+        for line in resources_file:
+            yield query_builder.landmark(line.strip())
+
+    with open("resources/bios.txt", "r") as resource_file:
+        resource_bios = [bio.strip() for bio in resource_file]
+
+        for bio in bios(resource_bios, counts["persons"], synthesis_random):
+            yield query_builder.person(bio)
+
+    with open("resources/organisations.json", "r") as resource_file:
+        organizations: list[dict[str, Any]] = load(resource_file)
+
+        for organization, copy in copies(organizations, counts["organizations"]):
+            yield query_builder.organization(
+                organization_type=OrganizationType(organization["type"]),
+                name=copy_name(organization["name"], copy),
+                bio=organization["bio"],
+                tags=organization["tags"],
+            )
+
+    with open("resources/groups.json", "r") as resource_file:
+        groups: list[dict[str, Any]] = load(resource_file)
+        group_names = set()
+
+        for group, copy in copies(groups, counts["groups"]):
+            group_names.add(copy_name(group["name"], copy))
+
+            yield query_builder.group(
+                name=copy_name(group["name"], copy),
+                bio=group["bio"],
+                tags=group["tags"],
             )
 
-queries.append(query_builder.relationship_statuses())
+    # Interleaved, as in the dataset at scale factor 1, so that it stays the same.
+    for index in range(max(counts["educations"], counts["employments"])):
+        if index < counts["educations"]:
+            yield query_builder.education()
+        if index < counts["employments"]:
+            yield query_builder.employment()
+
+    for _ in range(counts["group_memberships"]):
+        yield query_builder.group_membership()
+
+    for _ in range(counts["social_relations"]):
+        yield query_builder.social_relation()
+
+    with open("resources/conversations/index.json", "r") as index_file:
+        conversation_index: list[dict[str, Any]] = load(index_file)
+        parsed_conversations: dict[str, Conversation] = dict()
+
+        for entry, copy in copies(conversation_index, counts["conversations"]):
+            conv = entry["ref"]
+            path = f"resources/conversations/{conv}.json"
+            post_type = PostType[entry["type"].upper()]
+            posting_type = entry["posting_type"]
+
+            # Copies of a group conversation go to any group with enough members, rather than all to the same one.
+            if entry["page_name"] == "" or copy > 0 or entry["page_name"] not in group_names:
+                page_name: str | None = None
+            else:
+                page_name = entry["page_name"]
+
+            if entry["location_name"] == "":
+                location_name: str | None = None
+            else:
+                location_name = entry["location_name"]
+
+            if conv not in parsed_conversations:
+                with open(path, "r") as resource_file:
+                    json_rep: dict[str, Any] = load(resource_file)
+                    parsed_conversations[conv] = Conversation.from_json(json_rep, post_type)
+
+            try:
+                yield from query_builder.conversation(
+                    conversation=parsed_conversations[conv],
+                    posting_type=posting_type,
+                    page_name=page_name,
+                    location_name=location_name,
+                )
+            except RuntimeError:
+                if page_name is None:
+                    raise
+
+                # The named group did not draw enough members for this conversation, so any group that did hosts it.
+                yield from query_builder.conversation(
+                    conversation=parsed_conversations[conv],
+                    posting_type=posting_type,
+                    location_name=location_name,
+                )
+
+    yield from query_builder.relationship_statuses()
+
+
+def generate(query_builder: QueryBuilder, counts: dict[str, int], synthesis_random: Random) -> Iterator[str]:
+    """The queries of the dataset, built one at a time as they are consumed."""
+    yield from generate_graph(query_builder, counts, synthesis_random)
+
+    for _ in range(counts["reactions"]):
+        yield query_builder.reaction()
 
-for _ in range(1000):
-    queries.append(query_builder.reaction())
+    for _ in range(counts["responses"]):
+        yield query_builder.response()
 
-for _ in range(120):
-    queries.append(query_builder.response())
+    yield from query_builder.relation_followings()
+    yield from query_builder.member_followings()
 
-queries.append(query_builder.relation_followings())
-queries.append(query_builder.member_followings())
+    for _ in range(counts["random_followings"]):
+        yield query_builder.random_following()
 
-for _ in range(100):
-    queries.append(query_builder.random_following())
+    yield from query_builder.content_subscriptions()
+    yield from query_builder.participant_viewings()
+    yield from query_builder.reaction_viewings()
+    yield from query_builder.response_viewings()
 
-queries.append(query_builder.content_subscriptions())
-queries.append(query_builder.participant_viewings())
-queries.append(query_builder.reaction_viewings())
-queries.append(query_builder.response_viewings())
+    for _ in range(counts["random_viewings"]):
+        yield query_builder.random_viewing()
 
-for _ in range(500):
-    queries.append(query_builder.random_viewing())
+    yield badge()
 
-queries.append("# badge\n" + " ".join((
-    f"""match""",
-    f"""$profile isa profile;""",
-    f"""$profile has id "SarahGiven225";""",
-    f"""$group isa group;""",
-    f"""$group has id "grp-3acaaf82374a4cc9a0397e67926146de";""",
-    f"""$membership (group: $group, member: $profile) isa group-membership;""",
-    f"""insert""",
-    f"""$membership has badge "top voice";""",
-)))
+
+def generate_shard(query_builder: QueryBuilder, counts: dict[str, int]) -> Iterator[str]:
+    """The queries of a shard, from a builder restricted to it, once the derived relations are all built."""
+    for _ in range(counts["reactions"]):
+        yield query_builder.reaction()
+
+    for _ in range(counts["responses"]):
+        yield query_builder.response()
+
+    yield from query_builder.reaction_viewings()
+    yield from query_builder.response_viewings()
+
+    for _ in range(counts["random_followings"]):
+        yield query_builder.random_following()
+
+    for _ in range(counts["random_viewings"]):
+        yield query_builder.random_viewing()
+
+
+# The builder the shard processes fork from, holding the dataset generated up to the shards.
+sharded_builder: QueryBuilder | None = None
+
+
+def write_shard(seed: str, shard_index: int, shard_count: int, counts: dict[str, int], path: str) -> int:
+    sharded_builder.shard(seed, shard_index, shard_count)
+
+    with QueryWriter(path, "none") as writer:
+        return writer.write_all(generate_shard(sharded_builder, counts))
+
+
+def generate_sharded(
+        query_builder: QueryBuilder,
+        counts: dict[str, int],
+        synthesis_random: Random,
+        writer: QueryWriter,
+        seed: int,
+        shard_count: int,
+        processes: int,
+) -> None:
+    """
+    Writes the dataset, generating the reactions, responses, random followings and random viewings in shards
+    across processes. Everything else is generated first, and the derived relations that do not depend on the
+    shards are generated before them, so that the shards only read what they share. Each shard has a seed of
+    its own, and the shard files are written out in order, so the output only depends on the seed and the
+    number of shards.
+    """
+    global sharded_builder
+
+    writer.write_all(generate_graph(query_builder, counts, synthesis_random))
+    writer.write_all(query_builder.relation_followings())
+    writer.write_all(query_builder.member_followings())
+    writer.write_all(query_builder.content_subscriptions())
+    writer.write_all(query_builder.participant_viewings())
+
+    sizes = query_builder.shard_sizes(shard_count)
+    weights = {"reactions": "contents", "responses": "polls", "random_followings": "pages", "random_viewings": "posts"}
+    shard_counts = [dict() for _ in range(shard_count)]
+
+    for name, weight in weights.items():
+        for shard_index, count in enumerate(apportion(counts[name], [size[weight] for size in sizes])):
+            shard_counts[shard_index][name] = count
+
+    sharded_builder = query_builder
+
+    with TemporaryDirectory(dir=os.path.dirname(os.path.abspath(writer.path))) as directory:
+        paths = [os.path.join(directory, f"shard-{shard_index}.tql") for shard_index in range(shard_count)]
+        tasks = [
+            (f"{seed}/shard/{shard_index}", shard_index, shard_count, shard_counts[shard_index], paths[shard_index])
+            for shard_index in range(shard_count)
+        ]
+
+        # Forked processes start from a copy of the builder, rather than having it sent to them. Sharding a builder
+        # restricts it, so each process only generates one shard, and the next one forks afresh.
+        with get_context("fork").Pool(processes, maxtasksperchild=1) as pool:
+            query_counts = pool.starmap(write_shard, tasks)
+
+        for path, count in zip(paths, query_counts):
+            writer.write_file(path, count)
+
+    writer.write(badge())
+
+
+def badge() -> str:
+    return "# badge\n" + " ".join((
+        f"""match""",
+        f"""$profile isa profile;""",
+        f"""$profile has id "SarahGiven225";""",
+        f"""$group isa group;""",
+        f"""$group has id "grp-3acaaf82374a4cc9a0397e67926146de";""",
+        f"""$membership (group: $group, member: $profile) isa group-membership;""",
+        f"""insert""",
+        f"""$membership has badge "top voice";""",
+    ))
+
+
+def main():
+    parser = ArgumentParser(description="Generates the social network dataset as TypeQL insert queries.")
+    parser.add_argument("--scale-factor", type=scale_factor, default=1.0, help="multiplies every entity count, from 1, the dataset of the resource files")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="queries.tql")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default=None, help="defaults to that of the output's extension: .gz, .bz2 or .xz")
+    parser.add_argument("--shards", type=int, default=1, help="generates reactions, responses, random followings and viewings in this many shards")
+    parser.add_argument("--processes", type=int, default=None, help="processes generating shards, by default one per core")
+    args = parser.parse_args()
+
+    counts = scaled_counts(args.scale_factor)
+    query_builder = QueryBuilder(args.seed, username_suffix_digits(counts["persons"]))
+    synthesis_random = Random(f"{args.seed}/synthesis")
+
+    with QueryWriter(args.output, args.compression) as writer:
+        if args.shards > 1:
+            generate_sharded(query_builder, counts, synthesis_random, writer, args.seed, args.shards, args.processes)
+        else:
+            writer.write_all(generate(query_builder, counts, synthesis_random))
 
 
-with open("queries.tql", "w") as output_file:
-    for query in queries:
-        output_file.write("\n")
-        output_file.write(query)
+if __name__ == "__main__":
+    main()
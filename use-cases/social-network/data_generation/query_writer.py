@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import bz2
+import gzip
+import lzma
+import shutil
+from typing import Iterable
+
+# Compressed file openers by compression name, and the extensions that select them by default.
+COMPRESSIONS = {"none": open, "gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+# Characters of queries held before they are encoded and written out in one go.
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+def compression_of(path: str) -> str:
+    for extension, compression in EXTENSIONS.items():
+        if path.endswith(extension):
+            return compression
+
+    return "none"
+
+
+class QueryWriter:
+    """
+    Writes queries to a file as they are built, each on a new line, compressed according to `compression`
+    or else the file's extension. Queries are gathered into chunks of about `buffer_size` characters, so
+    that the compressor sees large writes, and nothing but the current chunk is held in memory.
+    """
+
+    def __init__(self, path: str, compression: str = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.path = path
+        self.compression = compression_of(path) if compression is None else compression
+        self.count = 0
+        self._buffer_size = buffer_size
+        self._buffer: list[str] = list()
+        self._buffered = 0
+        self._file = COMPRESSIONS[self.compression](path, "wb")
+
+    def __enter__(self) -> QueryWriter:
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def write(self, query: str) -> None:
+        self._buffer.append("\n")
+        self._buffer.append(query)
+        self._buffered += len(query) + 1
+        self.count += 1
+
+        if self._buffered >= self._buffer_size:
+            self.flush()
+
+    def write_all(self, queries: Iterable[str]) -> int:
+        for query in queries:
+            self.write(query)
+
+        return self.count
+
+    def write_file(self, path: str, count: int) -> None:
+        """Writes out the `count` queries of an uncompressed file that another QueryWriter wrote."""
+        self.flush()
+
+        with open(path, "rb") as file:
+            shutil.copyfileobj(file, self._file, self._buffer_size)
+
+        self.count += count
+
+    def flush(self) -> None:
+        self._file.write("".join(self._buffer).encode("utf-8"))
+        self._buffer.clear()
+        self._buffered = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
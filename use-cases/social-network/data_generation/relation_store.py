@@ -0,0 +1,290 @@
+from enums import PageType, PlaceType, SocialRelationType, GroupMemberRank
+
+from data_classes import (
+    Page,
+    Place,
+    SocialRelation,
+    Education,
+    Employment,
+    GroupMembership,
+    Following,
+    Viewing,
+)
+
+
+class _PagePool:
+    """Pages left to choose from, in a list so that a random choice takes constant time, as does removal."""
+
+    def __init__(self):
+        self.pages: list[Page] = list()
+        self._indices: dict[str, int] = dict()
+
+    def add(self, page: Page) -> None:
+        self._indices[page.id] = len(self.pages)
+        self.pages.append(page)
+
+    def replace(self, page: Page) -> None:
+        if page.id in self._indices:
+            self.pages[self._indices[page.id]] = page
+
+    def discard(self, page: Page) -> None:
+        index = self._indices.pop(page.id, None)
+
+        if index is None:
+            return
+
+        # The last page takes the place of the removed one, so the order only depends on the seeded choices.
+        last = self.pages.pop()
+
+        if index < len(self.pages):
+            self.pages[index] = last
+            self._indices[last.id] = index
+
+
+class RelationStore:
+    """
+    The pages, places and relations generated so far, indexed for the lookups the query builder makes.
+
+    Every collection is still kept as a list in insertion order, so that iterating over it and choosing from
+    it at random give the same results as before. Alongside the lists are adjacency maps by person, group
+    and page, dicts keyed by pairs of ids, and counters kept up to date as relations are added, so that no
+    lookup scans a whole collection.
+    """
+
+    def __init__(self):
+        self.pages: dict[str, Page] = dict()
+        self.all_pages: list[Page] = list()
+        self._pages_by_name: dict[str, list[Page]] = dict()
+        self.persons: list[Page] = list()
+        self.organizations: list[Page] = list()
+        self.institutes: list[Page] = list()
+        self.groups: list[Page] = list()
+        self.profiles: list[Page] = list()
+
+        self.places: dict[str, Place] = dict()
+        self._places_by_type: dict[PlaceType, list[Place]] = dict()
+
+        self.social_relations: list[SocialRelation] = list()
+        self._social_relations_by_pair: dict[frozenset[str], SocialRelation] = dict()
+        self._social_relations_by_person: dict[str, list[SocialRelation]] = dict()
+        self._related_person_ids: dict[str, set[str]] = dict()
+        self._related_person_pairs = 0
+        self._relationship_counts: dict[str, int] = dict()
+        self._parent_counts: dict[str, int] = dict()
+
+        self.educations: list[Education] = list()
+        self._educations_by_person: dict[str, Education] = dict()
+        self._persons_without_education = _PagePool()
+        self.employments: list[Employment] = list()
+        self._employments_by_person: dict[str, Employment] = dict()
+        self._persons_without_employment = _PagePool()
+
+        self.group_memberships: list[GroupMembership] = list()
+        self._members_by_group: dict[str, list[Page]] = dict()
+        self._member_ids_by_group: dict[str, set[str]] = dict()
+        self._owned_group_ids: set[str] = set()
+
+        self.followings: list[Following] = list()
+        self._follower_ids_by_page: dict[str, set[str]] = dict()
+
+        self.viewings: list[Viewing] = list()
+        self._viewer_ids_by_post: dict[str, set[str]] = dict()
+
+    def add_page(self, page: Page) -> None:
+        previous = self.pages.get(page.id)
+
+        if previous is not None:
+            # A page generated again under the same id replaces the previous one in place, as in a dict.
+            for pages in self._page_lists(previous):
+                pages[pages.index(previous)] = page
+            self._pages_by_name[previous.name].remove(previous)
+            self._pages_by_name.setdefault(page.name, list()).append(page)
+            self._persons_without_education.replace(page)
+            self._persons_without_employment.replace(page)
+            self.pages[page.id] = page
+            return
+
+        self.pages[page.id] = page
+        self._pages_by_name.setdefault(page.name, list()).append(page)
+
+        for pages in self._page_lists(page):
+            pages.append(page)
+
+        if page.type is PageType.PERSON:
+            self._persons_without_education.add(page)
+            self._persons_without_employment.add(page)
+
+    def _page_lists(self, page: Page) -> list[list[Page]]:
+        lists = [self.all_pages]
+
+        if page.type is PageType.PERSON:
+            lists.append(self.persons)
+        if page.type.is_organization:
+            lists.append(self.organizations)
+        if page.type.is_institute:
+            lists.append(self.institutes)
+        if page.type is PageType.GROUP:
+            lists.append(self.groups)
+        if page.type.is_profile:
+            lists.append(self.profiles)
+
+        return lists
+
+    def pages_named(self, name: str) -> list[Page]:
+        return self._pages_by_name.get(name, list())
+
+    def add_place(self, place: Place) -> None:
+        if place.id in self.places:
+            places = self._places_by_type[self.places[place.id].type]
+            places.remove(self.places[place.id])
+
+        self.places[place.id] = place
+        self._places_by_type.setdefault(place.type, list()).append(place)
+
+    def places_of_type(self, place_type: PlaceType) -> list[Place]:
+        return self._places_by_type.get(place_type, list())
+
+    def add_social_relation(self, relation: SocialRelation) -> None:
+        first, second = relation.persons
+        self.social_relations.append(relation)
+        self._social_relations_by_pair.setdefault(frozenset((first.id, second.id)), relation)
+
+        for person in {first.id: first, second.id: second}.values():
+            self._social_relations_by_person.setdefault(person.id, list()).append(relation)
+
+            if relation.type.is_relationship:
+                self._relationship_counts[person.id] = self._relationship_counts.get(person.id, 0) + 1
+
+        if relation.type is SocialRelationType.PARENTSHIP:
+            self._parent_counts[second.id] = self._parent_counts.get(second.id, 0) + 1
+
+        if first.id != second.id and first.type is PageType.PERSON and second.type is PageType.PERSON:
+            first_related_ids = self._related_person_ids.setdefault(first.id, set())
+
+            if second.id not in first_related_ids:
+                first_related_ids.add(second.id)
+                self._related_person_ids.setdefault(second.id, set()).add(first.id)
+                self._related_person_pairs += 1
+
+    def social_relation(self, persons: tuple[Page, Page]) -> SocialRelation | None:
+        if persons[0].id == persons[1].id:
+            # Any relation of the person, as the pair check of a person with themselves always matched one.
+            relations = self._social_relations_by_person.get(persons[0].id)
+            return relations[0] if relations else None
+
+        return self._social_relations_by_pair.get(frozenset((persons[0].id, persons[1].id)))
+
+    def is_related(self, first: Page, second: Page) -> bool:
+        return second.id in self._related_person_ids.get(first.id, ())
+
+    def unrelated_pair_count(self) -> int:
+        """The number of ordered pairs of distinct persons not in a social relation with each other."""
+        return len(self.persons) * (len(self.persons) - 1) - 2 * self._related_person_pairs
+
+    def unrelated_pair(self, index: int) -> tuple[Page, Page]:
+        """
+        The ordered pair of distinct unrelated persons at the given index, in the order of `product` over the
+        persons. Only the row of the first person is enumerated, so this takes linear time in the persons.
+        """
+        for first in self.persons:
+            related_ids = self._related_person_ids.get(first.id, ())
+            unrelated = len(self.persons) - 1 - len(related_ids)
+
+            if index >= unrelated:
+                index -= unrelated
+                continue
+
+            for second in self.persons:
+                if second.id == first.id or second.id in related_ids:
+                    continue
+
+                if index == 0:
+                    return first, second
+
+                index -= 1
+
+        raise IndexError("Unrelated pair index out of range.")
+
+    def related_persons(self, person: Page) -> list[Page]:
+        """The other persons in a social relation with the person, in the order the relations were added."""
+        related = dict()
+
+        for relation in self._social_relations_by_person.get(person.id, ()):
+            for other in relation.persons:
+                if other.id != person.id:
+                    related.setdefault(other.id, other)
+
+        return list(related.values())
+
+    def social_relation_count(self, person: Page) -> int:
+        return len(self._social_relations_by_person.get(person.id, ()))
+
+    def relationship_count(self, person: Page) -> int:
+        return self._relationship_counts.get(person.id, 0)
+
+    def parent_count(self, person: Page) -> int:
+        return self._parent_counts.get(person.id, 0)
+
+    def add_education(self, education: Education) -> None:
+        self.educations.append(education)
+        self._educations_by_person.setdefault(education.attendee.id, education)
+        self._persons_without_education.discard(education.attendee)
+
+    def education(self, person: Page) -> Education | None:
+        return self._educations_by_person.get(person.id)
+
+    def persons_without_education(self) -> list[Page]:
+        return self._persons_without_education.pages
+
+    def add_employment(self, employment: Employment) -> None:
+        self.employments.append(employment)
+        self._employments_by_person.setdefault(employment.employee.id, employment)
+        self._persons_without_employment.discard(employment.employee)
+
+    def employment(self, person: Page) -> Employment | None:
+        return self._employments_by_person.get(person.id)
+
+    def persons_without_employment(self) -> list[Page]:
+        return self._persons_without_employment.pages
+
+    def add_group_membership(self, membership: GroupMembership) -> None:
+        group_id = membership.group.id
+        self.group_memberships.append(membership)
+        self._members_by_group.setdefault(group_id, list()).append(membership.member)
+        self._member_ids_by_group.setdefault(group_id, set()).add(membership.member.id)
+
+        if membership.rank is GroupMemberRank.OWNER:
+            self._owned_group_ids.add(group_id)
+
+    def members(self, group: Page) -> list[Page]:
+        return self._members_by_group.get(group.id, list())
+
+    def person_members(self, group: Page) -> list[Page]:
+        return [member for member in self.members(group) if member.type is PageType.PERSON]
+
+    def is_member(self, group: Page, profile: Page) -> bool:
+        return profile.id in self._member_ids_by_group.get(group.id, ())
+
+    def has_owner(self, group: Page) -> bool:
+        return group.id in self._owned_group_ids
+
+    def add_following(self, following: Following) -> None:
+        self.followings.append(following)
+        self._follower_ids_by_page.setdefault(following.page.id, set()).add(following.follower.id)
+
+    def is_follower(self, page: Page, profile: Page) -> bool:
+        return profile.id in self._follower_ids_by_page.get(page.id, ())
+
+    def add_viewing(self, viewing: Viewing) -> bool:
+        """Adds the viewing unless the profile has already viewed the post. Returns whether it was added."""
+        viewer_ids = self._viewer_ids_by_post.setdefault(viewing.post.id, set())
+
+        if viewing.profile.id in viewer_ids:
+            return False
+
+        viewer_ids.add(viewing.profile.id)
+        self.viewings.append(viewing)
+        return True
+
+    def has_viewed(self, post_id: str, profile: Page) -> bool:
+        return profile.id in self._viewer_ids_by_post.get(post_id, ())
@@ -0,0 +1,67 @@
+from random import Random
+from re import split
+from typing import Any, Iterator
+
+# Entity counts of the dataset at scale factor 1, the dataset the resource files were written for.
+BASE_COUNTS = {
+    "persons": 30,
+    "organizations": 18,
+    "groups": 5,
+    "educations": 30,
+    "employments": 30,
+    "group_memberships": 50,
+    "social_relations": 200,
+    "conversations": 53,
+    "reactions": 1000,
+    "responses": 120,
+    "random_followings": 100,
+    "random_viewings": 500,
+}
+
+# Sentences drawn from the resource bios to make up a synthesized one.
+SYNTHESIZED_BIO_SENTENCES = 3
+
+
+def scaled_counts(scale_factor: float) -> dict[str, int]:
+    return {name: round(count * scale_factor) for name, count in BASE_COUNTS.items()}
+
+
+def username_suffix_digits(persons: int) -> int:
+    """Enough digits that the most common names have spare usernames, and never fewer than the builder's default."""
+    return max(3, len(str(persons)))
+
+
+def bios(resource_bios: list[str], count: int, random: Random) -> Iterator[str]:
+    """The resource bios, followed by bios made of random sentences from them once they run out."""
+    yield from resource_bios[:count]
+
+    sentences = [sentence for bio in resource_bios for sentence in split(r"(?<=\.)\s+", bio) if sentence]
+
+    for _ in range(count - len(resource_bios)):
+        yield " ".join(random.sample(sentences, SYNTHESIZED_BIO_SENTENCES))
+
+
+def copies(entries: list[Any], count: int) -> Iterator[tuple[Any, int]]:
+    """The entries in order, cycled through until there are enough, with the number of the copy each is."""
+    for index in range(count):
+        yield entries[index % len(entries)], index // len(entries)
+
+
+def copy_name(name: str, copy: int) -> str:
+    """The name of a copy of a resource page, kept unique as organization usernames are made from names."""
+    return name if copy == 0 else f"{name} {copy + 1}"
+
+
+def apportion(total: int, weights: list[int]) -> list[int]:
+    """Splits a count in proportion to the weights, by largest remainder, so that the parts add up to it."""
+    if sum(weights) == 0:
+        weights = [1] * len(weights)
+
+    quotas = [total * weight / sum(weights) for weight in weights]
+    parts = [int(quota) for quota in quotas]
+    by_remainder = sorted(range(len(weights)), key=lambda index: parts[index] - quotas[index])
+
+    for index in by_remainder[:total - sum(parts)]:
+        parts[index] += 1
+
+    return parts
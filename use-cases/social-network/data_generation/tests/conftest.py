@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+GENERATOR_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, GENERATOR_DIRECTORY)
+
+RESOURCES = [
+    "bios.txt", "female_names.yml", "male_names.yml", "last_names.yml", "landmarks.txt", "organisations.json",
+    "groups.json", "conversations/index.json",
+]
+
+# The query builder and generator read their resource files from the working directory.
+requires_resources = pytest.mark.skipif(
+    not all(os.path.exists(os.path.join(GENERATOR_DIRECTORY, "resources", name)) for name in RESOURCES),
+    reason="the generator's resource files are not all present",
+)
+
+
+@pytest.fixture
+def generator_directory(monkeypatch):
+    monkeypatch.chdir(GENERATOR_DIRECTORY)
+    return GENERATOR_DIRECTORY
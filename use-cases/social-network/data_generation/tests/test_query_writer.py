@@ -0,0 +1,49 @@
+import pytest
+from query_writer import COMPRESSIONS, QueryWriter, compression_of
+
+QUERIES = ["insert $a isa person;", "insert $b isa group, has name \"Ĝroup\";", "match $a isa page; delete $a;"]
+
+
+def read(path: str, compression: str) -> str:
+    with COMPRESSIONS[compression](path, "rb") as file:
+        return file.read().decode("utf-8")
+
+
+class TestQueryWriter:
+    @pytest.mark.parametrize("path, compression", [
+        ("queries.tql", "none"), ("queries.tql.gz", "gzip"), ("queries.tql.bz2", "bz2"), ("queries.tql.xz", "xz"),
+    ])
+    def test_compression_follows_the_extension(self, path, compression):
+        assert compression_of(path) == compression
+
+    @pytest.mark.parametrize("compression", list(COMPRESSIONS))
+    def test_writes_each_query_on_a_new_line(self, tmp_path, compression):
+        path = str(tmp_path / "queries.tql")
+
+        with QueryWriter(path, compression, buffer_size=16) as writer:
+            assert writer.write_all(QUERIES) == len(QUERIES)
+
+        assert read(path, compression) == "".join("\n" + query for query in QUERIES)
+
+    def test_buffers_until_the_buffer_size(self, tmp_path):
+        path = tmp_path / "queries.tql"
+        writer = QueryWriter(str(path), buffer_size=1000)
+        writer.write(QUERIES[0])
+        assert path.read_bytes() == b""
+        writer.close()
+        assert path.read_text() == "\n" + QUERIES[0]
+
+    def test_appends_files_other_writers_wrote(self, tmp_path):
+        shard_path = str(tmp_path / "shard.tql")
+
+        with QueryWriter(shard_path) as shard_writer:
+            shard_writer.write_all(QUERIES[1:])
+
+        path = str(tmp_path / "queries.tql.gz")
+
+        with QueryWriter(path) as writer:
+            writer.write(QUERIES[0])
+            writer.write_file(shard_path, shard_writer.count)
+
+        assert writer.count == len(QUERIES)
+        assert read(path, "gzip") == "".join("\n" + query for query in QUERIES)
@@ -0,0 +1,142 @@
+from itertools import product
+import pytest
+from data_classes import Education, Page, Place, Post, SocialRelation, Viewing
+from enums import PageType, PlaceType, PostType, SocialRelationType
+from relation_store import RelationStore
+
+
+def person(index: int, name: str = None) -> Page:
+    return Page(PageType.PERSON, f"person-{index}", name or f"Person {index}")
+
+
+def store_of(*pages: Page) -> RelationStore:
+    store = RelationStore()
+
+    for page in pages:
+        store.add_page(page)
+
+    return store
+
+
+class TestPages:
+    def test_indexes_pages_by_type(self):
+        alice = person(0)
+        school = Page(PageType.SCHOOL, "school-0", "School")
+        group = Page(PageType.GROUP, "group-0", "Group")
+        store = store_of(alice, school, group)
+        assert store.all_pages == [alice, school, group]
+        assert store.persons == [alice]
+        assert store.organizations == store.institutes == [school]
+        assert store.groups == [group]
+        assert store.profiles == [alice, school]
+
+    def test_pages_generated_again_replace_the_previous_one_in_place(self):
+        first, second = person(0, "Alice"), person(1)
+        store = store_of(first, second)
+        again = person(0, "Alicia")
+        store.add_page(again)
+        assert store.persons == [again, second] and store.all_pages == [again, second]
+        assert store.pages["person-0"] is again
+        assert store.pages_named("Alice") == [] and store.pages_named("Alicia") == [again]
+        assert store.persons_without_education() == [again, second]
+
+
+class TestPlaces:
+    def test_indexes_places_by_type(self):
+        store = RelationStore()
+        country = Place(PlaceType.COUNTRY, "place-0", "Country")
+        city = Place(PlaceType.CITY, "place-1", "City", country)
+        store.add_place(country)
+        store.add_place(city)
+        assert store.places_of_type(PlaceType.CITY) == [city]
+        assert store.places_of_type(PlaceType.LANDMARK) == []
+
+    def test_places_generated_again_move_to_their_new_type(self):
+        store = RelationStore()
+        store.add_place(Place(PlaceType.STATE, "place-0", "Place"))
+        city = Place(PlaceType.CITY, "place-0", "Place")
+        store.add_place(city)
+        assert store.places_of_type(PlaceType.STATE) == [] and store.places_of_type(PlaceType.CITY) == [city]
+
+
+class TestSocialRelations:
+    def test_relations_are_looked_up_by_unordered_pair(self):
+        alice, bob, carol = person(0), person(1), person(2)
+        store = store_of(alice, bob, carol)
+        friendship = SocialRelation(SocialRelationType.FRIENDSHIP, (alice, bob))
+        store.add_social_relation(friendship)
+        assert store.social_relation((bob, alice)) is friendship
+        assert store.social_relation((alice, carol)) is None
+        assert store.is_related(alice, bob) and store.is_related(bob, alice)
+        assert not store.is_related(alice, carol)
+
+    def test_related_persons_are_in_the_order_the_relations_were_added(self):
+        alice, bob, carol = person(0), person(1), person(2)
+        store = store_of(alice, bob, carol)
+        store.add_social_relation(SocialRelation(SocialRelationType.FRIENDSHIP, (carol, alice)))
+        store.add_social_relation(SocialRelation(SocialRelationType.PARENTSHIP, (alice, bob)))
+        store.add_social_relation(SocialRelation(SocialRelationType.FRIENDSHIP, (alice, carol)))
+        assert store.related_persons(alice) == [carol, bob]
+        assert store.social_relation_count(alice) == 3
+        assert store.parent_count(bob) == 1 and store.parent_count(alice) == 0
+
+
+class TestRemainingPersons:
+    def test_persons_with_an_education_are_no_longer_chosen_from(self):
+        persons = [person(index) for index in range(4)]
+        store = store_of(*persons)
+        institute = Page(PageType.UNIVERSITY, "university-0", "University")
+        store.add_page(institute)
+        store.add_education(Education(institute, persons[1]))
+        store.add_education(Education(institute, persons[1]))
+        assert store.persons_without_education() == [persons[0], persons[3], persons[2]]
+        assert store.education(persons[1]).attendee is persons[1]
+        assert store.persons_without_employment() == persons
+
+
+class TestViewings:
+    def test_profiles_view_each_post_once(self):
+        alice, bob = person(0), person(1)
+        post = Post(PostType.TEXT, "post-0", alice, "2020-01-01T00:00:00")
+        store = store_of(alice, bob)
+        assert store.add_viewing(Viewing(post, bob))
+        assert not store.add_viewing(Viewing(post, bob))
+        assert store.has_viewed("post-0", bob) and not store.has_viewed("post-0", alice)
+        assert len(store.viewings) == 1
+
+
+class TestUnrelatedPairs:
+    @staticmethod
+    def related_store(persons: list[Page], pairs: list[tuple[int, int]]) -> RelationStore:
+        store = store_of(*persons)
+
+        for first, second in pairs:
+            store.add_social_relation(SocialRelation(SocialRelationType.FRIENDSHIP, (persons[first], persons[second])))
+
+        return store
+
+    @pytest.mark.parametrize("pairs", [[], [(0, 1)], [(0, 1), (1, 0), (2, 3), (0, 4)], [(1, 1)]])
+    def test_enumerates_the_unrelated_pairs_in_product_order(self, pairs):
+        persons = [person(index) for index in range(5)]
+        store = self.related_store(persons, pairs)
+        related = {frozenset((persons[first].id, persons[second].id)) for first, second in pairs}
+        expected = [
+            (first, second) for first, second in product(persons, persons)
+            if first.id != second.id and frozenset((first.id, second.id)) not in related
+        ]
+        assert store.unrelated_pair_count() == len(expected)
+        assert [store.unrelated_pair(index) for index in range(len(expected))] == expected
+
+    def test_indices_past_the_last_pair_are_out_of_range(self):
+        store = self.related_store([person(index) for index in range(3)], [(0, 1), (1, 2), (2, 0)])
+        assert store.unrelated_pair_count() == 0
+
+        with pytest.raises(IndexError):
+            store.unrelated_pair(0)
+
+    def test_relations_with_other_pages_are_not_counted(self):
+        alice = person(0)
+        company = Page(PageType.COMPANY, "company-0", "Company")
+        store = store_of(alice, person(1), company)
+        store.add_social_relation(SocialRelation(SocialRelationType.FRIENDSHIP, (alice, company)))
+        assert store.unrelated_pair_count() == 2
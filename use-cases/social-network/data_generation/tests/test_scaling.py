@@ -0,0 +1,67 @@
+from argparse import ArgumentTypeError
+from random import Random
+from re import split
+import pytest
+from query_generator import scale_factor
+from scaling import BASE_COUNTS, apportion, bios, copies, copy_name, scaled_counts, username_suffix_digits
+
+RESOURCE_BIOS = ["First sentence. Second sentence.", "Third sentence.  Fourth sentence."]
+
+
+class TestScaledCounts:
+    def test_scale_factor_one_is_the_base_dataset(self):
+        assert scaled_counts(1) == BASE_COUNTS
+
+    def test_counts_are_rounded(self):
+        assert scaled_counts(0.1)["persons"] == 3 and scaled_counts(2.5)["groups"] == 12
+
+    @pytest.mark.parametrize("value", ["0", "-1", "0.05", "0.3", "0.99"])
+    def test_scale_factors_below_one_are_rejected(self, value):
+        with pytest.raises(ArgumentTypeError):
+            scale_factor(value)
+
+    def test_reads_fractional_scale_factors(self):
+        assert scale_factor("1") == 1 and scale_factor("2.5") == 2.5
+
+    @pytest.mark.parametrize("persons, digits", [(30, 3), (999, 3), (3000, 4), (100000, 6)])
+    def test_usernames_have_enough_digits(self, persons, digits):
+        assert username_suffix_digits(persons) == digits
+
+
+class TestResources:
+    def test_bios_start_with_the_resource_bios(self):
+        assert list(bios(RESOURCE_BIOS, 1, Random(0))) == RESOURCE_BIOS[:1]
+
+    def test_bios_are_synthesized_from_resource_sentences(self):
+        sentences = {"First sentence.", "Second sentence.", "Third sentence.", "Fourth sentence."}
+        synthesized = list(bios(RESOURCE_BIOS, 5, Random(0)))[2:]
+        assert len(synthesized) == 3
+
+        for bio in synthesized:
+            parts = split(r"(?<=\.) ", bio)
+            assert len(set(parts)) == 3 and set(parts) <= sentences
+
+    def test_bios_only_depend_on_the_seed(self):
+        assert list(bios(RESOURCE_BIOS, 6, Random(1))) == list(bios(RESOURCE_BIOS, 6, Random(1)))
+
+    def test_copies_cycle_through_the_entries(self):
+        assert list(copies(["a", "b"], 5)) == [("a", 0), ("b", 0), ("a", 1), ("b", 1), ("a", 2)]
+
+    def test_copies_keep_names_unique(self):
+        assert [copy_name("Company", copy) for copy in range(3)] == ["Company", "Company 2", "Company 3"]
+
+
+class TestApportion:
+    @pytest.mark.parametrize("total, weights", [(10, [1, 1, 1]), (7, [5, 0, 2, 9]), (0, [1, 2]), (1000, [3, 3, 4])])
+    def test_parts_add_up_to_the_total(self, total, weights):
+        assert sum(apportion(total, weights)) == total
+
+    def test_parts_are_proportional_to_the_weights(self):
+        assert apportion(100, [1, 3, 0, 6]) == [10, 30, 0, 60]
+
+    def test_remainders_go_to_the_largest_fractions(self):
+        # The quotas are 1.2, 3.6 and 5.2.
+        assert apportion(10, [3, 9, 13]) == [1, 4, 5]
+
+    def test_zero_weights_split_evenly(self):
+        assert apportion(7, [0, 0, 0]) == [3, 2, 2]
@@ -0,0 +1,100 @@
+from copy import deepcopy
+from itertools import chain
+from random import Random
+import pytest
+from conftest import GENERATOR_DIRECTORY, requires_resources
+from query_builder import QueryBuilder
+from query_generator import generate_graph, generate_sharded
+from query_writer import QueryWriter
+from scaling import scaled_counts, username_suffix_digits
+
+SHARD_COUNT = 3
+
+pytestmark = requires_resources
+
+
+@pytest.fixture(scope="module")
+def builder():
+    """A builder holding the pages, posts and derived relations, as the shards are forked from."""
+    counts = scaled_counts(1)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(GENERATOR_DIRECTORY)
+        query_builder = QueryBuilder(0, username_suffix_digits(counts["persons"]))
+        queries = chain(
+            generate_graph(query_builder, counts, Random("0/synthesis")),
+            query_builder.relation_followings(),
+            query_builder.member_followings(),
+            query_builder.content_subscriptions(),
+            query_builder.participant_viewings(),
+        )
+
+        for _ in queries:
+            pass
+
+    return query_builder
+
+
+def sharded(builder: QueryBuilder, shard_count: int) -> list[QueryBuilder]:
+    shards = [deepcopy(builder) for _ in range(shard_count)]
+
+    for shard_index, shard in enumerate(shards):
+        shard.shard(f"0/shard/{shard_index}", shard_index, shard_count)
+
+    return shards
+
+
+def ids(items) -> list[str]:
+    return [item.id for item in items]
+
+
+class TestShards:
+    @pytest.mark.parametrize("attribute, source", [
+        ("_contents", lambda builder: builder._contents),
+        ("_post_list", lambda builder: builder._post_list),
+        ("_poll_list", lambda builder: builder._poll_list),
+        ("_following_pages", lambda builder: builder._store.all_pages),
+    ])
+    def test_shards_split_what_they_choose_from(self, builder, attribute, source):
+        chosen = [ids(getattr(shard, attribute)) for shard in sharded(builder, SHARD_COUNT)]
+        assert sorted(sum(chosen, [])) == sorted(ids(source(builder)))
+        assert all(chosen), "Every shard should have something to choose from."
+
+    def test_conversations_stay_in_one_shard(self, builder):
+        shards = builder._content_shards(SHARD_COUNT)
+
+        for content_id, root_post_id in builder._root_post_ids.items():
+            assert shards[content_id] == shards[root_post_id]
+
+    def test_sizes_are_those_the_shards_choose_from(self, builder):
+        sizes = [
+            {"contents": len(shard._contents), "polls": len(shard._poll_list), "posts": len(shard._post_list),
+             "pages": len(shard._following_pages)}
+            for shard in sharded(builder, SHARD_COUNT)
+        ]
+        assert builder.shard_sizes(SHARD_COUNT) == sizes
+
+    def test_shards_generate_no_relation_twice(self, builder):
+        shards = sharded(builder, SHARD_COUNT)
+        reactions = [[shard.reaction() for _ in range(50)] for shard in shards]
+        viewings = [[shard.random_viewing() for _ in range(50)] for shard in shards]
+
+        for queries in [reactions, viewings]:
+            for first in range(SHARD_COUNT):
+                for second in range(first + 1, SHARD_COUNT):
+                    assert not set(queries[first]) & set(queries[second])
+
+
+class TestShardedGeneration:
+    def generate(self, path: str) -> str:
+        counts = scaled_counts(1)
+        query_builder = QueryBuilder(0, username_suffix_digits(counts["persons"]))
+
+        with QueryWriter(path) as writer:
+            generate_sharded(query_builder, counts, Random("0/synthesis"), writer, 0, SHARD_COUNT, 2)
+
+        with open(path) as file:
+            return file.read()
+
+    def test_output_only_depends_on_the_seed_and_shard_count(self, generator_directory, tmp_path):
+        assert self.generate(str(tmp_path / "first.tql")) == self.generate(str(tmp_path / "second.tql"))